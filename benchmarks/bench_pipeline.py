@@ -0,0 +1,174 @@
+# benchmarks/bench_pipeline.py
+"""End-to-end latency / throughput of the cold email pipeline against fakes.
+
+    python -m benchmarks.bench_pipeline --fake-models --requests 40 --concurrency 8 --out e2e.json
+
+Each request stores a synthetic resume upload, runs the full stage graph
+(extract, index, parse_jd, retrieve, hunter, generate) and posts the result
+to the fake n8n webhook. The same request set runs twice: "cold" with empty
+caches and "warm" afterwards. Service latencies are injected with the
+--*-ms flags so the numbers resemble a real deployment.
+"""
+import argparse
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, List
+
+from src import metrics, openai_email
+from src.http_transport import get_transport, request
+from src.pipeline import iter_cold_email, run_cold_email
+from src.rate_limit import TokenBucket
+from src.upload_store import store_upload
+
+from tests import fakes
+from .common import environment, summarize, workdir, write_results
+from tests.fakes import Latency
+from tests.synthetic import SKILLS, make_corpus
+
+
+def _one(job: Dict, resume: str, user_id: str, stream: bool) -> Dict:
+    started = time.perf_counter()
+    upload = store_upload(resume)
+    first_token = None
+    if stream:
+        result = {}
+        for state in iter_cold_email(upload.path, job["jd_text"], job["recruiter_name"],
+                                     job["company_domain"], user_id=user_id,
+                                     resume_hash=upload.sha256):
+            if first_token is None and state.get("body"):
+                first_token = time.perf_counter() - started
+            result = state
+    else:
+        result = run_cold_email(upload.path, job["jd_text"], job["recruiter_name"],
+                                job["company_domain"], user_id=user_id, resume_hash=upload.sha256)
+
+    request("n8n", "POST", fakes.FAKE_N8N_URL, timeout=10, json={
+        "to": result.get("recruiter_email") or "",
+        "subject": result.get("subject", ""),
+        "body": result.get("body", ""),
+    })
+    return {
+        "latency": time.perf_counter() - started,
+        "first_token": first_token,
+        "timings": result.get("timings", {}),
+        "errors": result.get("errors", {}),
+    }
+
+
+def _pass(work: List, concurrency: int, stream: bool) -> Dict:
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        outcomes = list(pool.map(lambda w: _one(*w, stream), work))
+    wall = time.perf_counter() - started
+
+    stages: Dict[str, List[float]] = {}
+    errors: Dict[str, int] = {}
+    for o in outcomes:
+        for name, secs in o["timings"].items():
+            stages.setdefault(name, []).append(secs)
+        for name in o["errors"]:
+            errors[name] = errors.get(name, 0) + 1
+
+    report = {
+        "requests": len(outcomes),
+        "wall_s": round(wall, 3),
+        "throughput_rps": round(len(outcomes) / wall, 3) if wall else None,
+        "latency": summarize([o["latency"] for o in outcomes]),
+        "stage_median_ms": {name: round(statistics.median(v) * 1000, 3) for name, v in stages.items()},
+        "errors": errors,
+    }
+    if stream:
+        report["first_token"] = summarize([o["first_token"] for o in outcomes if o["first_token"] is not None])
+    return report
+
+
+def _ms(seconds):
+    return None if seconds is None else round(seconds * 1000, 3)
+
+
+def run(requests_n: int, concurrency: int, resumes: int, latency: Dict[str, Latency],
+        fake_models: bool, stream: bool, rate_limits: bool = False, fused: bool = False) -> Dict:
+    installed = fakes.install(models=fake_models, skills=SKILLS, **latency)
+    saved_fused, openai_email.LLM_FUSED = openai_email.LLM_FUSED, fused
+    buckets = {s: get_transport(s).bucket for s in ("hunter", "n8n")}
+    if not rate_limits:
+        # the fakes don't throttle; client-side caps would only measure the caps
+        for service in buckets:
+            get_transport(service).bucket = TokenBucket(0)
+    try:
+        corpus = make_corpus(Path("corpus"), resumes=resumes, jobs=requests_n)
+        work = [
+            (job, corpus["resumes"][i % resumes], f"bench{i % resumes}")
+            for i, job in enumerate(corpus["jobs"])
+        ]
+        metrics.registry.reset()
+        results = {"cold": _pass(work, concurrency, stream)}
+        calls_cold = installed.calls()
+        results["warm"] = _pass(work, concurrency, stream)
+        calls_total = installed.calls()
+        results["service_calls"] = {
+            "cold": calls_cold,
+            "warm": {k: calls_total[k] - calls_cold[k] for k in calls_total},
+        }
+        # both passes, from the app's own span histograms (bucket-estimated)
+        results["spans"] = {
+            h["labels"]["span"]: {"count": h["count"], "p50_ms": _ms(h["p50"]), "p95_ms": _ms(h["p95"])}
+            for h in metrics.snapshot()["histograms"] if h["name"] == "span_seconds"
+        }
+        return results
+    finally:
+        for service, bucket in buckets.items():
+            get_transport(service).bucket = bucket
+        openai_email.LLM_FUSED = saved_fused
+        installed.uninstall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--requests", type=int, default=24)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--resumes", type=int, default=4)
+    parser.add_argument("--stream", action="store_true", help="stream the email (also reports time to first token)")
+    parser.add_argument("--openai-ms", type=float, default=400.0, help="per OpenAI call")
+    parser.add_argument("--openai-token-ms", type=float, default=5.0, help="per streamed token")
+    parser.add_argument("--pinecone-ms", type=float, default=40.0)
+    parser.add_argument("--hunter-ms", type=float, default=150.0)
+    parser.add_argument("--n8n-ms", type=float, default=50.0)
+    parser.add_argument("--jitter", type=float, default=0.25, help="extra uniform jitter, as a fraction of each base")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--fused", action="store_true",
+                        help="one structured OpenAI call for JD parsing + email (LLM_FUSED)")
+    parser.add_argument("--rate-limits", action="store_true",
+                        help="keep the client-side Hunter / n8n rate limits (off by default)")
+    parser.add_argument("--fake-models", action="store_true",
+                        help="use hashing stand-ins for the embedding model / cross-encoder")
+    parser.add_argument("--workdir", help="where caches and the corpus go (default: fresh temp dir)")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    def lat(ms: float, per_item_ms: float = 0.0) -> Latency:
+        return Latency(ms / 1000, ms / 1000 * args.jitter, per_item_ms / 1000, seed=args.seed)
+
+    latency = {
+        "openai": lat(args.openai_ms, args.openai_token_ms),
+        "pinecone": lat(args.pinecone_ms),
+        "hunter": lat(args.hunter_ms),
+        "n8n": lat(args.n8n_ms),
+    }
+    out = str(Path(args.out).resolve()) if args.out else None
+    with workdir(args.workdir) as path:
+        results = {
+            "benchmark": "pipeline",
+            "environment": environment(),
+            "workdir": str(path),
+            "config": {k: v for k, v in vars(args).items() if k not in ("out", "workdir")},
+            "results": run(args.requests, args.concurrency, args.resumes, latency,
+                           args.fake_models, args.stream, args.rate_limits, args.fused),
+        }
+    write_results(results, out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,158 @@
+# benchmarks/bench_rerank.py
+"""Reranker latency + ranking agreement across backends.
+
+    python -m benchmarks.bench_rerank --backends torch int8 onnx --out rerank.json
+
+For each JD, every candidate chunk is scored by each backend; the
+full-precision "torch" backend is the reference. Reports per-query latency
+(median / p95), top-k overlap and Spearman correlation against the
+reference, how often the adaptive policy would skip reranking, and how
+often that skip still returns the reference top-k set.
+"""
+import argparse
+import json
+import statistics
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+
+from src import reranker
+from src.embeddings_index import embed_texts
+
+SAMPLE_CHUNKS = [
+    "Built a real-time fraud detection pipeline in Python and Kafka processing 40k events/sec.",
+    "Led migration of a monolith to Kubernetes microservices, cutting deploy time from 2h to 10min.",
+    "Trained and deployed PyTorch recommendation models serving 5M users with p95 latency under 50ms.",
+    "Designed PostgreSQL schemas and tuned queries, reducing dashboard load time by 70%.",
+    "Implemented CI/CD with GitHub Actions and Terraform for AWS ECS and Lambda workloads.",
+    "Wrote React + TypeScript front-end for an internal analytics tool used by 300 analysts.",
+    "Fine-tuned transformer models for document classification with 94% F1 using Hugging Face.",
+    "Automated ETL jobs with Airflow and dbt on Snowflake, saving 15 engineer-hours per week.",
+    "Mentored 4 junior engineers and ran weekly code reviews and design discussions.",
+    "Built REST and gRPC APIs in Go for a payments service handling $2M daily volume.",
+    "Developed Spark jobs for feature engineering over 2TB of clickstream data.",
+    "Published research on retrieval-augmented generation at a NeurIPS workshop.",
+    "Set up Prometheus and Grafana monitoring with SLO-based alerting for 30 services.",
+    "Created a Java Spring Boot inventory system integrated with SAP.",
+    "Teaching assistant for graduate Machine Learning course, 120 students.",
+    "Optimized C++ image-processing kernels with SIMD for a 3x speedup.",
+    "Led A/B testing framework rollout and statistical analysis for product experiments.",
+    "Built LLM-based support chatbot with LangChain, Pinecone and OpenAI APIs.",
+    "Managed Linux servers and Ansible playbooks for on-prem GPU cluster.",
+    "Designed data privacy controls and GDPR deletion workflows.",
+]
+
+SAMPLE_JDS = [
+    "Machine Learning Engineer: PyTorch, model deployment, recommendation systems, low-latency serving.",
+    "Backend Engineer (Go, gRPC, payments). Experience with distributed systems and PostgreSQL.",
+    "Data Engineer: Airflow, dbt, Snowflake, Spark. Build reliable ETL pipelines.",
+    "Platform/SRE: Kubernetes, Terraform, AWS, Prometheus, on-call and SLOs.",
+    "Frontend Engineer: React, TypeScript, data visualization for internal tools.",
+    "Applied Scientist NLP: transformers, retrieval-augmented generation, LLMs, evaluation.",
+]
+
+
+def _spearman(a: List[float], b: List[float]) -> float:
+    ra = np.argsort(np.argsort(a))
+    rb = np.argsort(np.argsort(b))
+    if len(a) < 2:
+        return 1.0
+    return float(np.corrcoef(ra, rb)[0, 1])
+
+
+def _pct(values: List[float], q: float) -> float:
+    return float(np.percentile(values, q)) if values else 0.0
+
+
+def run(backends: List[str], chunks: List[str], jds: List[str], top_k: int, repeats: int) -> Dict:
+    jd_embs = np.asarray(embed_texts(jds))
+    chunk_embs = np.asarray(embed_texts(chunks))
+    jd_embs /= np.linalg.norm(jd_embs, axis=1, keepdims=True)
+    chunk_embs /= np.linalg.norm(chunk_embs, axis=1, keepdims=True)
+    dense = jd_embs @ chunk_embs.T  # cosine, like the vector stores
+
+    results = {"candidates": len(chunks), "queries": len(jds), "top_k": top_k, "backends": {}}
+    reference = None
+
+    for backend in ["torch"] + [b for b in backends if b != "torch"]:
+        started = time.perf_counter()
+        model = reranker.load_cross_encoder(backend)
+        load_s = time.perf_counter() - started
+
+        per_query, all_scores = [], []
+        for _ in range(repeats):
+            for jd in jds:
+                reranker.score_cache.clear()
+                t0 = time.perf_counter()
+                scores = reranker.score_pairs(jd, chunks, model=model, backend=backend)
+                per_query.append(time.perf_counter() - t0)
+                if len(all_scores) < len(jds):
+                    all_scores.append(scores)
+
+        t0 = time.perf_counter()
+        for jd in jds:
+            reranker.score_pairs(jd, chunks, model=model, backend=backend)
+        cached_s = (time.perf_counter() - t0) / len(jds)
+
+        entry = {
+            "load_s": round(load_s, 3),
+            "latency_ms_median": round(statistics.median(per_query) * 1000, 3),
+            "latency_ms_p95": round(_pct(per_query, 95) * 1000, 3),
+            "cached_latency_ms": round(cached_s * 1000, 4),
+        }
+        if reference is None:
+            reference = all_scores
+        else:
+            overlaps, rhos = [], []
+            for ref, got in zip(reference, all_scores):
+                ref_top = set(np.argsort(ref)[::-1][:top_k])
+                got_top = set(np.argsort(got)[::-1][:top_k])
+                overlaps.append(len(ref_top & got_top) / top_k)
+                rhos.append(_spearman(ref, got))
+            entry["topk_overlap"] = round(float(np.mean(overlaps)), 4)
+            entry["spearman"] = round(float(np.mean(rhos)), 4)
+        results["backends"][backend] = entry
+
+    # adaptive policy vs always reranking with the reference model
+    skipped, skip_correct = 0, 0
+    for q, ref in enumerate(reference):
+        if not reranker.needs_rerank(list(dense[q]), top_k):
+            skipped += 1
+            dense_top = set(np.argsort(dense[q])[::-1][:top_k])
+            ref_top = set(np.argsort(ref)[::-1][:top_k])
+            skip_correct += dense_top == ref_top
+    results["adaptive"] = {
+        "margin": reranker.RERANK_MARGIN,
+        "skip_rate": round(skipped / len(reference), 4),
+        "skip_same_topk_rate": round(skip_correct / skipped, 4) if skipped else None,
+    }
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--backends", nargs="+", default=["torch", "int8", "onnx"])
+    parser.add_argument("--chunks", help="text file, one resume chunk per line (default: built-in sample)")
+    parser.add_argument("--jds", help="text file, one JD per line (default: built-in sample)")
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    def _lines(path, default):
+        if not path:
+            return default
+        return [line.strip() for line in Path(path).read_text(encoding="utf-8").splitlines() if line.strip()]
+
+    results = run(args.backends, _lines(args.chunks, SAMPLE_CHUNKS), _lines(args.jds, SAMPLE_JDS),
+                  args.top_k, args.repeats)
+    text = json.dumps(results, indent=2)
+    if args.out:
+        Path(args.out).write_text(text + "\n")
+    print(text)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,132 @@
+# benchmarks/bench_stages.py
+"""Per-stage microbenchmarks on a synthetic corpus, no network needed.
+
+    python -m benchmarks.bench_stages --fake-models --out stages.json
+
+Stages: PDF extraction (serial, page-parallel, cached), chunking,
+embedding (model vs. embedding cache), reranking (model vs. score cache),
+retrieval (dense-only vs. hybrid BM25 fusion) and email prompt building. Without --fake-models the real embedding /
+cross-encoder models are used; a stage that can't run records its error
+instead of failing the whole run.
+"""
+import argparse
+from pathlib import Path
+from typing import Callable, Dict
+
+from src import chunking, embeddings_index, pdf_utils, reranker
+from src.embeddings_index import embed_texts, get_embed_model
+from src.openai_email import build_email_prompt
+
+from tests import fakes
+from .common import environment, timeit, workdir, write_results
+from tests.synthetic import SKILLS, make_corpus, make_job, make_resume, write_pdf
+
+
+def _safe(fn: Callable[[], Dict]) -> Dict:
+    try:
+        return fn()
+    except Exception as e:
+        return {"error": f"{type(e).__name__}: {e}"}
+
+
+def run(repeats: int = 5, resumes: int = 4, long_pages: int = 20, fake_models: bool = False) -> Dict:
+    installed = fakes.install(models=fake_models, skills=SKILLS)
+    try:
+        corpus = make_corpus(Path("corpus"), resumes=resumes, jobs=resumes)
+        long_pdf = str(write_pdf(Path("corpus/long.pdf"), make_resume(999, roles=6 * long_pages)))
+        texts = [pdf_utils.extract_text_from_pdf(p) for p in corpus["resumes"]]
+        chunks = [c for t in texts for c in chunking.iter_chunks(t)]
+        jd = corpus["jobs"][0]["jd_text"]
+        results = {"corpus": {"resumes": resumes, "chunks": len(chunks),
+                              "long_pdf_pages": len(list(pdf_utils.iter_pdf_pages(long_pdf))),
+                              "pdf_workers": pdf_utils.PDF_WORKERS}}
+
+        def extract_stage(parallel: bool) -> Dict:
+            min_pages = pdf_utils.PDF_PARALLEL_MIN_PAGES
+            pdf_utils.PDF_PARALLEL_MIN_PAGES = 1 if parallel else 10 ** 9
+            try:
+                return {
+                    "resume": timeit(lambda: pdf_utils._extract_pages(corpus["resumes"][0]), repeats),
+                    "long": timeit(lambda: pdf_utils._extract_pages(long_pdf), repeats),
+                }
+            finally:
+                pdf_utils.PDF_PARALLEL_MIN_PAGES = min_pages
+
+        long_hash = pdf_utils.file_sha256(long_pdf)
+        results["extract"] = {
+            "serial": _safe(lambda: extract_stage(parallel=False)),
+            "parallel": _safe(lambda: extract_stage(parallel=True)),
+            "cached_long": _safe(lambda: timeit(lambda: pdf_utils.extract_pdf(long_pdf), repeats)),
+            "cached_long_known_hash": _safe(lambda: timeit(
+                lambda: pdf_utils.extract_pdf(long_pdf, file_hash=long_hash), repeats)),
+        }
+
+        results["chunk"] = _safe(lambda: timeit(
+            lambda: [list(chunking.iter_chunks(t)) for t in texts], repeats))
+
+        results["embed"] = {
+            "model": _safe(lambda: timeit(
+                lambda: get_embed_model().encode(chunks, convert_to_numpy=True), repeats)),
+            "cached": _safe(lambda: timeit(lambda: embed_texts(chunks), repeats)),
+        }
+
+        candidates = chunks[:reranker.RERANK_CANDIDATES]
+        results["rerank"] = {
+            "candidates": len(candidates),
+            "model": _safe(lambda: timeit(lambda: reranker.score_pairs(jd, candidates), repeats,
+                                          setup=reranker.score_cache.clear)),
+            "cached": _safe(lambda: timeit(lambda: reranker.score_pairs(jd, candidates), repeats)),
+        }
+
+        def retrieve_stage(hybrid: bool) -> Dict:
+            saved = embeddings_index.HYBRID_RETRIEVAL
+            embeddings_index.HYBRID_RETRIEVAL = hybrid
+            try:
+                embeddings_index.index_resume_text(texts[0], user_id="bench")
+                return timeit(lambda: embeddings_index.retrieve_relevant_snippets(
+                    jd, user_id="bench", top_k=5, skills=SKILLS[:8]), repeats,
+                    setup=reranker.score_cache.clear)
+            finally:
+                embeddings_index.HYBRID_RETRIEVAL = saved
+
+        results["retrieve"] = {
+            "dense": _safe(lambda: retrieve_stage(hybrid=False)),
+            "hybrid": _safe(lambda: retrieve_stage(hybrid=True)),
+        }
+
+        jd_info = {"role_title": "Backend Engineer", "company_name": "Globex",
+                   "location": "Remote", "top_skills": SKILLS[:8]}
+        snippets = [{"text": c, "score": 1.0} for c in chunks[:5]]
+        job = make_job(0)
+        results["prompt"] = _safe(lambda: timeit(
+            lambda: build_email_prompt(jd_info, snippets, job["recruiter_name"], None), repeats * 20))
+        return results
+    finally:
+        installed.uninstall()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--resumes", type=int, default=4)
+    parser.add_argument("--long-pages", type=int, default=20, help="approximate pages in the long PDF")
+    parser.add_argument("--fake-models", action="store_true",
+                        help="use hashing stand-ins for the embedding model / cross-encoder")
+    parser.add_argument("--workdir", help="where caches and the corpus go (default: fresh temp dir)")
+    parser.add_argument("--out", help="write JSON results here (default: stdout)")
+    args = parser.parse_args(argv)
+
+    out = str(Path(args.out).resolve()) if args.out else None
+    with workdir(args.workdir) as path:
+        results = {
+            "benchmark": "stages",
+            "environment": environment(),
+            "workdir": str(path),
+            "fake_models": args.fake_models,
+            "results": run(args.repeats, args.resumes, args.long_pages, args.fake_models),
+        }
+    write_results(results, out)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/common.py
+"""Shared timing / reporting helpers for the benchmark scripts."""
+import contextlib
+import json
+import os
+import platform
+import statistics
+import subprocess
+import tempfile
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+import numpy as np
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+
+
+def summarize(seconds: List[float]) -> Dict[str, float]:
+    """Latency summary in milliseconds."""
+    if not seconds:
+        return {"n": 0}
+    ms = [s * 1000 for s in seconds]
+    return {
+        "n": len(ms),
+        "mean_ms": round(statistics.fmean(ms), 3),
+        "median_ms": round(statistics.median(ms), 3),
+        "p95_ms": round(float(np.percentile(ms, 95)), 3),
+        "min_ms": round(min(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def timeit(fn: Callable[[], object], repeats: int, warmup: int = 1,
+           setup: Optional[Callable[[], object]] = None) -> Dict[str, float]:
+    """Run `fn` `warmup` + `repeats` times (calling `setup` untimed before each)."""
+    samples = []
+    for i in range(warmup + repeats):
+        if setup:
+            setup()
+        started = time.perf_counter()
+        fn()
+        if i >= warmup:
+            samples.append(time.perf_counter() - started)
+    return summarize(samples)
+
+
+def environment() -> Dict[str, str]:
+    """Enough context to tell whether two result files are comparable."""
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                                capture_output=True, text=True, timeout=5).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = ""
+    return {
+        "commit": commit,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": str(os.cpu_count()),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+    }
+
+
+@contextlib.contextmanager
+def workdir(path: Optional[str] = None):
+    """chdir into `path` (default: a fresh temp dir) so the app's relative
+    cache/ uploads/ index_manifests/ paths never touch the real ones."""
+    path = Path(path or tempfile.mkdtemp(prefix="coldmail-bench-")).resolve()
+    path.mkdir(parents=True, exist_ok=True)
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield path
+    finally:
+        os.chdir(previous)
+
+
+def write_results(results: Dict, out: Optional[str]) -> None:
+    text = json.dumps(results, indent=2)
+    if out:
+        Path(out).write_text(text + "\n")
+    print(text)
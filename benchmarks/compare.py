@@ -0,0 +1,57 @@
+# benchmarks/compare.py
+"""Compare two benchmark result files and flag latency regressions.
+
+    python -m benchmarks.compare before.json after.json --threshold 0.10
+
+Every numeric leaf whose key ends in `_ms` or `_s` (lower is better) is
+compared; the exit status is 1 when any grows by more than --threshold.
+"""
+import argparse
+import json
+from pathlib import Path
+from typing import Dict, Iterator, Tuple
+
+
+def _leaves(node, prefix: str = "") -> Iterator[Tuple[str, float]]:
+    if isinstance(node, dict):
+        for key, value in node.items():
+            yield from _leaves(value, f"{prefix}.{key}" if prefix else key)
+    elif isinstance(node, (int, float)) and not isinstance(node, bool):
+        if prefix.endswith(("_ms", "_s")):
+            yield prefix, float(node)
+
+
+def compare(before: Dict, after: Dict, threshold: float) -> Tuple[list, list]:
+    old = dict(_leaves(before.get("results", before)))
+    new = dict(_leaves(after.get("results", after)))
+    rows, regressions = [], []
+    for key in sorted(old.keys() & new.keys()):
+        a, b = old[key], new[key]
+        change = (b - a) / a if a else 0.0
+        rows.append((key, a, b, change))
+        if change > threshold:
+            regressions.append(key)
+    return rows, regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument("before")
+    parser.add_argument("after")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown")
+    args = parser.parse_args(argv)
+
+    before = json.loads(Path(args.before).read_text())
+    after = json.loads(Path(args.after).read_text())
+    rows, regressions = compare(before, after, args.threshold)
+
+    width = max((len(r[0]) for r in rows), default=10)
+    for key, a, b, change in rows:
+        flag = "  <-- regression" if key in regressions else ""
+        print(f"{key:<{width}}  {a:>12.3f}  {b:>12.3f}  {change:+8.1%}{flag}")
+    print(f"\n{len(regressions)} regression(s) over {args.threshold:.0%}")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,457 @@
+# src/api.py
+"""Headless HTTP API over the same pipeline the Gradio app uses.
+
+    python -m src.api --host 0.0.0.0 --port 8000
+
+    POST /resumes            multipart `file` (+ `wait`, `replaces`) -> resume_hash, resume_id, index stats
+    GET  /portfolio          the caller's resumes; DELETE /portfolio/{resume_id} drops one
+    POST /generate           {resume_hash | resume_hashes, jd_text, recruiter_name, company_domain}
+    POST /batches            {resume_hash | resume_hashes, jobs: [{jd_text, ...}], send} -> 202 batch_id
+    GET  /batches/{id}       status, counts, and (with ?results=true) the result records
+    POST /send               queue one email for n8n (outbox) -> 202 key
+    GET  /outbox[/{key}]     outbox counts / one message's delivery state
+    GET  /healthz, /readyz   liveness; readiness = API_READY_COMPONENTS loaded
+    GET  /metrics            Prometheus text
+
+Auth: the user is never taken from the request body. Every endpoint except
+/healthz, /readyz and /metrics needs `Authorization: Bearer <key>` (or
+`X-API-Key`) with a key from API_KEYS ("key:user,key:user"), or, behind a
+proxy that authenticates users itself, the user in the API_USER_HEADER
+header it sets. With neither configured the API answers 503, unless
+API_SINGLE_USER names the one user it serves (single-tenant, no auth: keep
+it on localhost).
+
+Each uploaded resume joins the user's portfolio; pass several hashes as
+`resume_hashes` and the best fit for each JD is picked (see portfolio).
+
+Every instance keeps its own state in local files (uploads, caches,
+batches, portfolios), so behind a load balancer either share UPLOAD_DIR / API_BATCH_DIR
+between instances or route a user's requests to one instance.
+
+Backpressure: at most API_CONCURRENCY generate / index requests run at
+once and API_QUEUE_SIZE more wait; anything beyond that gets 429 with
+Retry-After right away instead of piling up behind the pipeline. Batches
+run API_BATCH_WORKERS at a time with API_BATCH_QUEUE waiting.
+"""
+import argparse
+import asyncio
+import hmac
+import json
+import logging
+import os
+import tempfile
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from fastapi import Depends, FastAPI, File, Form, HTTPException, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse
+from pydantic import BaseModel, Field
+
+from . import config  # noqa: F401  (first: loads .env before any module reads its settings)
+from . import metrics, outbox, portfolio, prefetch
+from .batch import run_batch
+from .lazy import startup_report
+from .pipeline import run_cold_email
+from .upload_store import UPLOAD_DIR, StoredUpload, find_upload, store_upload
+
+logger = logging.getLogger(__name__)
+
+API_CONCURRENCY = int(os.environ.get("API_CONCURRENCY", "8"))
+API_QUEUE_SIZE = int(os.environ.get("API_QUEUE_SIZE", "32"))
+API_BATCH_WORKERS = int(os.environ.get("API_BATCH_WORKERS", "1"))
+API_BATCH_QUEUE = int(os.environ.get("API_BATCH_QUEUE", "8"))
+API_BATCH_DIR = Path(os.environ.get("API_BATCH_DIR", "cache/batches"))
+API_MAX_BATCH_JOBS = int(os.environ.get("API_MAX_BATCH_JOBS", "1000"))
+API_RETRY_AFTER = int(os.environ.get("API_RETRY_AFTER", "2"))  # seconds, sent with 429
+API_READY_COMPONENTS = [c.strip() for c in
+                        os.environ.get("API_READY_COMPONENTS", "embed_model,rerank_model").split(",") if c.strip()]
+API_WARMUP = os.environ.get("API_WARMUP", "1").strip().lower() not in ("0", "false", "no")
+API_KEYS = {key.strip(): user.strip() for key, _, user in
+            (pair.partition(":") for pair in os.environ.get("API_KEYS", "").split(","))
+            if key.strip() and user.strip()}  # "key:user,key:user"
+API_USER_HEADER = os.environ.get("API_USER_HEADER", "").strip()  # set by a trusted auth proxy
+API_SINGLE_USER = os.environ.get("API_SINGLE_USER", "").strip()
+
+
+# -----------------------------
+# Auth
+# -----------------------------
+def _api_key(request: Request) -> str:
+    auth = request.headers.get("authorization", "")
+    if auth[:7].lower() == "bearer ":
+        return auth[7:].strip()
+    return request.headers.get("x-api-key", "").strip()
+
+
+def current_user(request: Request) -> str:
+    """The caller's user id, from their API key, the auth proxy's header, or API_SINGLE_USER."""
+    if API_KEYS:
+        key = _api_key(request)
+        # compare against every key so timing doesn't tell how close a guess was
+        user = None
+        for known, owner in API_KEYS.items():
+            if hmac.compare_digest(key.encode(), known.encode()):
+                user = owner
+        if key and user:
+            return user
+    if API_USER_HEADER:
+        user = request.headers.get(API_USER_HEADER, "").strip()
+        if user:
+            return user
+    if API_KEYS or API_USER_HEADER:
+        raise HTTPException(401, "missing or invalid API key", headers={"WWW-Authenticate": "Bearer"})
+    if API_SINGLE_USER:
+        return API_SINGLE_USER
+    raise HTTPException(503, "no auth configured: set API_KEYS, API_USER_HEADER or API_SINGLE_USER")
+
+
+# -----------------------------
+# Admission control
+# -----------------------------
+class Admission:
+    """At most `limit` requests inside, `queue_size` more waiting; the rest get 429."""
+
+    def __init__(self, name: str, limit: int, queue_size: int):
+        self.name = name
+        self.limit = max(1, limit)
+        self.queue_size = max(0, queue_size)
+        self.active = 0
+        self.waiting = 0
+        self._sem = asyncio.Semaphore(self.limit)
+
+    @asynccontextmanager
+    async def slot(self):
+        # single event loop: these counters need no lock
+        if self.active + self.waiting >= self.limit + self.queue_size:
+            metrics.inc("api_rejected_total", limit=self.name)
+            raise HTTPException(429, f"{self.name} queue is full, retry later",
+                                headers={"Retry-After": str(API_RETRY_AFTER)})
+        self.waiting += 1
+        started = time.perf_counter()
+        try:
+            await self._sem.acquire()
+        finally:
+            self.waiting -= 1
+        metrics.observe("api_queue_wait_seconds", time.perf_counter() - started, limit=self.name)
+        self.active += 1
+        try:
+            yield
+        finally:
+            self.active -= 1
+            self._sem.release()
+
+
+requests_admission = Admission("requests", API_CONCURRENCY, API_QUEUE_SIZE)
+
+
+# -----------------------------
+# Request bodies
+# -----------------------------
+class GenerateRequest(BaseModel):
+    resume_hash: str = ""
+    resume_hashes: List[str] = Field(default_factory=list, max_length=50)
+    jd_text: str = Field(min_length=1)
+    recruiter_name: str = ""
+    company_domain: str = ""
+    top_k: int = Field(5, ge=1, le=20)
+    fused: Optional[bool] = None
+
+
+class BatchJob(BaseModel):
+    jd_text: str = Field(min_length=1)
+    recruiter_name: str = ""
+    company_domain: str = ""
+    job_id: str = ""
+
+
+class BatchRequest(BaseModel):
+    resume_hash: str = ""
+    resume_hashes: List[str] = Field(default_factory=list, max_length=50)
+    jobs: List[BatchJob] = Field(min_length=1)
+    top_k: int = Field(5, ge=1, le=20)
+    send: bool = False
+
+
+class SendRequest(BaseModel):
+    to: str = Field(min_length=3)
+    subject: str
+    body: str
+    job_title: str = ""
+    company: str = ""
+    jd_url: str = ""
+
+
+def _resume_uploads(req) -> List[StoredUpload]:
+    """The request's resumes (`resume_hash` and/or `resume_hashes`) from the upload store."""
+    hashes = list(dict.fromkeys(([req.resume_hash] if req.resume_hash else []) + req.resume_hashes))
+    if not hashes:
+        raise HTTPException(422, "resume_hash or resume_hashes is required")
+    uploads = []
+    for h in hashes:
+        path = find_upload(h)
+        if path is None:
+            raise HTTPException(404, f"unknown resume_hash {h}; upload the resume first (POST /resumes)")
+        # no name: the portfolio keeps the one given at upload
+        uploads.append(StoredUpload(sha256=h, path=path, size=0, deduplicated=True))
+    return uploads
+
+
+# -----------------------------
+# Batches
+# -----------------------------
+# runs are files under API_BATCH_DIR/<id>/: meta.json, jobs.jsonl, results.jsonl
+_batch_pool: Optional[ThreadPoolExecutor] = None
+_batch_lock = threading.Lock()
+_batches_open = 0  # queued + running in this process
+
+
+def _get_batch_pool() -> ThreadPoolExecutor:
+    global _batch_pool
+    with _batch_lock:
+        if _batch_pool is None:
+            _batch_pool = ThreadPoolExecutor(max_workers=max(1, API_BATCH_WORKERS), thread_name_prefix="api-batch")
+        return _batch_pool
+
+
+def _write_meta(run_dir: Path, meta: Dict) -> None:
+    tmp = run_dir / f"meta.{os.getpid()}.tmp"
+    tmp.write_text(json.dumps(meta), encoding="utf-8")
+    tmp.replace(run_dir / "meta.json")
+
+
+def _run_batch(run_dir: Path, meta: Dict, resume_paths: List[str], top_k: int) -> None:
+    global _batches_open
+    try:
+        _write_meta(run_dir, dict(meta, status="running", started_at=time.time()))
+        counts = run_batch(resume_paths, str(run_dir / "jobs.jsonl"), str(run_dir / "results.jsonl"),
+                           user_id=meta["user_id"], top_k=top_k, send=meta["send"])
+        _write_meta(run_dir, dict(meta, status="done", counts=counts, finished_at=time.time()))
+    except Exception as e:
+        logger.exception("Batch %s failed", meta["batch_id"])
+        _write_meta(run_dir, dict(meta, status="error", error=f"{type(e).__name__}: {e}",
+                                  finished_at=time.time()))
+    finally:
+        with _batch_lock:
+            _batches_open -= 1
+
+
+def submit_batch(req: BatchRequest, user_id: str) -> Dict:
+    global _batches_open
+    uploads = _resume_uploads(req)
+    if len(req.jobs) > API_MAX_BATCH_JOBS:
+        raise HTTPException(413, f"at most {API_MAX_BATCH_JOBS} jobs per batch")
+    with _batch_lock:
+        if _batches_open >= API_BATCH_WORKERS + API_BATCH_QUEUE:
+            metrics.inc("api_rejected_total", limit="batches")
+            raise HTTPException(429, "batch queue is full, retry later",
+                                headers={"Retry-After": str(API_RETRY_AFTER)})
+        _batches_open += 1
+
+    try:
+        batch_id = uuid.uuid4().hex[:16]
+        run_dir = API_BATCH_DIR / batch_id
+        run_dir.mkdir(parents=True, exist_ok=True)
+        with (run_dir / "jobs.jsonl").open("w", encoding="utf-8") as f:
+            for job in req.jobs:
+                f.write(json.dumps(job.model_dump(), ensure_ascii=False) + "\n")
+        meta = {"batch_id": batch_id, "status": "queued", "user_id": user_id,
+                "resume_hashes": [u.sha256 for u in uploads], "jobs": len(req.jobs), "send": req.send,
+                "created_at": time.time()}
+        _write_meta(run_dir, meta)
+        _get_batch_pool().submit(_run_batch, run_dir, meta, [str(u.path) for u in uploads], req.top_k)
+    except BaseException:
+        with _batch_lock:
+            _batches_open -= 1
+        raise
+    return meta
+
+
+def batch_status(batch_id: str, user_id: str, with_results: bool = False) -> Dict:
+    run_dir = API_BATCH_DIR / batch_id
+    if not batch_id.isalnum() or not (run_dir / "meta.json").exists():
+        raise HTTPException(404, "unknown batch_id")
+    meta = json.loads((run_dir / "meta.json").read_text(encoding="utf-8"))
+    if meta.get("user_id") != user_id:
+        raise HTTPException(404, "unknown batch_id")  # not 403: don't confirm it exists
+    records = []
+    results = run_dir / "results.jsonl"
+    if results.exists():
+        with results.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    records.append(json.loads(line))
+                except ValueError:
+                    continue  # line still being written
+    meta["finished"] = len(records)
+    meta["ok"] = sum(1 for r in records if r.get("status") == "ok")
+    meta["error"] = sum(1 for r in records if r.get("status") == "error")
+    if with_results:
+        meta["results"] = records
+    return meta
+
+
+# -----------------------------
+# Readiness
+# -----------------------------
+def readiness() -> Dict:
+    components = startup_report()["components"]
+    missing = [name for name in API_READY_COMPONENTS
+               if not components.get(name, {}).get("loaded")]
+    return {"ready": not missing, "waiting_for": missing,
+            "components": {name: components.get(name) for name in API_READY_COMPONENTS}}
+
+
+def _warmup() -> None:
+    from .startup import COMPONENTS, warmup
+    warmup([name for name in API_READY_COMPONENTS if name in COMPONENTS])
+
+
+# -----------------------------
+# App
+# -----------------------------
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    metrics.configure_logging()
+    if not (API_KEYS or API_USER_HEADER):
+        if API_SINGLE_USER:
+            logger.warning("API auth is off: every request acts as %r (API_SINGLE_USER)", API_SINGLE_USER)
+        else:
+            logger.error("No API auth configured (API_KEYS / API_USER_HEADER / API_SINGLE_USER); "
+                         "requests will get 503")
+    outbox.start_worker()  # deliver anything queued before a restart
+    if API_WARMUP:
+        # readiness flips once the models are in memory
+        threading.Thread(target=_warmup, name="warmup", daemon=True).start()
+    yield
+
+
+app = FastAPI(title="Cold Email Copilot API", lifespan=lifespan)
+
+
+@app.post("/resumes")
+async def upload_resume(file: UploadFile = File(...), wait: bool = Form(True), replaces: str = Form(""),
+                        user_id: str = Depends(current_user)):
+    """Store a resume PDF and add it to the caller's portfolio (in the background with wait=false).
+
+    `replaces` (a resume_id) removes that resume once this one is indexed,
+    e.g. for a new version of the same resume.
+    """
+    UPLOAD_DIR.mkdir(parents=True, exist_ok=True)
+    suffix = Path(file.filename or "resume.pdf").suffix or ".pdf"
+    name = Path(file.filename or "").name
+    with tempfile.NamedTemporaryFile(dir=UPLOAD_DIR, prefix=".api-", suffix=suffix, delete=False) as tmp:
+        while block := await file.read(1 << 20):
+            tmp.write(block)
+    try:
+        if not wait:
+            upload = await asyncio.to_thread(prefetch.speculate_resume, tmp.name, user_id, name,
+                                             replaces or None)
+            if upload is None:  # PREFETCH_ENABLED=0
+                upload = await asyncio.to_thread(store_upload, tmp.name)
+            return JSONResponse({"resume_hash": upload.sha256, "user_id": user_id,
+                                 "resume_id": portfolio.resume_id_for(upload.sha256), "index": None},
+                                status_code=202)
+        async with requests_admission.slot():
+            upload = await asyncio.to_thread(store_upload, tmp.name)
+            text = await asyncio.to_thread(prefetch.extract_resume, str(upload.path), upload.sha256)
+            stats = await asyncio.to_thread(prefetch.index_resume, text, user_id, upload.sha256, name,
+                                            replaces or None)
+    finally:
+        os.unlink(tmp.name)
+    return {"resume_hash": upload.sha256, "user_id": user_id, "resume_id": stats["resume_id"], "index": stats}
+
+
+@app.get("/portfolio")
+async def get_portfolio(user_id: str = Depends(current_user)):
+    return {"user_id": user_id, "resumes": await asyncio.to_thread(portfolio.list_resumes, user_id)}
+
+
+@app.delete("/portfolio/{resume_id}")
+async def delete_resume(resume_id: str, user_id: str = Depends(current_user)):
+    """Remove a resume from the portfolio and delete its vectors (the upload itself stays)."""
+    if not await asyncio.to_thread(portfolio.remove_resume, user_id, resume_id):
+        raise HTTPException(404, "unknown resume_id")
+    return {"user_id": user_id, "resume_id": resume_id, "removed": True}
+
+
+@app.post("/generate")
+async def generate(req: GenerateRequest, request: Request, user_id: str = Depends(current_user)):
+    """Run the full pipeline for one JD; same result shape as run_cold_email."""
+    uploads = _resume_uploads(req)
+    trace_id = request.headers.get("x-request-id") or uuid.uuid4().hex[:16]
+
+    def run():
+        with metrics.trace(trace_id):
+            return run_cold_email(None, req.jd_text, req.recruiter_name, req.company_domain,
+                                  user_id=user_id, top_k=req.top_k, fused=req.fused, resumes=uploads)
+
+    async with requests_admission.slot():
+        return await asyncio.to_thread(run)
+
+
+@app.post("/batches", status_code=202)
+async def create_batch(req: BatchRequest, user_id: str = Depends(current_user)):
+    return await asyncio.to_thread(submit_batch, req, user_id)
+
+
+@app.get("/batches/{batch_id}")
+async def get_batch(batch_id: str, results: bool = False, user_id: str = Depends(current_user)):
+    return await asyncio.to_thread(batch_status, batch_id, user_id, results)
+
+
+@app.post("/send", status_code=202, dependencies=[Depends(current_user)])
+async def send(req: SendRequest):
+    """Queue an email for n8n; poll GET /outbox/{key} for delivery."""
+    if not (outbox.N8N_WEBHOOK_URL or outbox.N8N_WEBHOOK_BATCH_URL):
+        raise HTTPException(503, "N8N_WEBHOOK_URL is not configured")
+    key, created = await asyncio.to_thread(outbox.enqueue, req.model_dump())
+    return {"key": key, "created": created}
+
+
+@app.get("/outbox", dependencies=[Depends(current_user)])
+async def outbox_status():
+    return await asyncio.to_thread(outbox.status)
+
+
+@app.get("/outbox/{key}", dependencies=[Depends(current_user)])
+async def outbox_message(key: str):
+    message = await asyncio.to_thread(outbox.get_outbox().get, key)
+    if message is None:
+        raise HTTPException(404, "unknown outbox key")
+    return message
+
+
+@app.get("/healthz")
+async def healthz():
+    return {"status": "ok"}
+
+
+@app.get("/readyz")
+async def readyz():
+    state = readiness()
+    state["requests"] = {"active": requests_admission.active, "waiting": requests_admission.waiting}
+    return JSONResponse(state, status_code=200 if state["ready"] else 503)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    return PlainTextResponse(metrics.prometheus_text(), media_type="text/plain; version=0.0.4")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Cold Email Copilot HTTP API")
+    parser.add_argument("--host", default=os.environ.get("API_HOST", "127.0.0.1"))
+    parser.add_argument("--port", type=int, default=int(os.environ.get("API_PORT", "8000")))
+    args = parser.parse_args(argv)
+
+    import uvicorn
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
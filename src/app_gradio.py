@@ -1,24 +1,32 @@
 # src/app_gradio.py
 
+import argparse
+import hashlib
+import logging
 import os
-from pathlib import Path
+import re
+import threading
 import urllib.parse
-import requests
 
 import gradio as gr
 
-from .pdf_utils import extract_text_from_pdf
-from .embeddings_index import index_resume_text, retrieve_relevant_snippets
-from .hunter_client import find_recruiter_email
-from .openai_email import parse_jd, generate_cold_email
+from . import config  # noqa: F401  (first: loads .env before any module reads its settings)
+from . import metrics, outbox, prefetch
+from .lazy import format_startup_report
+from .pipeline import iter_cold_email
+from .upload_store import store_upload
+
+logger = logging.getLogger(__name__)
 
 # -----------------------------
 # Config & constants
 # -----------------------------
-UPLOAD_DIR = Path("uploads")
-UPLOAD_DIR.mkdir(exist_ok=True)
-
-N8N_WEBHOOK_URL = os.environ.get("N8N_WEBHOOK_URL", "").strip()
+# Generate runs at once (mostly waiting on OpenAI / Hunter / Pinecone);
+# CPU model inference is capped separately (EMBED_CONCURRENCY, RERANK_CONCURRENCY)
+GRADIO_CONCURRENCY = int(os.environ.get("GRADIO_CONCURRENCY", "8"))
+GRADIO_QUEUE_SIZE = int(os.environ.get("GRADIO_QUEUE_SIZE", "64"))
+# "alice:pw1,bob:pw2" enables login; each user then keeps one index across sessions
+GRADIO_AUTH = os.environ.get("GRADIO_AUTH", "").strip()
 
 
 # -----------------------------
@@ -39,9 +47,11 @@ def build_gmail_link(to: str, subject: str, body: str) -> str:
 
 def send_via_n8n(to: str, subject: str, body: str,
                  job_title: str, company: str, jd_url: str) -> str:
-    """Send the email + metadata to n8n webhook for sending/logging."""
-    if not N8N_WEBHOOK_URL:
+    """Queue the email + metadata for the n8n webhook (delivered in the background)."""
+    if not (outbox.N8N_WEBHOOK_URL or outbox.N8N_WEBHOOK_BATCH_URL):
         return "⚠️ N8N_WEBHOOK_URL is not set in .env"
+    if not to:
+        return "⚠️ No recruiter email to send to."
 
     payload = {
         "to": to,
@@ -53,13 +63,54 @@ def send_via_n8n(to: str, subject: str, body: str,
     }
 
     try:
-        resp = requests.post(N8N_WEBHOOK_URL, json=payload, timeout=10)
-        if resp.status_code in (200, 201, 204):
-            return "✅ Email sent via n8n and logged (check your Gmail / Sheet)."
-        else:
-            return f"⚠️ n8n responded with {resp.status_code}: {resp.text[:200]}"
+        key, created = outbox.enqueue(payload)
     except Exception as e:
-        return f"❌ Error calling n8n: {e}"
+        return f"❌ Could not queue the email: {e}"
+    if created:
+        msg = "📬 Email queued for n8n; it is sent in the background (check your Gmail / Sheet)."
+    else:
+        state = outbox.get_outbox().get(key) or {}
+        msg = f"ℹ️ This exact email is already in the outbox ({state.get('status', 'queued')}); not queued again."
+    return msg + "\n\n" + outbox_status_md()
+
+
+def outbox_status_md() -> str:
+    """One-line summary of the n8n outbox for the status bar."""
+    s = outbox.status()
+    line = (f"**Outbox:** {s['pending']} pending · {s['sending']} sending · "
+            f"{s['sent']} sent · {s['failed']} failed")
+    if s["oldest_pending_s"] is not None:
+        line += f" · oldest waiting {s['oldest_pending_s']:.0f}s"
+    return line
+
+
+def user_id_for(request) -> str:
+    """Whose resume index to use: the logged-in user, else this browser session."""
+    username = getattr(request, "username", None) if request is not None else None
+    if username:
+        slug = re.sub(r"[^A-Za-z0-9_.]", "_", username)[:40]
+        # the hash keeps "a.b@x" and "a.b_x" apart after slugging
+        return f"u_{slug}_{hashlib.sha256(username.encode('utf-8')).hexdigest()[:8]}"
+    session = getattr(request, "session_hash", None) if request is not None else None
+    return f"s_{session}" if session else "user1"
+
+
+def _as_list(resume_files) -> list:
+    if resume_files is None:
+        return []
+    return list(resume_files) if isinstance(resume_files, (list, tuple)) else [resume_files]
+
+
+def on_resume_upload(resume_files, request: gr.Request = None) -> None:
+    """Start extracting + indexing the resumes as soon as they're uploaded."""
+    user_id = user_id_for(request)
+    for f in _as_list(resume_files):
+        prefetch.speculate_resume(str(f), user_id)
+
+
+def on_jd_change(jd_text: str, request: gr.Request = None) -> None:
+    """Parse the JD in the background once the user stops typing."""
+    prefetch.speculate_jd(jd_text, user_id_for(request))
 
 
 def update_gmail_link(to: str, subject: str, body: str) -> str:
@@ -77,56 +128,54 @@ def send_via_n8n_handler(to: str, subject: str, body: str,
 # -----------------------------
 # Core pipeline
 # -----------------------------
-def cold_email_pipeline(resume_file, jd_text, recruiter_name, company_domain):
-    if resume_file is None:
-        # return 10 outputs (matching UI) even on error
-        msg = "⚠️ Please upload a resume first."
-        return msg, "", "", "", "", "", "", "", "", ""
-
-    # 1. Path to uploaded resume & extract text
-    resume_path = Path(str(resume_file))  # NamedString → path
-    dest = UPLOAD_DIR / resume_path.name
-    if resume_path != dest:
-        dest.write_bytes(resume_path.read_bytes())
-
-    resume_text = extract_text_from_pdf(str(dest))
-
-    # 2. (Optional) index resume in vector DB for this user
-    #    You can call this once per user; here it's demo-style
-    index_resume_text(resume_text, user_id="user1")
-
-    # 3. Parse JD with OpenAI
-    jd_info = parse_jd(jd_text or "")
-
-    # 4. Retrieve + rerank relevant resume snippets
-    snippets = retrieve_relevant_snippets(jd_text or "", user_id="user1", top_k=5)
-
-    # 5. Find recruiter email via Hunter
-    recruiter_email = None
-    if recruiter_name and company_domain:
-        recruiter_email = find_recruiter_email(recruiter_name, company_domain)
-
-    # 6. Generate cold email
-    subject, body = generate_cold_email(jd_info, snippets, recruiter_name, recruiter_email)
+def render_outputs(state: dict) -> tuple:
+    """Turn a pipeline snapshot into the 10 UI outputs (missing parts stay blank)."""
+    jd_info = state.get("jd_info")
+    snippets = state.get("snippets")
+    recruiter_email = state.get("recruiter_email")
+    subject, body = state.get("subject", ""), state.get("body", "")
 
     # For display
-    jd_summary = f"""**Role:** {jd_info.get('role_title', '')}
+    jd_summary = "_Parsing job description…_"
+    if jd_info is not None:
+        jd_summary = f"""**Role:** {jd_info.get('role_title', '')}
 **Company:** {jd_info.get('company_name', '')}
 **Location:** {jd_info.get('location', '')}
 **Top skills:** {', '.join(jd_info.get('top_skills', []))}
 """
-
-    snippets_md = "\n".join(f"- {s['text']}" for s in snippets) if snippets else "_No strong matches found in resume._"
-
-    email_info = f"**Recruiter email (from Hunter):** {recruiter_email or 'Not found'}"
+    if state.get("errors"):
+        jd_summary += "\n" + "\n".join(
+            f"⚠️ `{stage}`: {err}" for stage, err in state["errors"].items()
+        ) + "\n"
+
+    if snippets is None:
+        snippets_md = "_Matching resume snippets…_"
+    else:
+        snippets_md = "\n".join(f"- {s['text']}" for s in snippets) if snippets else "_No strong matches found in resume._"
+    ranking = state.get("resumes") or []
+    if len(ranking) > 1:
+        picked = ", ".join(f"**{r['name']}** ({r['score']:.2f})" for r in ranking if r["selected"])
+        others = ", ".join(f"{r['name']} ({r['score']:.2f})" for r in ranking if not r["selected"])
+        snippets_md = f"Best-fit resume: {picked}" + (f" · also scored: {others}" if others else "") \
+            + "\n\n" + snippets_md
+    saved = state.get("prompt_tokens", {}).get("saved", 0)
+    if state.get("done") and saved > 0:
+        snippets_md += f"\n\n_Prompt trimmed by {saved} tokens (boilerplate, duplicates, budgets)._"
+
+    if "hunter" in state.get("timings", {}):
+        email_info = f"**Recruiter email (from Hunter):** {recruiter_email or 'Not found'}"
+    else:
+        email_info = "_Looking up recruiter email…_"
 
     # Gmail link
-    gmail_link = build_gmail_link(recruiter_email or "", subject, body)
-    gmail_md = f"[✏️ Open this draft in Gmail]({gmail_link})"
+    gmail_md = ""
+    if state.get("done"):
+        gmail_link = build_gmail_link(recruiter_email or "", subject, body)
+        gmail_md = f"[✏️ Open this draft in Gmail]({gmail_link})"
 
     # Structured metadata for n8n
-    job_title = jd_info.get("role_title", "")
-    company = jd_info.get("company_name", "")
+    job_title = (jd_info or {}).get("role_title", "")
+    company = (jd_info or {}).get("company_name", "")
     jd_url = ""  # (optional) you can add a JD URL textbox later
 
     return (
@@ -143,6 +192,35 @@ def cold_email_pipeline(resume_file, jd_text, recruiter_name, company_domain):
     )
 
 
+def cold_email_pipeline(resume_files, jd_text, recruiter_name, company_domain,
+                        request: gr.Request = None):
+    """Generator: pushes partial results to the UI as each stage finishes,
+    then streams the subject/body while the email is being written.
+
+    Gradio fills in `request`; it picks the user's own vector namespace.
+    With several resumes uploaded, the one that fits the JD best is used.
+    """
+    resume_files = _as_list(resume_files)
+    if not resume_files:
+        # return 10 outputs (matching UI) even on error
+        msg = "⚠️ Please upload a resume first."
+        yield msg, "", "", "", "", "", "", "", "", ""
+        return
+
+    # 1. Store the uploads by content hash (identical files are kept once)
+    uploads = [store_upload(str(f)) for f in resume_files]  # NamedString → path
+    user_id = user_id_for(request)
+    prefetch.cancel_jd(user_id)  # the pipeline parses the JD itself now
+
+    # 2-6. Extract + index resumes, parse JD, pick the best-fit resume,
+    #      retrieve snippets, find the recruiter email (in parallel), then
+    #      stream the generated email.
+    #      Work started by the upload / JD-edit events below is joined, not redone.
+    for state in iter_cold_email(None, jd_text, recruiter_name, company_domain,
+                                 user_id=user_id, top_k=5, stream=True, resumes=uploads):
+        yield render_outputs(state)
+
+
 # -----------------------------
 # Custom CSS for "enterprise" UI
 # -----------------------------
@@ -264,8 +342,8 @@ Built with <b>Gradio</b> · <b>OpenAI</b> · <b>Pinecone</b> · <b>Hunter</b> ·
             gr.Markdown("#### Job & Recruiter Details")
 
             resume_file = gr.File(
-                label="Upload your resume (PDF)",
-                file_count="single",
+                label="Upload your resume(s) (PDF) — with several, the best fit per JD is used",
+                file_count="multiple",
             )
 
             jd_text = gr.Textbox(
@@ -342,9 +420,20 @@ Built with <b>Gradio</b> · <b>OpenAI</b> · <b>Pinecone</b> · <b>Hunter</b> ·
                     variant="secondary",
                     elem_classes="secondary-btn",
                 )
+                outbox_btn = gr.Button(
+                    "📬 Outbox status",
+                    variant="secondary",
+                    elem_classes="secondary-btn",
+                )
 
     # --- Wire up callbacks ---
 
+    # Speculative work: these handlers only schedule background jobs and return
+    resume_file.upload(on_resume_upload, inputs=[resume_file], outputs=None,
+                       queue=False, show_progress="hidden")
+    jd_text.change(on_jd_change, inputs=[jd_text], outputs=None,
+                   queue=False, show_progress="hidden")
+
     # Generate button
     run_btn.click(
         cold_email_pipeline,
@@ -384,6 +473,25 @@ Built with <b>Gradio</b> · <b>OpenAI</b> · <b>Pinecone</b> · <b>Hunter</b> ·
         outputs=[status_out],
     )
 
+    # Queue depth of the n8n outbox
+    outbox_btn.click(outbox_status_md, inputs=[], outputs=[status_out])
+
 
 if __name__ == "__main__":
-    demo.launch()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Cold Email Copilot UI")
+    parser.add_argument("--warmup", action="store_true",
+                        default=os.environ.get("WARMUP_ON_START", "").strip().lower() in ("1", "true", "yes"),
+                        help="load models/clients in the background right after startup")
+    args = parser.parse_args()
+
+    metrics.configure_logging()
+    metrics.serve_metrics()  # only when METRICS_PORT is set
+    outbox.start_worker()    # deliver anything queued before a restart
+    logger.info("%s", format_startup_report())
+    if args.warmup:
+        from .startup import warmup
+        threading.Thread(target=warmup, name="warmup", daemon=True).start()
+
+    auth = [tuple(pair.split(":", 1)) for pair in GRADIO_AUTH.split(",") if ":" in pair]
+    demo.queue(default_concurrency_limit=GRADIO_CONCURRENCY, max_size=GRADIO_QUEUE_SIZE)
+    demo.launch(auth=auth or None)
\ No newline at end of file
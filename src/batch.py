@@ -0,0 +1,264 @@
+# src/batch.py
+"""Headless batch mode: one resume (or a portfolio of them), many jobs.
+
+    python -m src.batch --resume resume.pdf --jobs jobs.csv --out results.jsonl
+    python -m src.batch --resume backend.pdf ml.pdf data.pdf --jobs jobs.csv --out results.jsonl
+
+Each input row (CSV or JSONL) needs `jd_text` or `jd_file`, plus optional
+`recruiter_name`, `company_domain` (or `domain`) and `job_id`. Each resume
+is extracted and indexed once, every JD is embedded in a single encode
+call, and with several resumes every JD is matched to its best resume in
+one matrix multiply (see portfolio.py) before retrieval. The OpenAI / Hunter calls fan out over a bounded worker pool with
+per-service rate limits. Results are appended to the output JSONL as they
+finish; re-running with the same output skips jobs that already succeeded,
+so a crash never re-spends API calls on finished work. With --send each
+finished email also goes into the n8n outbox (see outbox.py), which is
+drained in the background and flushed before exit.
+"""
+import argparse
+import csv
+import hashlib
+import json
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Union
+
+from . import config  # noqa: F401  (first: loads .env before any module reads its settings)
+from . import metrics, outbox, portfolio, prompt_budget
+from .pdf_utils import extract_text_from_pdf, file_sha256
+from .embeddings_index import embed_texts
+from .hunter_client import find_recruiter_email
+from .openai_email import LLM_FUSED, parse_jd, generate_cold_email, generate_fused
+from .http_transport import get_transport
+from .rate_limit import TokenBucket
+
+logger = logging.getLogger(__name__)
+
+
+# -----------------------------
+# Input / checkpoint
+# -----------------------------
+def _iter_rows(jobs_path: Path) -> Iterator[Dict]:
+    if jobs_path.suffix.lower() in (".jsonl", ".ndjson"):
+        with jobs_path.open(encoding="utf-8") as f:
+            for line in f:
+                line = line.strip()
+                if line:
+                    yield json.loads(line)
+    else:
+        with jobs_path.open(newline="", encoding="utf-8") as f:
+            yield from csv.DictReader(f)
+
+
+def load_jobs(jobs_path: Path) -> List[Dict]:
+    """Normalize input rows into {job_id, jd_text, recruiter_name, company_domain}."""
+    jobs = []
+    for n, row in enumerate(_iter_rows(jobs_path), start=1):
+        jd_text = (row.get("jd_text") or "").strip()
+        if not jd_text and row.get("jd_file"):
+            jd_path = Path(row["jd_file"])
+            if not jd_path.is_absolute():
+                jd_path = jobs_path.parent / jd_path
+            jd_text = jd_path.read_text(encoding="utf-8")
+        if not jd_text:
+            logger.warning("Row %d: no jd_text / jd_file – skipping", n)
+            continue
+
+        name = (row.get("recruiter_name") or "").strip()
+        domain = (row.get("company_domain") or row.get("domain") or "").strip()
+        job_id = (row.get("job_id") or "").strip() or hashlib.sha256(
+            "\x1f".join([jd_text, name.lower(), domain.lower()]).encode("utf-8")
+        ).hexdigest()[:16]
+        jobs.append({"job_id": job_id, "jd_text": jd_text,
+                     "recruiter_name": name, "company_domain": domain})
+    return jobs
+
+
+def load_checkpoint(out_path: Path) -> Set[str]:
+    """Job IDs that already have a successful result in the output file."""
+    done = set()
+    if not out_path.exists():
+        return done
+    with out_path.open(encoding="utf-8") as f:
+        for line in f:
+            try:
+                rec = json.loads(line)
+            except ValueError:
+                continue  # torn last line from a crash
+            if rec.get("status") == "ok":
+                done.add(rec.get("job_id"))
+    return done
+
+
+# -----------------------------
+# Worker
+# -----------------------------
+def process_job(job: Dict, prepared: Dict, jd_emb, user_id: str, top_k: int,
+                openai_bucket: TokenBucket, resumes: List[Dict]) -> Dict:
+    """`prepared` is prompt_budget.prepare_jd(job["jd_text"]): the JD as the model sees it;
+    `resumes` is this JD's portfolio ranking (portfolio.select_resumes)."""
+    started = time.perf_counter()
+    jd_text = prepared["text"]
+
+    with metrics.trace(job["job_id"]), metrics.span("request.batch_job"):
+        if not LLM_FUSED:
+            openai_bucket.acquire()
+            with metrics.span("stage.parse_jd"):
+                jd_info = parse_jd(jd_text)
+
+        with metrics.span("stage.retrieve"):
+            skills = None if LLM_FUSED else jd_info.get("top_skills")
+            snippets = portfolio.retrieve(user_id, [r["resume_id"] for r in resumes if r["selected"]],
+                                          jd_text, top_k=top_k, jd_emb=jd_emb, skills=skills)
+            fitted = prompt_budget.fit_snippets(snippets)
+            snippets = fitted["snippets"]
+
+        recruiter_email = None
+        if job["recruiter_name"] and job["company_domain"]:
+            # Hunter calls are rate limited per HTTP request by the shared transport
+            with metrics.span("stage.hunter"):
+                recruiter_email = find_recruiter_email(job["recruiter_name"], job["company_domain"])
+
+        openai_bucket.acquire()
+        with metrics.span("stage.generate"):
+            if LLM_FUSED:
+                # one structured call parses the JD and writes the email
+                jd_info, subject, body = generate_fused(jd_text, snippets, job["recruiter_name"],
+                                                        recruiter_email)
+            else:
+                subject, body = generate_cold_email(jd_info, snippets, job["recruiter_name"], recruiter_email)
+
+    return {
+        "job_id": job["job_id"],
+        "status": "ok",
+        "recruiter_name": job["recruiter_name"],
+        "company_domain": job["company_domain"],
+        "recruiter_email": recruiter_email,
+        "jd_info": jd_info,
+        "resume": next(r["name"] for r in resumes if r["selected"]),
+        "resumes": resumes,
+        "snippets": snippets,
+        "subject": subject,
+        "body": body,
+        "prompt_tokens": prompt_budget.summarize(prepared, fitted),
+        "elapsed": round(time.perf_counter() - started, 3),
+    }
+
+
+def _enqueue(rec: Dict, user_id: str) -> Optional[str]:
+    """Queue the record's email; keyed by job and recipient, not by content.
+
+    A rerun regenerates the email, and with sampling the text differs, so a
+    payload-hash key would queue it again if the process died after
+    enqueueing but before the result line was written.
+    """
+    if not rec.get("recruiter_email"):
+        return None
+    key = outbox.payload_key({"user_id": user_id, "job_id": rec["job_id"], "to": rec["recruiter_email"]})
+    key, _ = outbox.enqueue({
+        "to": rec["recruiter_email"],
+        "subject": rec["subject"],
+        "body": rec["body"],
+        "job_title": rec["jd_info"].get("role_title", ""),
+        "company": rec["jd_info"].get("company_name", ""),
+        "jd_url": "",
+    }, key=key)
+    return key
+
+
+def run_batch(resume_path: Union[str, Sequence[str]], jobs_path: str, out_path: str, user_id: str = "user1",
+              workers: int = 4, top_k: int = 5,
+              openai_rps: float = 2.0, hunter_rps: Optional[float] = None,
+              send: bool = False) -> Dict[str, int]:
+    jobs_path, out_path = Path(jobs_path), Path(out_path)
+
+    jobs = load_jobs(jobs_path)
+    done = load_checkpoint(out_path)
+    todo = [j for j in jobs if j["job_id"] not in done]
+    logger.info("%d jobs, %d already done, %d to run", len(jobs), len(jobs) - len(todo), len(todo))
+    if not todo:
+        return {"total": len(jobs), "skipped": len(jobs), "ok": 0, "error": 0}
+
+    # resumes: extract + index once for the whole run
+    resume_ids = []
+    for path in ([resume_path] if isinstance(resume_path, (str, Path)) else resume_path):
+        resume_hash = file_sha256(path)
+        resume_ids.append(portfolio.add_resume(user_id, extract_text_from_pdf(path, file_hash=resume_hash),
+                                               resume_hash, name=portfolio.name_for(path, resume_hash))["resume_id"])
+
+    # strip boilerplate first so it's neither embedded nor sent to the model
+    prepared = [prompt_budget.prepare_jd(j["jd_text"]) for j in todo]
+    # one forward pass for every JD (only those not already in the embedding cache)
+    jd_embs = embed_texts([p["text"] for p in prepared])
+    # every JD against every resume in one multiply (keywords from the JD text;
+    # parsed skills only exist once the workers have run parse_jd)
+    selections = portfolio.select_resumes(user_id, resume_ids, jd_embs, [p["text"] for p in prepared])
+
+    openai_bucket = TokenBucket(openai_rps)
+    if hunter_rps is not None:  # otherwise the transport's HUNTER_RPS applies
+        get_transport("hunter").bucket = TokenBucket(hunter_rps)
+    write_lock = threading.Lock()
+    counts = {"total": len(jobs), "skipped": len(jobs) - len(todo), "ok": 0, "error": 0}
+
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    with out_path.open("a", encoding="utf-8") as out, \
+            ThreadPoolExecutor(max_workers=max(1, workers), thread_name_prefix="batch") as pool:
+        futures = {
+            pool.submit(process_job, job, prep, emb, user_id, top_k, openai_bucket, sel): job
+            for job, prep, emb, sel in zip(todo, prepared, jd_embs, selections)
+        }
+        for fut in as_completed(futures):
+            job = futures[fut]
+            try:
+                rec = fut.result()
+            except Exception as e:
+                rec = {"job_id": job["job_id"], "status": "error", "error": f"{type(e).__name__}: {e}"}
+            counts[rec["status"]] += 1
+            if send and rec["status"] == "ok":
+                rec["outbox_key"] = _enqueue(rec, user_id)
+            with write_lock:
+                out.write(json.dumps(rec, ensure_ascii=False) + "\n")
+                out.flush()
+            log = logger.info if rec["status"] == "ok" else logger.warning
+            log("%s: %s (%d/%d)%s", job["job_id"], rec["status"], counts["ok"] + counts["error"], len(todo),
+                f" {rec['error']}" if rec.get("error") else "")
+
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Generate cold emails for a CSV/JSONL of jobs.")
+    parser.add_argument("--resume", required=True, nargs="+",
+                        help="resume PDF, or several: each JD then uses the best-matching one")
+    parser.add_argument("--jobs", required=True, help="CSV or JSONL with jd_text/jd_file, recruiter_name, company_domain")
+    parser.add_argument("--out", required=True, help="output JSONL (also the resume checkpoint)")
+    parser.add_argument("--user-id", default="user1")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--top-k", type=int, default=5)
+    parser.add_argument("--openai-rps", type=float, default=2.0, help="OpenAI requests/second (0 = unlimited)")
+    parser.add_argument("--hunter-rps", type=float, default=None,
+                        help="Hunter requests/second (0 = unlimited; default: HUNTER_RPS)")
+    parser.add_argument("--send", action="store_true", help="queue every email with a recruiter address for n8n")
+    parser.add_argument("--send-timeout", type=float, default=600.0,
+                        help="seconds to wait for the outbox to drain before exiting (queued mail survives a restart)")
+    parser.add_argument("--metrics-out", help="write Prometheus text metrics here when done")
+    args = parser.parse_args(argv)
+
+    metrics.configure_logging()
+
+    counts = run_batch(args.resume, args.jobs, args.out, user_id=args.user_id,
+                       workers=args.workers, top_k=args.top_k,
+                       openai_rps=args.openai_rps, hunter_rps=args.hunter_rps, send=args.send)
+    if args.send:
+        counts["outbox"] = outbox.drain(timeout=args.send_timeout)
+    metrics.log_snapshot("batch metrics")
+    if args.metrics_out:
+        Path(args.metrics_out).write_text(metrics.prometheus_text())
+    print(json.dumps(counts))  # the run's summary, for scripts; everything else goes to the log
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+# src/bm25.py
+"""In-memory BM25 over a user's resume chunks, plus reciprocal-rank fusion.
+
+Dense MiniLM similarity is good at paraphrases but weak on exact tokens
+(framework names, acronyms like "k8s" or "CI/CD"); a small inverted index
+catches those. The tokenizer keeps "c++", "c#", "node.js" and "k8s" whole.
+
+    index = BM25Index(ids, texts)
+    index.search({"python": 1.0, "kafka": 3.0}, top_k=10)   # [(id, score)]
+    reciprocal_rank_fusion([dense_ids, lexical_ids], weights=[1.0, 1.0])
+"""
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+K1 = 1.5
+B = 0.75
+RRF_K = 60  # the usual constant: damps the weight of the very top ranks
+
+_TOKEN_RE = re.compile(r"[a-z0-9][a-z0-9+#.]*[a-z0-9+#]|[a-z0-9]")
+
+# too common in resumes / JDs to say anything about a match
+STOPWORDS = frozenset("""
+a an and are as at be by for from has have in is it its of on or our that the this to
+was were will with you your we i my me us they their them he she his her not but
+""".split())
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN_RE.findall((text or "").lower()) if t not in STOPWORDS]
+
+
+class BM25Index:
+    """Okapi BM25 over a fixed set of documents (rebuilt, not updated, on change)."""
+
+    def __init__(self, ids: Sequence[str], texts: Sequence[str], k1: float = K1, b: float = B):
+        self.ids = list(ids)
+        self.texts = list(texts)
+        self.k1 = k1
+        self.b = b
+        self.postings: Dict[str, List[Tuple[int, int]]] = {}  # term -> [(doc, tf)]
+        self.doc_len: List[int] = []
+        for doc, text in enumerate(self.texts):
+            counts = Counter(tokenize(text))
+            self.doc_len.append(sum(counts.values()))
+            for term, tf in counts.items():
+                self.postings.setdefault(term, []).append((doc, tf))
+        n = len(self.ids)
+        self.avgdl = (sum(self.doc_len) / n) if n else 0.0
+        # Lucene-style idf: never negative, even for terms in most chunks
+        self.idf = {t: math.log(1 + (n - len(p) + 0.5) / (len(p) + 0.5)) for t, p in self.postings.items()}
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def search(self, query: Union[str, Dict[str, float]], top_k: int = 10) -> List[Tuple[str, float]]:
+        """Best `top_k` (id, score) for a query string or {term: weight} mapping."""
+        terms = Counter(tokenize(query)) if isinstance(query, str) else query
+        scores: Dict[int, float] = {}
+        for term, weight in terms.items():
+            postings = self.postings.get(term)
+            if not postings or weight <= 0:
+                continue
+            idf = self.idf[term] * weight
+            for doc, tf in postings:
+                norm = tf + self.k1 * (1 - self.b + self.b * self.doc_len[doc] / (self.avgdl or 1.0))
+                scores[doc] = scores.get(doc, 0.0) + idf * tf * (self.k1 + 1) / norm
+        ranked = sorted(scores.items(), key=lambda x: x[1], reverse=True)[:top_k]
+        return [(self.ids[doc], score) for doc, score in ranked]
+
+
+def weighted_query(text: str, boost_terms: Iterable[str] = (), boost: float = 3.0) -> Dict[str, float]:
+    """Term weights for `text`, with every token of `boost_terms` counted `boost` times more.
+
+    Boost terms that don't occur in `text` are added, so parsed skills
+    match even when the JD spells them differently.
+    """
+    weights: Dict[str, float] = dict(Counter(tokenize(text)))
+    for term in {t for phrase in boost_terms for t in tokenize(phrase)}:
+        weights[term] = weights.get(term, 1.0) * boost
+    return weights
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[str]], weights: Optional[Sequence[float]] = None,
+                           k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked id lists: score(id) = sum of weight / (k + rank), rank from 1."""
+    weights = weights or [1.0] * len(rankings)
+    fused: Dict[str, float] = {}
+    for ranking, weight in zip(rankings, weights):
+        for rank, item in enumerate(ranking, start=1):
+            fused[item] = fused.get(item, 0.0) + weight / (k + rank)
+    return sorted(fused.items(), key=lambda x: x[1], reverse=True)
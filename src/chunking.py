@@ -0,0 +1,244 @@
+# src/chunking.py
+"""Token-aware, section-aware resume chunking.
+
+all-MiniLM-L6-v2 only embeds the first 256 word-piece tokens of a text, so
+chunks are measured with the embedding model's own tokenizer and packed up
+to that budget. Boundaries follow resume structure instead of a word
+window: section headings start a new chunk (small sections are packed
+together), bullets and job entries are
+never split unless a single one is longer than the budget, and a chunk that
+continues a job entry is prefixed with that entry's header for context.
+No overlap is needed, so every chunk is fully embedded and none repeat.
+"""
+import logging
+import math
+import os
+import re
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from .config import EMBED_MODEL_NAME
+from .lazy import Lazy
+
+logger = logging.getLogger(__name__)
+
+# 256 positions minus [CLS] / [SEP]
+CHUNK_MAX_TOKENS = int(os.environ.get("CHUNK_MAX_TOKENS", "254"))
+
+SECTION_NAMES = {
+    "summary", "professional summary", "profile", "objective", "about me",
+    "experience", "work experience", "professional experience", "employment", "employment history",
+    "work history", "relevant experience", "research experience", "internships", "internship experience",
+    "education", "academic background", "skills", "technical skills", "core skills", "core competencies",
+    "technologies", "tools", "projects", "academic projects", "personal projects", "selected projects",
+    "certifications", "certificates", "licenses", "publications", "awards", "honors", "honors & awards",
+    "achievements", "leadership", "activities", "extracurricular activities", "volunteer", "volunteering",
+    "volunteer experience", "languages", "interests", "coursework", "relevant coursework", "references",
+}
+
+_BULLET_RE = re.compile(r"^\s*(?:[•▪◦●○■□➢➤►✓\-\*–—·]|\d{1,2}[.)])\s+")
+_MONTH = r"(?:jan|feb|mar|apr|may|jun|jul|aug|sep|sept|oct|nov|dec)[a-z]*\.?"
+_DATE = rf"(?:{_MONTH}\s*)?(?:\d{{1,2}}/)?(?:19|20)\d{{2}}"
+_DATE_RANGE_RE = re.compile(rf"{_DATE}\s*(?:-|–|—|to)\s*(?:{_DATE}|present|current|now)", re.I)
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+
+
+# -----------------------------
+# Token counting
+# -----------------------------
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(EMBED_MODEL_NAME)
+
+
+tokenizer = Lazy("embed_tokenizer", _load_tokenizer)
+
+
+def _approx_tokens(text: str) -> int:
+    # word-piece ≈ one token per word/punctuation mark, plus extra for long words
+    pieces = re.findall(r"\w+|[^\w\s]", text)
+    return sum(1 + max(0, len(p) - 6) // 4 for p in pieces)
+
+
+_tokenizer_unavailable = False
+
+
+def count_tokens(text: str) -> int:
+    """Tokens the embedding model sees for `text` (without special tokens).
+
+    Falls back to an estimate if the tokenizer can't be loaded (e.g. offline
+    without a cached model).
+    """
+    global _tokenizer_unavailable
+    if not _tokenizer_unavailable:
+        try:
+            tok = tokenizer.get()
+        except Exception as e:
+            logger.warning("Tokenizer unavailable, estimating token counts: %s", e)
+            _tokenizer_unavailable = True
+        else:
+            return len(tok(text, add_special_tokens=False)["input_ids"])
+    return _approx_tokens(text)
+
+
+# -----------------------------
+# Structure
+# -----------------------------
+def _is_heading(line: str) -> bool:
+    s = line.strip().rstrip(":").strip()
+    if not s or len(s.split()) > 5 or _BULLET_RE.match(line):
+        return False
+    if s.lower() in SECTION_NAMES:
+        return True
+    letters = [c for c in s if c.isalpha()]
+    return len(letters) >= 3 and s.isupper() and not _DATE_RANGE_RE.search(s)
+
+
+def _is_entry_header(line: str) -> bool:
+    """A job / education entry line: has a date range and isn't a bullet."""
+    return bool(_DATE_RANGE_RE.search(line)) and not _BULLET_RE.match(line) and len(line.split()) <= 20
+
+
+def iter_units(text: str) -> Iterator[Tuple[str, str, str, bool]]:
+    """Yield (section, entry header, unit text, is_entry_header) in order.
+
+    A unit is one bullet, one entry header line, or one paragraph; wrapped
+    continuation lines (common in PDF text) are joined onto the unit above.
+    """
+    section, entry = "", ""
+    current: List[str] = []
+
+    def flush():
+        if current:
+            unit = " ".join(current)
+            current.clear()
+            return unit
+        return None
+
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            unit = flush()
+            if unit:
+                yield section, entry, unit, False
+            continue
+
+        if _is_heading(line):
+            unit = flush()
+            if unit:
+                yield section, entry, unit, False
+            section, entry = line.rstrip(":").strip(), ""
+        elif _is_entry_header(line):
+            unit = flush()
+            if unit:
+                yield section, entry, unit, False
+            entry = line
+            yield section, entry, line, True
+        elif _BULLET_RE.match(line):
+            unit = flush()
+            if unit:
+                yield section, entry, unit, False
+            current.append("• " + _BULLET_RE.sub("", line, count=1))
+        else:
+            current.append(line)
+
+    unit = flush()
+    if unit:
+        yield section, entry, unit, False
+
+
+def _split_long(unit: str, budget: int, count: Callable[[str], int]) -> Iterator[str]:
+    """Break an over-long unit at sentence boundaries, then by words."""
+    pieces: List[str] = []
+    for sentence in _SENTENCE_RE.split(unit):
+        if count(sentence) <= budget:
+            pieces.append(sentence)
+            continue
+        words = sentence.split()
+        # start from the average words-per-token and shrink until it fits
+        step = max(1, math.floor(len(words) * budget / max(1, count(sentence))))
+        i = 0
+        while i < len(words):
+            n = step
+            while n > 1 and count(" ".join(words[i:i + n])) > budget:
+                n = max(1, n * 3 // 4)
+            pieces.append(" ".join(words[i:i + n]))
+            i += n
+
+    buf, used = [], 0
+    for piece in pieces:
+        t = count(piece)
+        if buf and used + t > budget:
+            yield " ".join(buf)
+            buf, used = [], 0
+        buf.append(piece)
+        used += t
+    if buf:
+        yield " ".join(buf)
+
+
+# -----------------------------
+# Packing
+# -----------------------------
+def iter_chunks(text: str, max_tokens: int = CHUNK_MAX_TOKENS,
+                count: Optional[Callable[[str], int]] = None,
+                min_tokens: int = None) -> Iterator[str]:
+    """Lazily yield resume chunks of at most `max_tokens` model tokens.
+
+    A new section starts a new chunk unless the current one is still
+    smaller than `min_tokens` (default: a quarter of the budget).
+    """
+    if min_tokens is None:
+        min_tokens = max_tokens // 4
+    count = count or count_tokens
+    buf: List[str] = []
+    used = 0
+    section_of_buf = None
+
+    for section, entry, unit, is_header in iter_units(text):
+        if buf and section != section_of_buf:
+            if used >= min_tokens:
+                yield "\n".join(buf)
+                buf, used = [], 0
+            else:
+                # tiny section (contact line, one-line summary): keep packing
+                buf.append(section)
+                used += count(section)
+                section_of_buf = section
+
+        t = count(unit)
+        if buf and used + t > max_tokens:
+            yield "\n".join(buf)
+            buf, used = [], 0
+
+        if not buf:
+            # new chunk: lead with section (+ entry header when continuing an entry)
+            section_of_buf = section
+            parts = [section] if section else []
+            if entry and not is_header:
+                parts.append(entry)
+            ctx = " | ".join(parts)
+            ctx_tokens = count(ctx) if ctx else 0
+            while parts and max_tokens - ctx_tokens < 16:
+                # context would crowd out the content: drop the entry header, then the section
+                parts.pop()
+                ctx = " | ".join(parts)
+                ctx_tokens = count(ctx) if ctx else 0
+
+            room = max(1, max_tokens - ctx_tokens)
+            if t > room:
+                for piece in _split_long(unit, room, count):
+                    yield f"{ctx}\n{piece}" if ctx else piece
+                continue
+            if ctx:
+                buf.append(ctx)
+            used = ctx_tokens
+
+        buf.append(unit)
+        used += t
+
+    if buf:
+        yield "\n".join(buf)
+
+
+def chunk_text(text: str, max_tokens: int = CHUNK_MAX_TOKENS) -> List[str]:
+    return list(iter_chunks(text, max_tokens=max_tokens))
@@ -1,32 +1,107 @@
 # src/config.py
+"""Settings from the environment plus lazy OpenAI / Pinecone clients.
+
+Importing this module never touches the network or requires credentials;
+clients are built (and keys checked) the first time they're used.
+"""
+import hashlib
+import json
 import os
+from pathlib import Path
 from dotenv import load_dotenv
-from openai import OpenAI
-from pinecone import Pinecone, ServerlessSpec
+
+from .lazy import Lazy
 
 load_dotenv()
 
-OPENAI_API_KEY = os.environ["OPENAI_API_KEY"]
-PINECONE_API_KEY = os.environ["PINECONE_API_KEY"]
+OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY", "")
+PINECONE_API_KEY = os.environ.get("PINECONE_API_KEY", "")
 PINECONE_INDEX_NAME = os.environ.get("PINECONE_INDEX_NAME", "cold-email-copilot")
 PINECONE_CLOUD = os.environ.get("PINECONE_CLOUD", "aws")
 PINECONE_REGION = os.environ.get("PINECONE_REGION", "us-east-1")
+# one Pinecone namespace per user (set to 0 for the old shared namespace + user_id filter)
+PINECONE_NAMESPACES = os.environ.get("PINECONE_NAMESPACES", "1").strip().lower() not in ("0", "false", "no")
+
+# "pinecone" (remote) or "local" (in-process NumPy store under LOCAL_VECTOR_DIR)
+VECTOR_STORE_BACKEND = os.environ.get("VECTOR_STORE_BACKEND", "pinecone").strip().lower()
+LOCAL_VECTOR_DIR = Path(os.environ.get("LOCAL_VECTOR_DIR", "vector_store"))
+EMBED_MODEL_NAME = "sentence-transformers/all-MiniLM-L6-v2"
+EMBEDDING_DIM = 384  # all-MiniLM-L6-v2
 
 HUNTER_API_KEY = os.environ.get("HUNTER_API_KEY")
 
+
+# Per-user file names
+def _sanitize(key: str) -> str:
+    return "".join(c if c.isalnum() or c in "-_." else "_" for c in key)
+
+
+def safe_key(key: str) -> str:
+    """File / directory name for a user or index key.
+
+    Readable prefix plus a hash of the raw key, so keys that sanitize alike
+    ("a/b" and "a_b") still get their own files.
+    """
+    return f"{_sanitize(key)[:64]}-{hashlib.sha256(key.encode()).hexdigest()[:12]}"
+
+
+def legacy_key(key: str) -> str:
+    """The name files had before `safe_key` (sanitized only)."""
+    return _sanitize(key)
+
+
+def keyed_json_path(directory: Path, key: str) -> Path:
+    """`directory/<safe_key>.json`, taking over an older `<legacy_key>.json` whose "user_id" is `key`."""
+    path = directory / f"{safe_key(key)}.json"
+    if not path.exists():
+        legacy = directory / f"{legacy_key(key)}.json"
+        try:
+            if json.loads(legacy.read_text()).get("user_id") == key:
+                legacy.replace(path)
+        except (OSError, ValueError, AttributeError):
+            pass  # none, unreadable, or another key's file that sanitized the same
+    return path
+
+
 # OpenAI client
-openai_client = OpenAI(api_key=OPENAI_API_KEY)
+def _make_openai_client():
+    from openai import OpenAI
+
+    if not OPENAI_API_KEY:
+        raise RuntimeError("OPENAI_API_KEY is not set")
+    return OpenAI(api_key=OPENAI_API_KEY)
+
+
+openai_client = Lazy("openai_client", _make_openai_client)
+
+
+def get_openai_client():
+    return openai_client.get()
+
+
+# Pinecone client + index (only created when the Pinecone backend is used)
+def _make_pinecone_index():
+    from pinecone import Pinecone, ServerlessSpec
+
+    if not PINECONE_API_KEY:
+        raise RuntimeError("PINECONE_API_KEY is not set (or use VECTOR_STORE_BACKEND=local)")
+
+    pc = Pinecone(api_key=PINECONE_API_KEY)
+
+    # create index if not exists
+    if PINECONE_INDEX_NAME not in [ix["name"] for ix in pc.list_indexes()]:
+        pc.create_index(
+            name=PINECONE_INDEX_NAME,
+            dimension=EMBEDDING_DIM,
+            metric="cosine",
+            spec=ServerlessSpec(cloud=PINECONE_CLOUD, region=PINECONE_REGION)
+        )
+
+    return pc.Index(PINECONE_INDEX_NAME)
+
 
-# Pinecone client + index
-pc = Pinecone(api_key=PINECONE_API_KEY)
+pinecone_index = Lazy("pinecone_index", _make_pinecone_index)
 
-# create index if not exists
-if PINECONE_INDEX_NAME not in [ix["name"] for ix in pc.list_indexes()]:
-    pc.create_index(
-        name=PINECONE_INDEX_NAME,
-        dimension=384,        # all-MiniLM-L6-v2
-        metric="cosine",
-        spec=ServerlessSpec(cloud=PINECONE_CLOUD, region=PINECONE_REGION)
-    )
 
-pinecone_index = pc.Index(PINECONE_INDEX_NAME)
\ No newline at end of file
+def get_pinecone_index():
+    return pinecone_index.get()
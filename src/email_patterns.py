@@ -0,0 +1,111 @@
+# src/email_patterns.py
+"""Infer a company's email pattern from Hunter Domain Search data.
+
+Given the addresses Hunter already returned for a domain (with first/last
+names), we learn which template the company uses — `{first}.{last}`,
+`{f}{last}`, `{first}`, ... — with a confidence score, and synthesize an
+address for a new recruiter locally instead of calling Hunter again.
+Templates use Hunter's own placeholder syntax.
+"""
+import os
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, List, Optional
+
+# Most common corporate formats first (ties go to the earlier one)
+PATTERNS = [
+    "{first}.{last}",
+    "{f}{last}",
+    "{first}",
+    "{first}{last}",
+    "{first}_{last}",
+    "{f}.{last}",
+    "{first}{l}",
+    "{first}.{l}",
+    "{first}-{last}",
+    "{last}.{first}",
+    "{last}{f}",
+    "{last}{first}",
+    "{last}",
+]
+
+EMAIL_PATTERN_MIN_CONFIDENCE = float(os.environ.get("EMAIL_PATTERN_MIN_CONFIDENCE", "0.75"))
+
+
+def _ascii_token(s: str) -> str:
+    """'José' -> 'jose', "O'Brien" -> 'obrien'."""
+    s = unicodedata.normalize("NFKD", s or "").encode("ascii", "ignore").decode("ascii")
+    return re.sub(r"[^a-z0-9]", "", s.lower())
+
+
+def _name_parts(first: str, last: str) -> Dict[str, str]:
+    # multi-part surnames ("van der Berg", "Garcia-Lopez") are joined into one token
+    first = _ascii_token(first)
+    last = _ascii_token(last)
+    return {"first": first, "last": last, "f": first[:1], "l": last[:1]}
+
+
+def render(pattern: str, first: str, last: str) -> Optional[str]:
+    """Local part for this name, or None if the pattern needs a missing piece."""
+    parts = _name_parts(first, last)
+    for key, value in parts.items():
+        if "{" + key + "}" in pattern and not value:
+            return None
+    return pattern.format(**parts)
+
+
+def learn_pattern(emails: List[Dict], hunter_pattern: Optional[str] = None) -> Optional[Dict]:
+    """Find the dominant pattern in Domain Search `emails`.
+
+    Returns {"pattern", "confidence", "samples"} or None. Confidence is the
+    Laplace-smoothed share of named addresses the pattern explains, so a
+    single matching sample never looks certain. Hunter's own `pattern`
+    field, when present, counts as one extra vote.
+    """
+    votes = Counter()
+    samples = 0
+    for e in emails:
+        value = (e.get("value") or "").lower()
+        if "@" not in value:
+            continue
+        local = value.split("@", 1)[0]
+        first, last = e.get("first_name") or "", e.get("last_name") or ""
+        if not _ascii_token(first):
+            continue  # role inboxes (jobs@, hr@) say nothing about the pattern
+        samples += 1
+        for pattern in PATTERNS:
+            if render(pattern, first, last) == local:
+                votes[pattern] += 1
+
+    if hunter_pattern in PATTERNS:
+        votes[hunter_pattern] += 1
+        samples += 1
+
+    if not votes:
+        return None
+
+    best = max(PATTERNS, key=lambda p: (votes[p], -PATTERNS.index(p)))
+    confidence = (votes[best] + 1) / (samples + 2)
+    return {"pattern": best, "confidence": round(confidence, 3), "samples": samples}
+
+
+def synthesize_email(first: str, last: str, domain: str, pattern: str) -> Optional[str]:
+    local = render(pattern, first, last)
+    if not local:
+        return None
+    return f"{local}@{domain.strip().lower()}"
+
+
+def guess_email(first: str, last: str, domain: str, domain_data: Optional[Dict],
+                min_confidence: float = None) -> Optional[str]:
+    """Synthesize an address from cached Domain Search data if we're confident enough."""
+    if not domain_data:
+        return None
+    learned = learn_pattern(domain_data.get("emails") or [], domain_data.get("pattern"))
+    if learned is None:
+        return None
+    threshold = EMAIL_PATTERN_MIN_CONFIDENCE if min_confidence is None else min_confidence
+    if learned["confidence"] < threshold:
+        return None
+    return synthesize_email(first, last, domain, learned["pattern"])
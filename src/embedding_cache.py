@@ -0,0 +1,156 @@
+# src/embedding_cache.py
+"""Persistent embedding cache keyed by (model name, text hash).
+
+Per model, under EMBEDDING_CACHE_DIR/<model>/:
+  vectors.f32  append-only float32 rows, read through a memory map
+  index.tsv    append-only "<text hash>\\t<row>" lines
+
+`encode_cached()` looks every text up and runs the model only on the
+misses (in one batch), so re-indexing a lightly edited resume or
+re-querying a known JD skips the transformer forward pass.
+"""
+import hashlib
+import os
+import threading
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+
+try:
+    import fcntl  # cross-process append lock (POSIX only)
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+EMBEDDING_CACHE_DIR = Path(os.environ.get("EMBEDDING_CACHE_DIR", "cache/embeddings"))
+EMBEDDING_CACHE_DISABLED = os.environ.get("EMBEDDING_CACHE_DISABLED", "").strip().lower() in ("1", "true", "yes")
+
+
+def text_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+
+
+class EmbeddingCache:
+    def __init__(self, model_name: str, dim: int, root: Path = EMBEDDING_CACHE_DIR):
+        safe = "".join(c if c.isalnum() or c in "-_." else "_" for c in model_name)
+        self.dir = Path(root) / safe
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.dim = dim
+        self._row_bytes = dim * 4
+        self._vec_path = self.dir / "vectors.f32"
+        self._idx_path = self.dir / "index.tsv"
+        self._lock_path = self.dir / ".lock"
+        self._lock = threading.Lock()
+        self._rows: Dict[str, int] = {}
+        self._idx_offset = 0          # bytes of index.tsv already parsed
+        self._mmap: Optional[np.memmap] = None
+        self._mmap_rows = 0
+
+    def _refresh(self) -> None:
+        """Pick up rows appended since last time (by us or another process)."""
+        try:
+            size = self._idx_path.stat().st_size
+        except FileNotFoundError:
+            return
+        if size <= self._idx_offset:
+            return
+        with self._idx_path.open("rb") as f:
+            f.seek(self._idx_offset)
+            data = f.read()
+        # only consume complete lines; a concurrent writer may be mid-line
+        end = data.rfind(b"\n") + 1
+        for line in data[:end].decode("utf-8").splitlines():
+            h, _, row = line.partition("\t")
+            if row.isdigit():
+                self._rows[h] = int(row)
+        self._idx_offset += end
+
+    def _vectors(self, need_rows: int) -> Optional[np.ndarray]:
+        if self._mmap is None or self._mmap_rows < need_rows:
+            try:
+                n = self._vec_path.stat().st_size // self._row_bytes
+            except FileNotFoundError:
+                return None
+            if n == 0:
+                return None
+            self._mmap = np.memmap(self._vec_path, dtype=np.float32, mode="r", shape=(n, self.dim))
+            self._mmap_rows = n
+        return self._mmap
+
+    def get_many(self, hashes: Sequence[str]) -> Dict[str, np.ndarray]:
+        with self._lock:
+            self._refresh()
+            rows = {h: self._rows[h] for h in hashes if h in self._rows}
+            if not rows:
+                return {}
+            vecs = self._vectors(max(rows.values()) + 1)
+            if vecs is None:
+                return {}
+            return {h: np.array(vecs[r]) for h, r in rows.items() if r < self._mmap_rows}
+
+    def put_many(self, hashes: Sequence[str], vectors: np.ndarray) -> None:
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.dim)
+        with self._lock, self._lock_path.open("a") as lock_file:
+            if fcntl is not None:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+            try:
+                self._refresh()
+                fresh = [(h, v) for h, v in zip(hashes, vectors) if h not in self._rows]
+                if not fresh:
+                    return
+                size = self._vec_path.stat().st_size if self._vec_path.exists() else 0
+                start = size // self._row_bytes
+                if size != start * self._row_bytes:
+                    # drop a torn partial row (a writer died mid-append) so new rows stay aligned
+                    os.truncate(self._vec_path, start * self._row_bytes)
+                with self._vec_path.open("ab") as f:
+                    f.write(np.asarray([v for _, v in fresh], dtype=np.float32).tobytes())
+                lines = "".join(f"{h}\t{start + i}\n" for i, (h, _) in enumerate(fresh))
+                with self._idx_path.open("a", encoding="utf-8") as f:
+                    f.write(lines)
+                self._refresh()
+            finally:
+                if fcntl is not None:
+                    fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+_caches: Dict[str, EmbeddingCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_embedding_cache(model_name: str, dim: int) -> EmbeddingCache:
+    with _caches_lock:
+        cache = _caches.get(model_name)
+        if cache is None:
+            cache = EmbeddingCache(model_name, dim)
+            _caches[model_name] = cache
+        return cache
+
+
+def encode_cached(texts: List[str], model_name: str, dim: int,
+                  encode: Callable[[List[str]], np.ndarray]) -> np.ndarray:
+    """Embeddings for `texts` as an (n, dim) float32 array; only misses hit `encode`."""
+    if not texts:
+        return np.zeros((0, dim), dtype=np.float32)
+    if EMBEDDING_CACHE_DISABLED:
+        return np.asarray(encode(list(texts)), dtype=np.float32)
+
+    cache = get_embedding_cache(model_name, dim)
+    hashes = [text_hash(t) for t in texts]
+    found = cache.get_many(hashes)
+    metrics.cache_result("embedding", True, len(found))
+
+    missing = {}
+    for h, t in zip(hashes, texts):
+        if h not in found and h not in missing:
+            missing[h] = t
+    metrics.cache_result("embedding", False, len(missing))
+    if missing:
+        miss_hashes = list(missing)
+        miss_vecs = np.asarray(encode([missing[h] for h in miss_hashes]), dtype=np.float32)
+        cache.put_many(miss_hashes, miss_vecs)
+        found.update(zip(miss_hashes, miss_vecs))
+
+    return np.stack([found[h] for h in hashes]).astype(np.float32, copy=False)
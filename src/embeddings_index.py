@@ -1,79 +1,282 @@
 # src/embeddings_index.py
-from typing import List, Dict
-from sentence_transformers import SentenceTransformer, CrossEncoder
-from .config import pinecone_index
-import uuid
-
-# load models once
-embed_model = SentenceTransformer("sentence-transformers/all-MiniLM-L6-v2")
-rerank_model = CrossEncoder("cross-encoder/ms-marco-MiniLM-L-6-v2")
-
-CHUNK_SIZE = 600
-CHUNK_OVERLAP = 150
-
-def chunk_text(text: str, size: int = CHUNK_SIZE, overlap: int = CHUNK_OVERLAP) -> List[str]:
-    words = text.split()
-    chunks = []
-    start = 0
-    while start < len(words):
-        end = min(start + size, len(words))
-        chunk = " ".join(words[start:end])
-        chunks.append(chunk)
-        start = end - overlap
-        if start < 0:
-            start = 0
-        if start >= len(words):
-            break
-    return chunks
-
-def index_resume_text(resume_text: str, user_id: str = "user1"):
-    """Index resume into Pinecone for this user. Overwrites old entries (simple approach)."""
-    chunks = chunk_text(resume_text)
-    if not chunks:
-        return
-
-    vectors = []
-    embeddings = embed_model.encode(chunks, convert_to_numpy=True)
-
-    for i, (chunk, emb) in enumerate(zip(chunks, embeddings)):
-        vec_id = f"{user_id}-{uuid.uuid4().hex}"
-        vectors.append({
-            "id": vec_id,
-            "values": emb.tolist(),
-            "metadata": {
-                "user_id": user_id,
-                "text": chunk
-            }
-        })
-
-    # Optional: delete old vectors for this user first
-    # pinecone_index.delete(filter={"user_id": {"$eq": user_id}})
-
-    pinecone_index.upsert(vectors)
-
-def retrieve_relevant_snippets(jd_text: str, user_id: str = "user1", top_k: int = 8) -> List[Dict]:
-    """Retrieve + rerank resume chunks relevant to this JD."""
-    jd_emb = embed_model.encode([jd_text])[0].tolist()
-
-    # query Pinecone
-    res = pinecone_index.query(
-        vector=jd_emb,
-        top_k=20,
-        include_metadata=True,
-        filter={"user_id": {"$eq": user_id}}
-    )
-    matches = res.get("matches", [])
-
-    if not matches:
+from typing import List, Dict, Optional
+from pathlib import Path
+from collections import OrderedDict
+from . import metrics
+from .bm25 import BM25Index, reciprocal_rank_fusion, weighted_query
+from .chunking import chunk_text
+from .config import EMBED_MODEL_NAME, EMBEDDING_DIM, keyed_json_path
+from .embedding_cache import encode_cached
+from .lazy import Lazy
+from .rate_limit import ConcurrencyLimit
+from .reranker import RERANK_CANDIDATES, rerank
+from .vector_store import get_vector_store
+import hashlib
+import json
+import logging
+import os
+import threading
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+def _load_embed_model():
+    from sentence_transformers import SentenceTransformer
+    return SentenceTransformer(EMBED_MODEL_NAME)
+
+# model loads once, on first use (see warmup() to preload)
+embed_model = Lazy("embed_model", _load_embed_model)
+
+def get_embed_model():
+    return embed_model.get()
+
+# concurrent UI requests queue here instead of oversubscribing the CPU
+embed_limit = ConcurrencyLimit("embed", int(os.environ.get("EMBED_CONCURRENCY", "1")))
+
+def embed_texts(texts: List[str]):
+    """Embed texts through the on-disk cache; the model only sees cache misses
+    (and isn't even loaded when everything hits)."""
+    def encode(missing):
+        with embed_limit, metrics.span("embed.encode", texts=len(missing)):
+            return get_embed_model().encode(missing, convert_to_numpy=True)
+
+    return encode_cached(list(texts), EMBED_MODEL_NAME, EMBEDDING_DIM, encode)
+
+# one JSON manifest per user listing the chunk IDs (and texts) currently in the index
+MANIFEST_DIR = Path(os.environ.get("INDEX_MANIFEST_DIR", "index_manifests"))
+
+# hybrid retrieval: dense + BM25 fused by reciprocal rank, then reranked
+HYBRID_RETRIEVAL = os.environ.get("HYBRID_RETRIEVAL", "1").strip().lower() not in ("0", "false", "no")
+HYBRID_RERANK_CANDIDATES = int(os.environ.get("HYBRID_RERANK_CANDIDATES", "10"))
+HYBRID_DENSE_WEIGHT = float(os.environ.get("HYBRID_DENSE_WEIGHT", "1.0"))
+HYBRID_LEXICAL_WEIGHT = float(os.environ.get("HYBRID_LEXICAL_WEIGHT", "1.0"))
+HYBRID_SKILL_BOOST = float(os.environ.get("HYBRID_SKILL_BOOST", "3.0"))
+BM25_CACHE_USERS = int(os.environ.get("BM25_CACHE_USERS", "256"))
+
+def chunk_id(user_id: str, chunk: str) -> str:
+    """Deterministic vector ID: same user + same chunk text -> same ID."""
+    digest = hashlib.sha256(chunk.encode("utf-8")).hexdigest()[:32]
+    return f"{user_id}-{digest}"
+
+def _manifest_path(user_id: str) -> Path:
+    return keyed_json_path(MANIFEST_DIR, user_id)
+
+def _list_indexed_ids(user_id: str) -> List[str]:
+    """Ask the vector store which IDs exist for this user (used when no manifest yet).
+
+    Older runs stored `{user_id}-{uuid4 hex}` IDs, so this also picks those up
+    and lets the first diff clean them out.
+    """
+    try:
+        with metrics.span("vector_store.list"):
+            return get_vector_store().list_ids(user_id)
+    except Exception as e:
+        logger.warning("Could not list existing vectors: %s", e)
         return []
 
-    # rerank with cross-encoder
-    pairs = [(jd_text, m["metadata"]["text"]) for m in matches]
-    scores = rerank_model.predict(pairs)
+def _read_manifest(user_id: str) -> Optional[Dict]:
+    """The user's manifest, or None if missing or written for another store layout."""
+    try:
+        manifest = json.loads(_manifest_path(user_id).read_text())
+    except (OSError, ValueError):
+        return None
+    if manifest.get("layout") != get_vector_store().layout:
+        return None  # e.g. built before per-user namespaces: those IDs aren't in this namespace
+    return manifest
+
+def load_manifest(user_id: str) -> List[str]:
+    """Chunk IDs indexed for this user, from the manifest or the store itself."""
+    manifest = _read_manifest(user_id)
+    if manifest is None:
+        return _list_indexed_ids(user_id)
+    return list(manifest.get("ids", []))
+
+def save_manifest(user_id: str, ids: List[str], source: Optional[str] = None,
+                  texts: Optional[Dict[str, str]] = None) -> None:
+    """Write the manifest; `texts` ({id: chunk}) lets the BM25 index be rebuilt from it."""
+    MANIFEST_DIR.mkdir(parents=True, exist_ok=True)
+    path = _manifest_path(user_id)
+    tmp = path.with_suffix(".tmp")
+    data = {"user_id": user_id, "layout": get_vector_store().layout, "source": source, "ids": sorted(ids)}
+    if texts is not None:
+        data["texts"] = texts
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+# -----------------------------
+# Lexical (BM25) index
+# -----------------------------
+# user_id -> (manifest mtime, index); the mtime notices re-indexing by another process
+_bm25_cache: "OrderedDict[str, tuple]" = OrderedDict()
+_bm25_lock = threading.Lock()
+
+def _cache_bm25(user_id: str, stamp: int, index: BM25Index) -> None:
+    with _bm25_lock:
+        _bm25_cache[user_id] = (stamp, index)
+        _bm25_cache.move_to_end(user_id)
+        while len(_bm25_cache) > BM25_CACHE_USERS:
+            _bm25_cache.popitem(last=False)
+
+def _build_bm25(user_id: str, texts: Dict[str, str]) -> BM25Index:
+    with metrics.span("bm25.build", chunks=len(texts)):
+        index = BM25Index(list(texts), list(texts.values()))
+    try:
+        stamp = _manifest_path(user_id).stat().st_mtime_ns
+    except OSError:
+        stamp = 0
+    _cache_bm25(user_id, stamp, index)
+    return index
+
+def load_chunk_texts(user_id: str) -> Dict[str, str]:
+    """{chunk id: text} currently indexed for this user, from the manifest ({} if unknown)."""
+    manifest = _read_manifest(user_id)
+    return dict(manifest.get("texts") or {}) if manifest else {}
+
+def has_manifest(user_id: str) -> bool:
+    return _manifest_path(user_id).exists()
+
+def drop_index(user_id: str) -> int:
+    """Delete every vector and the manifest for this user; returns how many vectors went."""
+    ids = load_manifest(user_id)
+    if ids:
+        with metrics.span("vector_store.delete", vectors=len(ids)):
+            get_vector_store().delete(user_id, ids)
+    _manifest_path(user_id).unlink(missing_ok=True)
+    with _bm25_lock:
+        _bm25_cache.pop(user_id, None)
+    return len(ids)
+
+def get_bm25_index(user_id: str) -> Optional[BM25Index]:
+    """This user's BM25 index (None if their manifest predates stored chunk texts)."""
+    try:
+        stamp = _manifest_path(user_id).stat().st_mtime_ns
+    except OSError:
+        return None
+    with _bm25_lock:
+        cached = _bm25_cache.get(user_id)
+        if cached and cached[0] == stamp:
+            _bm25_cache.move_to_end(user_id)
+            return cached[1]
+    manifest = _read_manifest(user_id)
+    if not manifest or "texts" not in manifest:
+        return None
+    return _build_bm25(user_id, manifest["texts"])
+
+def index_resume_text(resume_text: str, user_id: str = "user1",
+                      source_hash: Optional[str] = None) -> Dict[str, int]:
+    """Index resume into the vector store for this user.
+
+    Chunk IDs are content hashes, so we only embed + upsert chunks that are
+    new since the last run and delete the ones that disappeared. Re-indexing
+    an unchanged resume makes no model or network calls.
+
+    `source_hash` identifies the resume file (see upload_store); when the
+    manifest was built from the same file, chunking is skipped too.
+    """
+    if source_hash:
+        manifest = _read_manifest(user_id)
+        if manifest and manifest.get("source") == source_hash and "texts" in manifest:
+            return {"added": 0, "removed": 0, "unchanged": len(manifest.get("ids", []))}
+
+    chunks = list(dict.fromkeys(chunk_text(resume_text)))  # dedupe, keep order
+    wanted = {chunk_id(user_id, c): c for c in chunks}
+
+    store = get_vector_store()
+    indexed = set(load_manifest(user_id))
+    new_ids = [vid for vid in wanted if vid not in indexed]
+    stale_ids = [vid for vid in indexed if vid not in wanted]
+
+    if new_ids:
+        new_chunks = [wanted[vid] for vid in new_ids]
+        embeddings = embed_texts(new_chunks)
+
+        vectors = []
+        for vec_id, chunk, emb in zip(new_ids, new_chunks, embeddings):
+            vectors.append({
+                "id": vec_id,
+                "values": emb.tolist(),
+                "metadata": {
+                    "user_id": user_id,
+                    "text": chunk
+                }
+            })
+        with metrics.span("vector_store.upsert", vectors=len(vectors)):
+            store.upsert(user_id, vectors)
+
+    if stale_ids:
+        with metrics.span("vector_store.delete", vectors=len(stale_ids)):
+            store.delete(user_id, stale_ids)
+
+    manifest = _read_manifest(user_id)
+    if (new_ids or stale_ids or manifest is None or manifest.get("source") != source_hash
+            or "texts" not in manifest):
+        save_manifest(user_id, list(wanted), source=source_hash, texts=wanted)
+        _build_bm25(user_id, wanted)
+
+    return {"added": len(new_ids), "removed": len(stale_ids), "unchanged": len(wanted) - len(new_ids)}
+
+def _dense_scores(jd_emb, texts: List[str]) -> List[float]:
+    """Cosine similarity to the JD for chunks the vector query didn't return
+    (their embeddings are normally embedding-cache hits)."""
+    if not texts:
+        return []
+    embs = np.asarray(embed_texts(texts), dtype=np.float32)
+    q = np.asarray(jd_emb, dtype=np.float32)
+    # not in place: jd_emb may be a row of the caller's array (batch mode's jd_embs)
+    embs = embs / np.maximum(np.linalg.norm(embs, axis=1, keepdims=True), 1e-12)
+    q = q / max(float(np.linalg.norm(q)), 1e-12)
+    return (embs @ q).tolist()
+
+def _hybrid_candidates(jd_text: str, user_id: str, jd_emb, matches: List[Dict],
+                       skills: Optional[List[str]], limit: int) -> List[Dict]:
+    """Fuse dense matches with BM25 hits; the best `limit` go on to the reranker."""
+    index = get_bm25_index(user_id)
+    if index is None or not len(index):
+        return matches
+    with metrics.span("bm25.search") as fields:
+        lexical = index.search(weighted_query(jd_text, skills or (), HYBRID_SKILL_BOOST),
+                               top_k=max(limit, RERANK_CANDIDATES))
+        fields["hits"] = len(lexical)
+    fused = reciprocal_rank_fusion(
+        [[m["id"] for m in matches], [vid for vid, _ in lexical]],
+        weights=[HYBRID_DENSE_WEIGHT, HYBRID_LEXICAL_WEIGHT],
+    )[:limit]
+
+    by_id = {m["id"]: m for m in matches}
+    texts = dict(zip(index.ids, index.texts))
+    lexical_only = [vid for vid, _ in fused if vid not in by_id and vid in texts]
+    for vid, score in zip(lexical_only, _dense_scores(jd_emb, [texts[vid] for vid in lexical_only])):
+        by_id[vid] = {"id": vid, "score": score, "metadata": {"user_id": user_id, "text": texts[vid]}}
+    if lexical_only:
+        metrics.inc("hybrid_lexical_only_total", len(lexical_only))
+    return [by_id[vid] for vid, _ in fused if vid in by_id]
+
+def retrieve_candidates(jd_text: str, user_id: str, top_k: int, jd_emb,
+                        skills: Optional[List[str]] = None) -> List[Dict]:
+    """Vector-store matches for this JD (fused with BM25 hits when hybrid), before reranking."""
+    with metrics.span("vector_store.query"):
+        matches = get_vector_store().query(user_id, jd_emb, top_k=max(top_k, RERANK_CANDIDATES))
+
+    if HYBRID_RETRIEVAL:
+        matches = _hybrid_candidates(jd_text, user_id, jd_emb, matches, skills,
+                                     limit=max(top_k, HYBRID_RERANK_CANDIDATES))
+    return matches
+
+def retrieve_relevant_snippets(jd_text: str, user_id: str = "user1", top_k: int = 8,
+                               jd_emb=None, skills: Optional[List[str]] = None) -> List[Dict]:
+    """Retrieve + rerank resume chunks relevant to this JD.
+
+    Pass `jd_emb` to reuse an embedding computed up front (e.g. batch mode
+    encodes every JD in one call). With HYBRID_RETRIEVAL on, dense matches
+    are fused with BM25 hits over the user's chunks (`skills`, e.g. parse_jd's
+    top_skills, are weighted up in the lexical query), and only the best
+    HYBRID_RERANK_CANDIDATES are reranked.
+    """
+    if jd_emb is None:
+        jd_emb = embed_texts([jd_text])[0]
 
-    scored = list(zip(matches, scores))
-    scored.sort(key=lambda x: x[1], reverse=True)
-    top = scored[:top_k]
+    matches = retrieve_candidates(jd_text, user_id, top_k, jd_emb, skills)
 
-    # return list of dicts: {text, score}
-    return [{"text": m["metadata"]["text"], "score": float(s)} for m, s in top]
\ No newline at end of file
+    # rerank with cross-encoder (skipped when it can't change the result)
+    return rerank(jd_text, matches, top_k)
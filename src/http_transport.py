@@ -0,0 +1,153 @@
+# src/http_transport.py
+"""Shared HTTP transport for outbound calls (Hunter, n8n, ...).
+
+One keep-alive `requests.Session` per service with a sized connection pool,
+a client-side token bucket per service, and retries with exponential
+backoff + full jitter that honour `Retry-After`.
+
+Env knobs per service (upper-cased name, e.g. HUNTER_ / N8N_):
+  <SVC>_POOL_SIZE    max pooled connections      (default 10)
+  <SVC>_RPS          requests/second, 0 = no cap (see DEFAULTS)
+  <SVC>_MAX_RETRIES  retries after the first try (default 3)
+"""
+import asyncio
+import email.utils
+import logging
+import os
+import random
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from . import metrics
+from .rate_limit import TokenBucket
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+BACKOFF_BASE = 0.5   # seconds
+BACKOFF_CAP = 30.0   # max single sleep, also caps Retry-After
+
+logger = logging.getLogger(__name__)
+
+# Hunter allows ~15 req/s; n8n is usually a single local instance
+DEFAULTS = {
+    "hunter": {"rps": 10.0},
+    "n8n": {"rps": 5.0},
+}
+
+
+def _env(service: str, key: str, default):
+    return type(default)(os.environ.get(f"{service.upper()}_{key}", default))
+
+
+class ServiceTransport:
+    def __init__(self, name: str, pool_size: int = 10, rps: float = 0.0, max_retries: int = 3):
+        self.name = name
+        self.max_retries = max_retries
+        self.bucket = TokenBucket(rps)
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True, max_retries=0)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    @classmethod
+    def from_env(cls, name: str) -> "ServiceTransport":
+        defaults = DEFAULTS.get(name, {})
+        return cls(
+            name,
+            pool_size=_env(name, "POOL_SIZE", 10),
+            rps=_env(name, "RPS", float(defaults.get("rps", 0.0))),
+            max_retries=_env(name, "MAX_RETRIES", 3),
+        )
+
+    def request(self, method: str, url: str, idempotent: Optional[bool] = None,
+                max_retries: Optional[int] = None, **kwargs) -> requests.Response:
+        """Send with rate limiting and retries; returns the last response.
+
+        Non-idempotent requests (POST by default) are only retried when the
+        server most likely didn't act on them: 429s and connection errors
+        (but not read timeouts). `max_retries` overrides the service's
+        setting for this call (0 = callers that retry on their own).
+        """
+        if idempotent is None:
+            idempotent = method.upper() in ("GET", "HEAD", "OPTIONS", "PUT", "DELETE")
+        if max_retries is None:
+            max_retries = self.max_retries
+
+        with metrics.span(f"http.{self.name}", method=method.upper()) as fields:
+            attempt = 0
+            while True:
+                waited = time.perf_counter()
+                self.bucket.acquire()
+                metrics.observe("rate_limit_wait_seconds", time.perf_counter() - waited, service=self.name)
+                try:
+                    resp = self.session.request(method, url, **kwargs)
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    metrics.inc("api_calls_total", service=self.name, status=type(e).__name__)
+                    # after a read timeout the server may already have acted on it
+                    safe = idempotent or not isinstance(e, requests.ReadTimeout)
+                    if attempt >= max_retries or not safe:
+                        raise
+                    delay = _backoff(attempt)
+                    logger.warning("%s: %s, retrying in %.2fs", self.name, type(e).__name__, delay)
+                else:
+                    metrics.inc("api_calls_total", service=self.name, status=resp.status_code)
+                    retryable = resp.status_code == 429 or (idempotent and resp.status_code in RETRY_STATUSES)
+                    if not retryable or attempt >= max_retries:
+                        fields.update(status=resp.status_code, attempts=attempt + 1)
+                        return resp
+                    delay = _retry_after(resp)
+                    if delay is None:
+                        delay = _backoff(attempt)
+                    logger.warning("%s: HTTP %s, retrying in %.2fs", self.name, resp.status_code, delay)
+                    resp.close()
+                metrics.inc("retries_total", service=self.name)
+                attempt += 1
+                time.sleep(delay)
+
+
+def _backoff(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * (2 ** attempt)))
+
+
+def _retry_after(resp: requests.Response) -> Optional[float]:
+    value = resp.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        seconds = float(value)
+    except ValueError:
+        try:
+            when = email.utils.parsedate_to_datetime(value)
+        except (TypeError, ValueError):
+            return None
+        seconds = when.timestamp() - time.time()
+    return min(BACKOFF_CAP, max(0.0, seconds))
+
+
+_transports: Dict[str, ServiceTransport] = {}
+_lock = threading.Lock()
+
+
+def get_transport(service: str) -> ServiceTransport:
+    with _lock:
+        transport = _transports.get(service)
+        if transport is None:
+            transport = ServiceTransport.from_env(service)
+            _transports[service] = transport
+        return transport
+
+
+def request(service: str, method: str, url: str, **kwargs) -> requests.Response:
+    """Pooled, rate-limited, retrying request on behalf of `service`."""
+    return get_transport(service).request(method, url, **kwargs)
+
+
+async def arequest(service: str, method: str, url: str, **kwargs) -> requests.Response:
+    """Async variant: runs the pooled request on a worker thread so many calls
+    can be awaited concurrently (bounded by the pool size and rate limit)."""
+    return await asyncio.to_thread(request, service, method, url, **kwargs)
@@ -0,0 +1,124 @@
+# src/hunter_cache.py
+"""On-disk (SQLite) cache for Hunter lookups.
+
+- Email Finder results are keyed by (normalized name, domain).
+- Domain Search results are keyed by domain and keep the full email list,
+  so later recruiters at an already-seen company can be matched locally.
+
+"Not found" answers are cached too (negative caching) with a shorter TTL.
+"""
+import json
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+HUNTER_CACHE_PATH = Path(os.environ.get("HUNTER_CACHE_PATH", "cache/hunter.sqlite3"))
+HUNTER_CACHE_TTL = float(os.environ.get("HUNTER_CACHE_TTL", 30 * 24 * 3600))          # found
+HUNTER_NEGATIVE_TTL = float(os.environ.get("HUNTER_NEGATIVE_TTL", 3 * 24 * 3600))      # not found
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS email_finder (
+    name TEXT NOT NULL,
+    domain TEXT NOT NULL,
+    email TEXT,
+    fetched_at REAL NOT NULL,
+    PRIMARY KEY (name, domain)
+);
+CREATE TABLE IF NOT EXISTS domain_search (
+    domain TEXT PRIMARY KEY,
+    data TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+);
+"""
+
+
+def normalize_name(full_name: str) -> str:
+    return " ".join((full_name or "").lower().split())
+
+
+def normalize_domain(domain: str) -> str:
+    return (domain or "").strip().lower()
+
+
+class HunterCache:
+    def __init__(self, path: Path = HUNTER_CACHE_PATH,
+                 ttl: float = HUNTER_CACHE_TTL, negative_ttl: float = HUNTER_NEGATIVE_TTL):
+        self.path = Path(path)
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _fresh(self, fetched_at: float, negative: bool) -> bool:
+        ttl = self.negative_ttl if negative else self.ttl
+        return time.time() - fetched_at < ttl
+
+    # Email Finder -------------------------------------------------------
+    def get_finder(self, full_name: str, domain: str) -> Tuple[bool, Optional[str]]:
+        """Return (hit, email). A hit with email=None is a cached "not found"."""
+        row = self._conn().execute(
+            "SELECT email, fetched_at FROM email_finder WHERE name = ? AND domain = ?",
+            (normalize_name(full_name), normalize_domain(domain)),
+        ).fetchone()
+        if row is None or not self._fresh(row[1], negative=row[0] is None):
+            return False, None
+        return True, row[0]
+
+    def put_finder(self, full_name: str, domain: str, email: Optional[str]) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO email_finder (name, domain, email, fetched_at) VALUES (?, ?, ?, ?)",
+                (normalize_name(full_name), normalize_domain(domain), email, time.time()),
+            )
+
+    # Domain Search ------------------------------------------------------
+    def get_domain(self, domain: str) -> Optional[Dict]:
+        """Cached Domain Search `data` payload (None on miss / expired)."""
+        row = self._conn().execute(
+            "SELECT data, fetched_at FROM domain_search WHERE domain = ?",
+            (normalize_domain(domain),),
+        ).fetchone()
+        if row is None:
+            return None
+        data = json.loads(row[0])
+        if not self._fresh(row[1], negative=not data.get("emails")):
+            return None
+        return data
+
+    def put_domain(self, domain: str, data: Dict) -> None:
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO domain_search (domain, data, fetched_at) VALUES (?, ?, ?)",
+                (normalize_domain(domain), json.dumps(data), time.time()),
+            )
+
+    def clear(self) -> None:
+        with self._conn() as conn:
+            conn.execute("DELETE FROM email_finder")
+            conn.execute("DELETE FROM domain_search")
+
+
+_cache: Optional[HunterCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_hunter_cache() -> HunterCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = HunterCache()
+        return _cache
@@ -1,9 +1,16 @@
+import logging
 import os
-import requests
+
+from . import metrics
+from .http_transport import request
+from .hunter_cache import get_hunter_cache, normalize_name
+from .email_patterns import guess_email
 
 HUNTER_API_KEY = os.environ.get("HUNTER_API_KEY", "").strip()
 HUNTER_BASE_URL = "https://api.hunter.io/v2"
 
+logger = logging.getLogger(__name__)
+
 
 def _split_name(full_name: str):
     """Split 'John Dennis' -> ('John', 'Dennis')."""
@@ -15,29 +22,20 @@ def _split_name(full_name: str):
     return parts[0], " ".join(parts[1:])
 
 
-def find_recruiter_email(full_name: str, domain: str) -> str | None:
-    """Try to find an email using Hunter.
+def _match_name(emails, full_name: str) -> str | None:
+    """Return the Domain Search email whose first + last name equals full_name."""
+    target = normalize_name(full_name)
+    for e in emails:
+        fn = (e.get("first_name") or "").strip()
+        ln = (e.get("last_name") or "").strip()
+        if normalize_name(fn + " " + ln) == target:
+            return e.get("value")
+    return None
 
-    1) First call Email Finder (recommended by Hunter).
-    2) If nothing comes back, fall back to Domain Search and try to
-       match the name there.
-    """
-
-    if not HUNTER_API_KEY:
-        print("[Hunter] No API key configured – returning None")
-        return None
 
-    if not full_name or not domain:
-        print("[Hunter] Missing name or domain – returning None")
-        return None
-
-    domain = domain.strip().lower()
-    full_name = full_name.strip()
+def _email_finder(full_name: str, domain: str) -> tuple[bool, str | None]:
+    """Call Email Finder. Returns (definitive, email); only definitive answers get cached."""
     first, last = _split_name(full_name)
-
-    # -----------------------------
-    # 1) Try Email Finder endpoint
-    # -----------------------------
     params = {
         "domain": domain,
         "api_key": HUNTER_API_KEY,
@@ -51,52 +49,131 @@ def find_recruiter_email(full_name: str, domain: str) -> str | None:
         params["full_name"] = full_name
 
     try:
-        resp = requests.get(f"{HUNTER_BASE_URL}/email-finder", params=params, timeout=10)
-        print("[Hunter] Email Finder status:", resp.status_code)
+        resp = request("hunter", "GET", f"{HUNTER_BASE_URL}/email-finder", params=params, timeout=10)
         data = resp.json()
-        print("[Hunter] Email Finder response (short):",
-              {k: data.get(k) for k in ["data", "errors"] if k in data})
+        logger.debug("Email Finder %s: %s", resp.status_code,
+                     {k: data.get(k) for k in ["data", "errors"] if k in data})
 
         if resp.status_code == 200:
-            email = data.get("data", {}).get("email")
-            if email:
-                return email
+            return True, (data.get("data") or {}).get("email") or None
+        if resp.status_code == 404:
+            return True, None
     except Exception as e:
-        print("[Hunter] Email Finder error:", e)
+        logger.warning("Email Finder error: %s", e)
+    return False, None
 
-    # --------------------------------
-    # 2) Fallback: Domain Search
-    # --------------------------------
+
+def _domain_search(domain: str) -> dict | None:
+    """Call Domain Search and return its `data` payload (None on failure)."""
     try:
         ds_params = {
             "domain": domain,
             "api_key": HUNTER_API_KEY,
         }
-        resp = requests.get(f"{HUNTER_BASE_URL}/domain-search", params=ds_params, timeout=10)
-        print("[Hunter] Domain Search status:", resp.status_code)
+        resp = request("hunter", "GET", f"{HUNTER_BASE_URL}/domain-search", params=ds_params, timeout=10)
         data = resp.json()
-        print("[Hunter] Domain Search keys:", list(data.keys()))
+        logger.debug("Domain Search %s: keys %s", resp.status_code, list(data.keys()))
 
         if resp.status_code != 200:
             return None
 
-        emails = data.get("data", {}).get("emails", [])
-        if not emails:
-            return None
+        # keep only what we match on, so cached rows stay small
+        payload = data.get("data") or {}
+        return {
+            "pattern": payload.get("pattern"),
+            "emails": [
+                {k: e.get(k) for k in ("value", "first_name", "last_name", "position", "confidence")}
+                for e in payload.get("emails") or []
+            ],
+        }
+    except Exception as e:
+        logger.warning("Domain Search error: %s", e)
+    return None
 
-        # Try to match the name exactly
-        target = full_name.lower()
-        for e in emails:
-            fn = (e.get("first_name") or "").strip()
-            ln = (e.get("last_name") or "").strip()
-            combined = (fn + " " + ln).strip().lower()
-            if combined == target:
-                return e.get("value")
 
-        # If no exact match, just return the first email as a fallback
-        return emails[0].get("value")
+def _resolved(source: str, email: str | None) -> str | None:
+    """Count where an answer came from (cache, pattern, which API call)."""
+    if source in ("domain_cache", "finder_cache", "pattern"):
+        metrics.cache_result("hunter", True)
+    metrics.inc("hunter_lookups_total", source=source)
+    logger.info("Recruiter email via %s: %s", source, "found" if email else "none")
+    return email
 
-    except Exception as e:
-        print("[Hunter] Domain Search error:", e)
 
-    return None
\ No newline at end of file
+def find_recruiter_email(full_name: str, domain: str) -> str | None:
+    """Try to find an email using Hunter.
+
+    0) Answer from the local cache when we can: a cached Email Finder result
+       for this name, an exact name match in a cached Domain Search, or an
+       address synthesized from the domain's learned email pattern.
+    1) Otherwise call Email Finder (recommended by Hunter).
+    2) If nothing comes back, fall back to Domain Search (cached per domain)
+       and try to match the name there.
+    """
+
+    if not full_name or not domain:
+        logger.info("Missing name or domain – returning None")
+        return None
+
+    domain = domain.strip().lower()
+    full_name = full_name.strip()
+    cache = get_hunter_cache()
+
+    # -----------------------------
+    # 0) Cache
+    # -----------------------------
+    domain_data = cache.get_domain(domain)
+    if domain_data:
+        email = _match_name(domain_data.get("emails") or [], full_name)
+        if email:
+            return _resolved("domain_cache", email)
+
+    finder_hit, email = cache.get_finder(full_name, domain)
+    if finder_hit and email:
+        return _resolved("finder_cache", email)
+
+    # known domain, new name: synthesize from the company's email pattern
+    first, last = _split_name(full_name)
+    guessed = guess_email(first, last, domain, domain_data)
+    if guessed:
+        return _resolved("pattern", guessed)
+    metrics.cache_result("hunter", False)
+
+    if not HUNTER_API_KEY and not (finder_hit or domain_data is not None):
+        logger.info("No API key configured – returning None")
+        return _resolved("no_key", None)
+
+    # -----------------------------
+    # 1) Try Email Finder endpoint
+    # -----------------------------
+    if not finder_hit and HUNTER_API_KEY:
+        definitive, email = _email_finder(full_name, domain)
+        if definitive:
+            cache.put_finder(full_name, domain, email)
+        if email:
+            return _resolved("email_finder", email)
+
+    # --------------------------------
+    # 2) Fallback: Domain Search
+    # --------------------------------
+    if domain_data is None and HUNTER_API_KEY:
+        domain_data = _domain_search(domain)
+        if domain_data is not None:
+            cache.put_domain(domain, domain_data)
+
+    emails = (domain_data or {}).get("emails") or []
+    if not emails:
+        return _resolved("not_found", None)
+
+    # Try to match the name exactly
+    email = _match_name(emails, full_name)
+    if email:
+        return _resolved("domain_search", email)
+
+    # No exact match: build one from the domain's pattern if it's clear enough
+    guessed = guess_email(first, last, domain, domain_data)
+    if guessed:
+        return _resolved("domain_pattern", guessed)
+
+    # otherwise just return the first email as a fallback
+    return _resolved("first_email", emails[0].get("value"))
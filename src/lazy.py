@@ -0,0 +1,96 @@
+# src/lazy.py
+"""Thread-safe lazy singletons for expensive models and clients.
+
+Nothing heavy (model weights, network clients) is created at import time;
+each `Lazy` builds its object on first `get()` and records how long that
+took, so `startup_report()` can show where startup time goes.
+"""
+import threading
+import time
+from typing import Any, Callable, Dict, List, Optional
+
+_registry: List["Lazy"] = []
+_registry_lock = threading.Lock()
+_process_start = time.perf_counter()
+
+
+class Lazy:
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        self.name = name
+        self._factory = factory
+        self._value = None
+        self._loaded = False
+        self._lock = threading.Lock()
+        self.load_seconds: Optional[float] = None
+        self.error: Optional[str] = None
+        with _registry_lock:
+            _registry.append(self)
+
+    @property
+    def loaded(self) -> bool:
+        return self._loaded
+
+    def get(self) -> Any:
+        if self._loaded:  # fast path, no lock once built
+            return self._value
+        with self._lock:
+            if not self._loaded:
+                started = time.perf_counter()
+                try:
+                    self._value = self._factory()
+                except Exception as e:
+                    self.error = f"{type(e).__name__}: {e}"
+                    raise
+                self.load_seconds = time.perf_counter() - started
+                self.error = None
+                self._loaded = True
+        return self._value
+
+    def set(self, value: Any) -> None:
+        """Inject a ready-made object (tests, fakes, benchmarks)."""
+        with self._lock:
+            self._value = value
+            self._loaded = True
+            self.load_seconds = 0.0
+            self.error = None
+
+    def reset(self) -> None:
+        with self._lock:
+            self._value = None
+            self._loaded = False
+            self.load_seconds = None
+
+
+def get_lazy(name: str) -> Optional[Lazy]:
+    with _registry_lock:
+        for lazy in _registry:
+            if lazy.name == name:
+                return lazy
+    return None
+
+
+def startup_report() -> Dict[str, Any]:
+    """Seconds since import of this module plus per-component load state/time."""
+    with _registry_lock:
+        components = {
+            lazy.name: {
+                "loaded": lazy.loaded,
+                "load_seconds": round(lazy.load_seconds, 3) if lazy.load_seconds is not None else None,
+                "error": lazy.error,
+            }
+            for lazy in _registry
+        }
+    return {"uptime_seconds": round(time.perf_counter() - _process_start, 3), "components": components}
+
+
+def format_startup_report(report: Dict[str, Any] = None) -> str:
+    report = report or startup_report()
+    lines = [f"[Startup] {report['uptime_seconds']:.3f}s since start"]
+    for name, info in report["components"].items():
+        if info["loaded"]:
+            lines.append(f"[Startup]   {name:<16} loaded in {info['load_seconds']:.3f}s")
+        elif info["error"]:
+            lines.append(f"[Startup]   {name:<16} failed: {info['error']}")
+        else:
+            lines.append(f"[Startup]   {name:<16} not loaded (lazy)")
+    return "\n".join(lines)
@@ -0,0 +1,208 @@
+# src/llm_cache.py
+"""Content-addressed cache for OpenAI chat completions.
+
+Key = sha256 of (model, system prompt, normalized user prompt, temperature,
+extra request options). Lookups hit an in-memory LRU first, then a SQLite
+file, so a repeated JD parse comes back instantly and costs nothing.
+
+Bypass per call with `use_cache=False` (nothing is read or written), or
+globally with LLM_CACHE_DISABLED=1. Entries expire after LLM_CACHE_TTL
+seconds, and the oldest are dropped once the file holds more than
+LLM_CACHE_MAX_ROWS (checked every PRUNE_EVERY writes). `invalidate()` and
+`clear()` drop entries explicitly.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Callable, Dict, Optional
+
+from . import metrics
+
+LLM_CACHE_PATH = Path(os.environ.get("LLM_CACHE_PATH", "cache/llm.sqlite3"))
+LLM_CACHE_MEMORY_ITEMS = int(os.environ.get("LLM_CACHE_MEMORY_ITEMS", "256"))
+LLM_CACHE_DISABLED = os.environ.get("LLM_CACHE_DISABLED", "").strip().lower() in ("1", "true", "yes")
+LLM_CACHE_TTL = float(os.environ.get("LLM_CACHE_TTL", 30 * 24 * 3600))  # 0 = never expire
+LLM_CACHE_MAX_ROWS = int(os.environ.get("LLM_CACHE_MAX_ROWS", "20000"))  # 0 = unbounded
+
+PRUNE_EVERY = 100  # writes between size / age checks
+
+
+def normalize_prompt(text: str) -> str:
+    """Whitespace differences (trailing spaces, blank lines, CRLF) don't change the answer."""
+    lines = [" ".join(line.split()) for line in (text or "").replace("\r\n", "\n").split("\n")]
+    out, blank = [], False
+    for line in lines:
+        if not line:
+            if not blank and out:
+                out.append("")
+            blank = True
+            continue
+        out.append(line)
+        blank = False
+    return "\n".join(out).strip()
+
+
+def cache_key(model: str, system_prompt: str, user_prompt: str, temperature: float,
+              options: Optional[Dict] = None) -> str:
+    payload = json.dumps(
+        [model, normalize_prompt(system_prompt), normalize_prompt(user_prompt),
+         round(float(temperature), 4), options or {}],
+        sort_keys=True, ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    def __init__(self, path: Path = LLM_CACHE_PATH, memory_items: int = LLM_CACHE_MEMORY_ITEMS,
+                 ttl: float = LLM_CACHE_TTL, max_rows: int = LLM_CACHE_MAX_ROWS):
+        self.path = Path(path)
+        self.memory_items = memory_items
+        self.ttl = ttl
+        self.max_rows = max_rows
+        self._writes = 0
+        self._memory: "OrderedDict[str, str]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS completions ("
+                " key TEXT PRIMARY KEY, model TEXT, content TEXT NOT NULL, created_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS completions_created ON completions (created_at)")
+        self.prune()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    def _remember(self, key: str, content: str) -> None:
+        with self._lock:
+            self._memory[key] = content
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.memory_items:
+                self._memory.popitem(last=False)
+
+    def get(self, key: str) -> Optional[str]:
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+        oldest = time.time() - self.ttl if self.ttl > 0 else 0.0
+        row = self._conn().execute(
+            "SELECT content FROM completions WHERE key = ? AND created_at >= ?", (key, oldest),
+        ).fetchone()
+        if row is None:
+            return None
+        self._remember(key, row[0])
+        return row[0]
+
+    def put(self, key: str, content: str, model: str = "") -> None:
+        self._remember(key, content)
+        with self._conn() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO completions (key, model, content, created_at) VALUES (?, ?, ?, ?)",
+                (key, model, content, time.time()),
+            )
+        with self._lock:
+            self._writes += 1
+            due = self._writes % PRUNE_EVERY == 0
+        if due:
+            self.prune()
+
+    def prune(self) -> int:
+        """Drop expired rows, then the oldest beyond `max_rows`; returns how many were removed."""
+        removed = 0
+        with self._conn() as conn:
+            if self.ttl > 0:
+                removed += conn.execute("DELETE FROM completions WHERE created_at < ?",
+                                        (time.time() - self.ttl,)).rowcount
+            if self.max_rows > 0:
+                removed += conn.execute(
+                    "DELETE FROM completions WHERE key IN (SELECT key FROM completions"
+                    " ORDER BY created_at DESC LIMIT -1 OFFSET ?)", (self.max_rows,),
+                ).rowcount
+        if removed:
+            with self._lock:
+                self._memory.clear()  # may hold evicted keys
+            metrics.inc("cache_evictions_total", removed, cache="llm")
+        return removed
+
+    def invalidate(self, key: str) -> None:
+        with self._lock:
+            self._memory.pop(key, None)
+        with self._conn() as conn:
+            conn.execute("DELETE FROM completions WHERE key = ?", (key,))
+
+    def clear(self) -> None:
+        with self._lock:
+            self._memory.clear()
+        with self._conn() as conn:
+            conn.execute("DELETE FROM completions")
+
+
+_cache: Optional[LLMCache] = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache() -> LLMCache:
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
+
+
+def cached_completion(model: str, system_prompt: str, user_prompt: str, temperature: float,
+                      complete: Callable[[], str], use_cache: bool = True,
+                      options: Optional[Dict] = None,
+                      accept: Optional[Callable[[str], bool]] = None) -> str:
+    """Return the cached completion for this request, or call `complete()` and store it.
+
+    `accept` can reject a fresh answer from being cached (e.g. unparseable JSON).
+    """
+    if LLM_CACHE_DISABLED or not use_cache:
+        return complete()
+
+    cache = get_llm_cache()
+    key = cache_key(model, system_prompt, user_prompt, temperature, options)
+    hit = cache.get(key)
+    metrics.cache_result("llm", hit is not None)
+    if hit is not None:
+        return hit
+
+    content = complete()
+    if content and (accept is None or accept(content)):
+        cache.put(key, content, model=model)
+    return content
+
+
+def lookup_completion(model: str, system_prompt: str, user_prompt: str, temperature: float,
+                      options: Optional[Dict] = None, record: bool = True) -> Optional[str]:
+    """Cache-only read (for callers like streaming that can't wrap a `complete()`).
+
+    `record=False` for peeks that don't stand in for a call (no hit/miss metric).
+    """
+    if LLM_CACHE_DISABLED:
+        return None
+    hit = get_llm_cache().get(cache_key(model, system_prompt, user_prompt, temperature, options))
+    if record:
+        metrics.cache_result("llm", hit is not None)
+    return hit
+
+
+def store_completion(model: str, system_prompt: str, user_prompt: str, temperature: float,
+                     content: str, options: Optional[Dict] = None) -> None:
+    if LLM_CACHE_DISABLED or not content:
+        return
+    get_llm_cache().put(cache_key(model, system_prompt, user_prompt, temperature, options),
+                        content, model=model)
@@ -0,0 +1,317 @@
+# src/metrics.py
+"""In-process tracing and metrics: timing spans, counters, latency histograms.
+
+    with span("stage.index", user="u1"):
+        ...
+    inc("cache_requests_total", cache="embedding", result="hit", value=12)
+
+Every span records its duration in the `coldmail_span_seconds` histogram
+(label `span`), counts failures in `coldmail_errors_total`, and logs one
+structured line (logger `src.metrics`, DEBUG) carrying the trace id so the
+spans of one request can be stitched together. `prometheus_text()` renders
+everything in the Prometheus text format, `snapshot()` as plain JSON with
+approximate p50/p95 per histogram; `serve_metrics()` exposes /metrics over
+HTTP (METRICS_PORT). `configure_logging()` switches all app logs to one JSON
+object per line with LOG_FORMAT=json.
+"""
+import contextlib
+import contextvars
+import json
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+PREFIX = "coldmail_"
+BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+logger = logging.getLogger(__name__)
+
+_LabelKey = Tuple[str, Tuple[Tuple[str, str], ...]]
+
+
+def _key(name: str, labels: Dict[str, object]) -> _LabelKey:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+class Histogram:
+    def __init__(self, buckets=BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)  # last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float) -> None:
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                self.counts[i] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.sum += value
+        self.count += 1
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Estimate like Prometheus' histogram_quantile (linear within a bucket)."""
+        if not self.count:
+            return None
+        rank = q * self.count
+        seen, lower = 0, 0.0
+        for i, n in enumerate(self.counts):
+            upper = self.buckets[i] if i < len(self.buckets) else math.inf
+            if seen + n >= rank and n:
+                if upper == math.inf:
+                    return lower
+                return lower + (upper - lower) * (rank - seen) / n
+            seen += n
+            lower = upper
+        return lower
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counters: Dict[_LabelKey, float] = {}
+        self._histograms: Dict[_LabelKey, Histogram] = {}
+
+    def inc(self, name: str, value: float = 1.0, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            self._counters[key] = self._counters.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, **labels) -> None:
+        key = _key(name, labels)
+        with self._lock:
+            hist = self._histograms.get(key)
+            if hist is None:
+                hist = self._histograms[key] = Histogram()
+            hist.observe(value)
+
+    def reset(self) -> None:
+        with self._lock:
+            self._counters.clear()
+            self._histograms.clear()
+
+    def snapshot(self) -> Dict:
+        with self._lock:
+            counters = [{"name": n, "labels": dict(l), "value": v}
+                        for (n, l), v in sorted(self._counters.items())]
+            histograms = [{
+                "name": n, "labels": dict(l), "count": h.count, "sum": round(h.sum, 6),
+                "p50": _round(h.quantile(0.5)), "p95": _round(h.quantile(0.95)),
+            } for (n, l), h in sorted(self._histograms.items())]
+        return {"counters": counters, "histograms": histograms}
+
+    def prometheus_text(self) -> str:
+        lines: List[str] = []
+        with self._lock:
+            typed = set()
+            for (name, labels), value in sorted(self._counters.items()):
+                full = PREFIX + name
+                if full not in typed:
+                    lines.append(f"# TYPE {full} counter")
+                    typed.add(full)
+                lines.append(f"{full}{_fmt_labels(labels)} {_num(value)}")
+            for (name, labels), hist in sorted(self._histograms.items()):
+                full = PREFIX + name
+                if full not in typed:
+                    lines.append(f"# TYPE {full} histogram")
+                    typed.add(full)
+                cumulative = 0
+                for bound, n in zip(list(hist.buckets) + [math.inf], hist.counts):
+                    cumulative += n
+                    le = "+Inf" if bound == math.inf else _num(bound)
+                    lines.append(f"{full}_bucket{_fmt_labels(labels + (('le', le),))} {cumulative}")
+                lines.append(f"{full}_sum{_fmt_labels(labels)} {_num(hist.sum)}")
+                lines.append(f"{full}_count{_fmt_labels(labels)} {hist.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _round(value: Optional[float]) -> Optional[float]:
+    return None if value is None else round(value, 6)
+
+
+def _num(value: float) -> str:
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _fmt_labels(labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape(str(v))}"' for k, v in labels) + "}"
+
+
+registry = Registry()
+
+
+def inc(name: str, value: float = 1.0, **labels) -> None:
+    registry.inc(name, value, **labels)
+
+
+def observe(name: str, value: float, **labels) -> None:
+    registry.observe(name, value, **labels)
+
+
+def cache_result(cache: str, hit: bool, value: int = 1) -> None:
+    """Count lookups against one of the app's caches."""
+    if value:
+        inc("cache_requests_total", value, cache=cache, result="hit" if hit else "miss")
+
+
+def snapshot() -> Dict:
+    return registry.snapshot()
+
+
+def prometheus_text() -> str:
+    return registry.prometheus_text()
+
+
+# -----------------------------
+# Spans
+# -----------------------------
+_trace_id: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar("trace_id", default=None)
+_span_path: contextvars.ContextVar[Tuple[str, ...]] = contextvars.ContextVar("span_path", default=())
+
+
+def _restore(var: contextvars.ContextVar, token, previous) -> None:
+    # generators (e.g. streamed UI updates) may resume in another context
+    try:
+        var.reset(token)
+    except ValueError:
+        var.set(previous)
+
+
+def current_trace_id() -> Optional[str]:
+    return _trace_id.get()
+
+
+@contextlib.contextmanager
+def trace(trace_id: Optional[str] = None) -> Iterator[str]:
+    """Start a new trace (one per request); spans inside share its id."""
+    previous = _trace_id.get()
+    token = _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        yield _trace_id.get()
+    finally:
+        _restore(_trace_id, token, previous)
+
+
+def record_span(name: str, elapsed: float, error: Optional[str] = None,
+                parent: Optional[str] = None, **fields) -> None:
+    """Record a span measured by hand (e.g. one that spans generator yields)."""
+    observe("span_seconds", elapsed, span=name)
+    if error:
+        inc("errors_total", span=name, error=error)
+    if logger.isEnabledFor(logging.DEBUG):
+        logger.debug("span", extra={"event": "span", "span": name, "parent": parent,
+                                    "trace_id": _trace_id.get(), "ms": round(elapsed * 1000, 3),
+                                    "ok": error is None, "error": error, **fields})
+
+
+@contextlib.contextmanager
+def span(name: str, **attrs) -> Iterator[Dict]:
+    """Time a block. Yields a dict the block can add attributes to."""
+    fields: Dict = dict(attrs)
+    parent = _span_path.get()
+    token = _span_path.set(parent + (name,))
+    started = time.perf_counter()
+    error = None
+    try:
+        yield fields
+    except Exception as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _restore(_span_path, token, parent)
+        record_span(name, time.perf_counter() - started, error,
+                    parent=parent[-1] if parent else None, **fields)
+
+
+# -----------------------------
+# Logging
+# -----------------------------
+_RESERVED = set(vars(logging.makeLogRecord({}))) | {"message", "asctime"}
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line; `extra=` fields become top-level keys."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        data = {
+            "ts": round(record.created, 3),
+            "level": record.levelname.lower(),
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        trace_id = _trace_id.get()
+        if trace_id:
+            data["trace_id"] = trace_id
+        for key, value in vars(record).items():
+            if key not in _RESERVED and not key.startswith("_"):
+                data[key] = value
+        if record.exc_info:
+            data["exc"] = self.formatException(record.exc_info)
+        return json.dumps(data, default=str)
+
+
+def configure_logging(level: Optional[str] = None, fmt: Optional[str] = None) -> None:
+    """Set up root logging from LOG_LEVEL (default INFO) and LOG_FORMAT (text|json)."""
+    level = (level or os.environ.get("LOG_LEVEL", "INFO")).upper()
+    fmt = (fmt or os.environ.get("LOG_FORMAT", "text")).lower()
+    handler = logging.StreamHandler()
+    if fmt == "json":
+        handler.setFormatter(JsonFormatter())
+    else:
+        handler.setFormatter(logging.Formatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    root = logging.getLogger()
+    root.handlers[:] = [handler]
+    root.setLevel(level)
+
+
+def log_snapshot(message: str = "metrics") -> None:
+    """Log the current metrics as one structured line."""
+    logger.info(message, extra={"event": "metrics", "metrics": snapshot()})
+
+
+# -----------------------------
+# /metrics endpoint
+# -----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] == "/metrics":
+            body, ctype = prometheus_text().encode(), "text/plain; version=0.0.4"
+        elif self.path.split("?")[0] == "/metrics.json":
+            body, ctype = json.dumps(snapshot()).encode(), "application/json"
+        else:
+            self.send_error(404)
+            return
+        self.send_response(200)
+        self.send_header("Content-Type", ctype)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, fmt, *args):  # keep scrapes out of the app log
+        pass
+
+
+def serve_metrics(port: Optional[int] = None, host: str = "0.0.0.0") -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics (Prometheus) and /metrics.json on a daemon thread.
+
+    Uses METRICS_PORT when `port` isn't given; does nothing if neither is set.
+    """
+    port = port or int(os.environ.get("METRICS_PORT", "0") or 0)
+    if not port:
+        return None
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
+    logger.info("metrics on http://%s:%d/metrics", host, port)
+    return server
@@ -1,7 +1,24 @@
 # src/openai_email.py
 import json
-from typing import List, Dict, Tuple
-from .config import openai_client
+import logging
+import os
+import re
+import time
+from typing import Any, List, Dict, Iterator, Optional, Tuple
+from . import metrics
+from .config import get_openai_client
+from .llm_cache import cached_completion, lookup_completion, store_completion
+
+logger = logging.getLogger(__name__)
+
+MODEL = "gpt-4.1-mini"
+
+# Generations are only cached on request (replays / regression tests); a
+# user clicking "Generate" again usually wants a fresh draft.
+LLM_CACHE_GENERATION = os.environ.get("LLM_CACHE_GENERATION", "").strip().lower() in ("1", "true", "yes")
+
+# One structured call for JD fields + email instead of parse_jd + generate (see generate_fused)
+LLM_FUSED = os.environ.get("LLM_FUSED", "").strip().lower() in ("1", "true", "yes")
 
 JD_SYSTEM_PROMPT = """
 You are a helpful assistant that extracts structured info from job descriptions.
@@ -18,28 +35,69 @@ You are an assistant that writes concise, personalized cold emails to recruiters
 about a specific role. The tone should be professional, friendly, and to the point.
 """
 
-def parse_jd(jd_text: str) -> Dict:
-    response = openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": JD_SYSTEM_PROMPT},
-            {"role": "user", "content": jd_text}
-        ],
-        temperature=0.2
-    )
-    content = response.choices[0].message.content
+def _chat(system_prompt: str, user_prompt: str, temperature: float,
+          use_cache: bool = True, accept=None, response_format: Optional[Dict] = None) -> str:
+    """One chat completion, served from the LLM cache when possible."""
+    extra = {"response_format": response_format} if response_format else {}
+
+    def complete() -> str:
+        with metrics.span("openai.chat", model=MODEL):
+            try:
+                response = get_openai_client().chat.completions.create(
+                    model=MODEL,
+                    messages=[
+                        {"role": "system", "content": system_prompt},
+                        {"role": "user", "content": user_prompt}
+                    ],
+                    temperature=temperature,
+                    **extra
+                )
+            except Exception as e:
+                metrics.inc("api_calls_total", service="openai", status=type(e).__name__)
+                raise
+            metrics.inc("api_calls_total", service="openai", status="ok")
+            return response.choices[0].message.content or ""
+
+    return cached_completion(MODEL, system_prompt, user_prompt, temperature,
+                             complete, use_cache=use_cache, options=extra or None, accept=accept)
+
+def _is_json(content: str) -> bool:
+    try:
+        json.loads(content)
+        return True
+    except Exception:
+        return False
+
+def parse_jd(jd_text: str, use_cache: bool = True) -> Dict:
+    content = _chat(JD_SYSTEM_PROMPT, jd_text, temperature=0.2,
+                    use_cache=use_cache, accept=_is_json)
     try:
         data = json.loads(content)
     except Exception:
         data = {"role_title": "", "company_name": "", "location": "", "top_skills": []}
     return data
 
-def generate_cold_email(
+def cached_top_skills(jd_text: str) -> Optional[List[str]]:
+    """parse_jd's top_skills if this JD was already parsed (LLM cache only, never calls the model).
+
+    Lets retrieval use the skills when a speculative or earlier parse
+    finished, without waiting for one that's still running.
+    """
+    content = lookup_completion(MODEL, JD_SYSTEM_PROMPT, jd_text, 0.2, record=False)
+    if content is None:
+        return None
+    try:
+        skills = json.loads(content).get("top_skills")
+    except Exception:
+        return None
+    return [str(s) for s in skills] if isinstance(skills, list) else None
+
+def build_email_prompt(
     jd_info: Dict,
     resume_snippets: List[Dict],
     recruiter_name: str,
     recruiter_email: str | None
-) -> Tuple[str, str]:
+) -> str:
     role = jd_info.get("role_title", "this role")
     company = jd_info.get("company_name", "")
     skills = jd_info.get("top_skills", [])
@@ -74,25 +132,446 @@ Subject: <subject line>
 Body:
 <email body>
 """
+    return user_prompt
+
+def _fallback_subject(jd_info: Dict) -> str:
+    return "Cold application for " + (jd_info.get("role_title", "this role") or "the role")
+
+class EmailStreamParser:
+    """Split "Subject: ...\nBody:\n..." into subject/body as text arrives.
+
+    Feed deltas with `feed()`; `subject` and `body` always hold the best
+    split of what has been seen so far, so partial text can go straight to
+    the UI without re-parsing the whole string.
+    """
+
+    def __init__(self, fallback_subject: str):
+        self.fallback_subject = fallback_subject
+        self._state = "first_line"    # -> "after_subject" -> "body"
+        self._line = ""               # current incomplete line (first two lines only)
+        self._subject = ""
+        self._body_parts: List[str] = []
+
+    @property
+    def subject(self) -> str:
+        if self._state == "first_line":
+            if self._line.lower().startswith("subject:"):
+                return self._line[len("Subject:"):].strip()
+            return ""
+        return self._subject or self.fallback_subject
+
+    @property
+    def body(self) -> str:
+        return "".join(self._body_parts)
+
+    def feed(self, delta: str) -> None:
+        for ch_index, ch in enumerate(delta):
+            if self._state == "body":
+                self._body_parts.append(delta[ch_index:])
+                return
+            if ch != "\n":
+                self._line += ch
+                continue
+            self._end_line()
+
+    def _end_line(self) -> None:
+        line, self._line = self._line, ""
+        if self._state == "first_line":
+            if line.lower().startswith("subject:"):
+                self._subject = line[len("Subject:"):].strip()
+                self._state = "after_subject"
+            else:
+                # no subject line: everything is body
+                self._body_parts.append(line + "\n")
+                self._state = "body"
+        elif self._state == "after_subject":
+            stripped = line.strip()
+            if stripped.lower().startswith("body:"):
+                rest = stripped[len("body:"):].strip()
+                if rest:
+                    self._body_parts.append(rest + "\n")
+                self._state = "body"
+            elif stripped:
+                self._body_parts.append(line + "\n")
+                self._state = "body"
+            # blank lines between subject and body are dropped
+
+    def close(self) -> Tuple[str, str]:
+        if self._line:
+            if self._state == "first_line" and not self._line.lower().startswith("subject:"):
+                self._body_parts.append(self._line)
+                self._state = "body"
+            else:
+                self._end_line()
+        return self.subject, self.body.strip()
+
+def split_email(content: str, jd_info: Dict) -> Tuple[str, str]:
+    parser = EmailStreamParser(_fallback_subject(jd_info))
+    parser.feed(content)
+    return parser.close()
+
+def generate_cold_email(
+    jd_info: Dict,
+    resume_snippets: List[Dict],
+    recruiter_name: str,
+    recruiter_email: str | None,
+    use_cache: bool | None = None
+) -> Tuple[str, str]:
+    user_prompt = build_email_prompt(jd_info, resume_snippets, recruiter_name, recruiter_email)
+
+    if use_cache is None:
+        use_cache = LLM_CACHE_GENERATION
+    content = _chat(EMAIL_SYSTEM_PROMPT, user_prompt, temperature=0.5, use_cache=use_cache)
+
+    return split_email(content, jd_info)
+
+def generate_cold_email_stream(
+    jd_info: Dict,
+    resume_snippets: List[Dict],
+    recruiter_name: str,
+    recruiter_email: str | None,
+    use_cache: bool | None = None,
+    timeout: float | None = None
+) -> Iterator[Tuple[str, str]]:
+    """Like generate_cold_email, but yields (subject, body) as tokens arrive.
+
+    The last item yielded is the final, stripped split.
+    """
+    user_prompt = build_email_prompt(jd_info, resume_snippets, recruiter_name, recruiter_email)
+    if use_cache is None:
+        use_cache = LLM_CACHE_GENERATION
+
+    if use_cache:
+        cached = lookup_completion(MODEL, EMAIL_SYSTEM_PROMPT, user_prompt, 0.5)
+        if cached is not None:
+            yield split_email(cached, jd_info)
+            return
+
+    # timed by hand: a span can't stay open across the yields below
+    started = time.perf_counter()
+    try:
+        stream = get_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.5,
+            stream=True,
+            timeout=timeout,
+        )
+    except Exception as e:
+        metrics.inc("api_calls_total", service="openai", status=type(e).__name__)
+        metrics.record_span("openai.stream", time.perf_counter() - started, type(e).__name__)
+        raise
+    metrics.inc("api_calls_total", service="openai", status="ok")
+
+    parser = EmailStreamParser(_fallback_subject(jd_info))
+    chunks = []
+    for event in stream:
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if not delta:
+            continue
+        if not chunks:
+            metrics.observe("openai_first_token_seconds", time.perf_counter() - started)
+        chunks.append(delta)
+        parser.feed(delta)
+        yield parser.subject, parser.body
+    metrics.record_span("openai.stream", time.perf_counter() - started, model=MODEL, chunks=len(chunks))
+
+    if use_cache:  # like generate_cold_email: nothing is written with caching off
+        store_completion(MODEL, EMAIL_SYSTEM_PROMPT, user_prompt, 0.5, "".join(chunks))
+    yield parser.close()
+
+# -----------------------------
+# Fused mode: JD fields + email in one structured call
+# -----------------------------
+FUSED_SYSTEM_PROMPT = """
+You are an assistant that reads a job description and writes a concise, personalized
+cold email to the recruiter about that role. The tone should be professional, friendly,
+and to the point. Answer with the JSON object described by the response schema.
+"""
+
+JD_FIELDS = ("role_title", "company_name", "location", "top_skills")
+
+# property order matters: the JD fields stream first, then subject, then body
+FUSED_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "role_title": {"type": "string"},
+        "company_name": {"type": "string"},
+        "location": {"type": "string"},
+        "top_skills": {"type": "array", "items": {"type": "string"}},
+        "subject": {"type": "string"},
+        "body": {"type": "string"},
+    },
+    "required": ["role_title", "company_name", "location", "top_skills", "subject", "body"],
+    "additionalProperties": False,
+}
+
+FUSED_RESPONSE_FORMAT = {
+    "type": "json_schema",
+    "json_schema": {"name": "cold_email", "strict": True, "schema": FUSED_SCHEMA},
+}
+
+_JSON_TYPES = {
+    "object": dict, "array": list, "string": str, "boolean": bool,
+    "number": (int, float), "integer": int, "null": type(None),
+}
 
-    response = openai_client.chat.completions.create(
-        model="gpt-4.1-mini",
-        messages=[
-            {"role": "system", "content": EMAIL_SYSTEM_PROMPT},
-            {"role": "user", "content": user_prompt}
-        ],
-        temperature=0.5
+
+class SchemaError(ValueError):
+    """Model output that isn't JSON or doesn't match the expected schema."""
+
+
+def validate(value: Any, schema: Dict, path: str = "$") -> None:
+    """Check `value` against the JSON-schema subset we send (type, properties,
+    required, additionalProperties, items). Raises SchemaError."""
+    expected = schema.get("type")
+    if expected:
+        py_type = _JSON_TYPES[expected]
+        # bool is an int in Python, but not a JSON number
+        if not isinstance(value, py_type) or (expected in ("number", "integer") and isinstance(value, bool)):
+            raise SchemaError(f"{path}: expected {expected}, got {type(value).__name__}")
+    if expected == "object":
+        props = schema.get("properties", {})
+        missing = [k for k in schema.get("required", []) if k not in value]
+        if missing:
+            raise SchemaError(f"{path}: missing {', '.join(missing)}")
+        if schema.get("additionalProperties") is False:
+            extra = [k for k in value if k not in props]
+            if extra:
+                raise SchemaError(f"{path}: unexpected {', '.join(extra)}")
+        for key, sub in props.items():
+            if key in value:
+                validate(value[key], sub, f"{path}.{key}")
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            validate(item, schema["items"], f"{path}[{i}]")
+
+
+def parse_structured(content: str, schema: Dict = FUSED_SCHEMA) -> Dict:
+    try:
+        data = json.loads(content)
+    except ValueError as e:
+        raise SchemaError(f"not JSON: {e}") from e
+    validate(data, schema)
+    return data
+
+
+def _is_fused(content: str) -> bool:
+    try:
+        parse_structured(content)
+        return True
+    except SchemaError:
+        return False
+
+
+def build_fused_prompt(
+    jd_text: str,
+    resume_snippets: List[Dict],
+    recruiter_name: str,
+    recruiter_email: str | None
+) -> str:
+    snippets_text = "\n\n".join(
+        f"- {s['text']}" for s in resume_snippets
     )
-    content = response.choices[0].message.content
-
-    # very simple parse
-    subject = "Cold application for " + (role or "the role")
-    body = content
-    if "Subject:" in content:
-        lines = content.splitlines()
-        first = lines[0]
-        if first.lower().startswith("subject:"):
-            subject = first[len("Subject:"):].strip()
-            body = "\n".join(lines[2:])  # skip "Subject:" and "Body:" line if present
-
-    return subject, body
\ No newline at end of file
+
+    return f"""
+Job description:
+{jd_text}
+
+Recruiter name: {recruiter_name}
+Recruiter email: {recruiter_email or '(not found yet)'}
+
+My most relevant experience (from my resume):
+{snippets_text}
+
+Fill in:
+- role_title, company_name, location: from the job description ("" if not stated)
+- top_skills: up to 8 skills/keywords from the job description
+- subject: a clear, compelling subject line
+- body: a short email body (120–180 words) that:
+   - Greets the recruiter by name.
+   - Mentions the role and company.
+   - Highlights 2–3 concrete achievements from my experience.
+   - Politely asks for a short call or for them to consider my application.
+"""
+
+
+def _split_fused(data: Dict) -> Tuple[Dict, str, str]:
+    jd_info = {k: data[k] for k in JD_FIELDS}
+    jd_info["top_skills"] = list(jd_info["top_skills"])[:8]
+    return jd_info, data["subject"].strip() or _fallback_subject(jd_info), data["body"].strip()
+
+
+def _two_call(jd_text: str, resume_snippets: List[Dict], recruiter_name: str,
+              recruiter_email: str | None, use_cache: bool | None, reason: str) -> Tuple[Dict, str, str]:
+    logger.warning("Fused generation unusable (%s); falling back to parse_jd + generate", reason)
+    metrics.inc("fused_fallback_total")
+    jd_info = parse_jd(jd_text)
+    subject, body = generate_cold_email(jd_info, resume_snippets, recruiter_name, recruiter_email,
+                                        use_cache=use_cache)
+    return jd_info, subject, body
+
+
+def generate_fused(
+    jd_text: str,
+    resume_snippets: List[Dict],
+    recruiter_name: str,
+    recruiter_email: str | None,
+    use_cache: bool | None = None
+) -> Tuple[Dict, str, str]:
+    """Parse the JD and write the email in one structured call: (jd_info, subject, body).
+
+    The answer is validated against FUSED_SCHEMA instead of split by lines;
+    only output that fails validation falls back to the two-call path.
+    """
+    user_prompt = build_fused_prompt(jd_text, resume_snippets, recruiter_name, recruiter_email)
+    if use_cache is None:
+        use_cache = LLM_CACHE_GENERATION
+    content = _chat(FUSED_SYSTEM_PROMPT, user_prompt, temperature=0.5, use_cache=use_cache,
+                    accept=_is_fused, response_format=FUSED_RESPONSE_FORMAT)
+    try:
+        return _split_fused(parse_structured(content))
+    except SchemaError as e:
+        return _two_call(jd_text, resume_snippets, recruiter_name, recruiter_email, use_cache, str(e))
+
+
+_TRAILING_ESCAPE_RE = re.compile(r"(\\+)(u[0-9a-fA-F]{0,3})?$")
+
+
+def _trim_partial_escape(raw: str) -> str:
+    """Drop an escape sequence cut off mid-stream (a lone backslash or half a \\uXXXX)."""
+    m = _TRAILING_ESCAPE_RE.search(raw)
+    if m and len(m.group(1)) % 2:
+        return raw[:m.end(1) - 1]
+    return raw
+
+
+class JsonFieldStream:
+    """Read top-level string fields out of a JSON object while it streams in.
+
+    `value(key)` decodes the (possibly unfinished) string so far;
+    `fields_before(key)` parses everything before `key` once it appears,
+    i.e. the fields the schema orders ahead of it.
+    """
+
+    def __init__(self):
+        self.text = ""
+        self._starts: Dict[str, int] = {}   # key -> offset of its opening quote
+
+    def feed(self, delta: str) -> None:
+        self.text += delta
+
+    def _start(self, key: str) -> Optional[int]:
+        if key not in self._starts:
+            m = re.search(r'"%s"\s*:\s*"' % re.escape(key), self.text)
+            if m is None:
+                return None
+            self._starts[key] = m.start()
+        return self._starts[key]
+
+    def value(self, key: str) -> str:
+        start = self._start(key)
+        if start is None:
+            return ""
+        raw = self.text[self.text.index('"', self.text.index(":", start)) + 1:]
+        i, end = 0, None
+        while i < len(raw):
+            if raw[i] == "\\":
+                i += 2
+                continue
+            if raw[i] == '"':
+                end = i
+                break
+            i += 1
+        chunk = raw[:end] if end is not None else _trim_partial_escape(raw)
+        try:
+            return json.loads(f'"{chunk}"')
+        except ValueError:
+            return ""
+
+    def fields_before(self, key: str) -> Optional[Dict]:
+        start = self._start(key)
+        if start is None:
+            return None
+        try:
+            return json.loads(self.text[:start].rstrip().rstrip(",") + "}")
+        except ValueError:
+            return None
+
+
+def generate_fused_stream(
+    jd_text: str,
+    resume_snippets: List[Dict],
+    recruiter_name: str,
+    recruiter_email: str | None,
+    use_cache: bool | None = None,
+    timeout: float | None = None
+) -> Iterator[Tuple[Optional[Dict], str, str]]:
+    """Like generate_fused, but yields (jd_info, subject, body) as tokens arrive.
+
+    jd_info is None until the JD fields have streamed in. The last item
+    yielded is the validated result (or the two-call fallback's).
+    """
+    user_prompt = build_fused_prompt(jd_text, resume_snippets, recruiter_name, recruiter_email)
+    options = {"response_format": FUSED_RESPONSE_FORMAT}
+    if use_cache is None:
+        use_cache = LLM_CACHE_GENERATION
+
+    if use_cache:
+        cached = lookup_completion(MODEL, FUSED_SYSTEM_PROMPT, user_prompt, 0.5, options)
+        if cached is not None and _is_fused(cached):
+            yield _split_fused(parse_structured(cached))
+            return
+
+    # timed by hand: a span can't stay open across the yields below
+    started = time.perf_counter()
+    try:
+        stream = get_openai_client().chat.completions.create(
+            model=MODEL,
+            messages=[
+                {"role": "system", "content": FUSED_SYSTEM_PROMPT},
+                {"role": "user", "content": user_prompt}
+            ],
+            temperature=0.5,
+            response_format=FUSED_RESPONSE_FORMAT,
+            stream=True,
+            timeout=timeout,
+        )
+    except Exception as e:
+        metrics.inc("api_calls_total", service="openai", status=type(e).__name__)
+        metrics.record_span("openai.stream", time.perf_counter() - started, type(e).__name__)
+        raise
+    metrics.inc("api_calls_total", service="openai", status="ok")
+
+    parser = JsonFieldStream()
+    jd_info = None
+    chunks = 0
+    for event in stream:
+        if not event.choices:
+            continue
+        delta = event.choices[0].delta.content
+        if not delta:
+            continue
+        if not chunks:
+            metrics.observe("openai_first_token_seconds", time.perf_counter() - started)
+        chunks += 1
+        parser.feed(delta)
+        if jd_info is None:
+            jd_info = parser.fields_before("subject")
+        yield jd_info, parser.value("subject"), parser.value("body")
+    metrics.record_span("openai.stream", time.perf_counter() - started, model=MODEL,
+                        chunks=chunks, fused=True)
+
+    try:
+        result = _split_fused(parse_structured(parser.text))
+    except SchemaError as e:
+        yield _two_call(jd_text, resume_snippets, recruiter_name, recruiter_email, use_cache, str(e))
+        return
+    if use_cache:
+        store_completion(MODEL, FUSED_SYSTEM_PROMPT, user_prompt, 0.5, parser.text, options)
+    yield result
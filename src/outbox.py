@@ -0,0 +1,332 @@
+# src/outbox.py
+"""Durable outbox for n8n sends.
+
+The UI and batch mode only `enqueue()` an email (a local SQLite write); a
+background worker drains the queue to the n8n webhook. Each message has an
+idempotency key (by default the sha256 of its payload), so double clicks
+and re-runs enqueue it once, and every delivery attempt carries the key as
+an `Idempotency-Key` header plus an `idempotency_key` field for the n8n
+workflow to dedupe on: a retry after a lost response never double-sends.
+
+Delivery:
+- up to OUTBOX_BATCH_SIZE due messages are claimed at a time; with
+  N8N_WEBHOOK_BATCH_URL set they go in one POST (`{"messages": [...]}`,
+  even a single message), otherwise one POST each to N8N_WEBHOOK_URL
+- 2xx = sent; other 4xx (except 408/429) = failed for good; anything else
+  (5xx, 429, connection errors) is retried with exponential backoff + jitter
+  until OUTBOX_MAX_ATTEMPTS; these are the only retries (the HTTP
+  transport's own are turned off for outbox posts)
+- a claim that isn't settled within OUTBOX_CLAIM_TIMEOUT (the process died
+  mid-send) becomes due again; the idempotency key makes that safe
+
+`status()` reports queue depth per state for the UI; `drain()` blocks until
+the queue is empty (batch mode).
+"""
+import hashlib
+import json
+import logging
+import os
+import random
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from . import config  # noqa: F401  (loads .env before the settings below are read)
+from . import metrics
+from .http_transport import request
+
+logger = logging.getLogger(__name__)
+
+OUTBOX_PATH = Path(os.environ.get("OUTBOX_PATH", "cache/outbox.sqlite3"))
+N8N_WEBHOOK_URL = os.environ.get("N8N_WEBHOOK_URL", "").strip()
+N8N_WEBHOOK_BATCH_URL = os.environ.get("N8N_WEBHOOK_BATCH_URL", "").strip()
+OUTBOX_BATCH_SIZE = int(os.environ.get("OUTBOX_BATCH_SIZE", "20"))
+OUTBOX_MAX_ATTEMPTS = int(os.environ.get("OUTBOX_MAX_ATTEMPTS", "8"))
+OUTBOX_POLL_SECONDS = float(os.environ.get("OUTBOX_POLL_SECONDS", "2"))
+OUTBOX_CLAIM_TIMEOUT = float(os.environ.get("OUTBOX_CLAIM_TIMEOUT", "300"))
+OUTBOX_TIMEOUT = float(os.environ.get("OUTBOX_TIMEOUT", "30"))
+
+BACKOFF_BASE = 5.0     # seconds before the first retry
+BACKOFF_CAP = 900.0    # max delay between attempts
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    key TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    status TEXT NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    created_at REAL NOT NULL,
+    updated_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS outbox_due ON outbox (status, next_attempt_at);
+"""
+
+
+def payload_key(payload: Dict) -> str:
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, ensure_ascii=False).encode("utf-8")).hexdigest()
+
+
+def _backoff(attempts: int) -> float:
+    """Exponential backoff with jitter (half fixed, half random)."""
+    delay = min(BACKOFF_CAP, BACKOFF_BASE * (2 ** max(0, attempts - 1)))
+    return delay / 2 + random.uniform(0, delay / 2)
+
+
+class Outbox:
+    def __init__(self, path: Path = OUTBOX_PATH):
+        self.path = Path(path)
+        self._local = threading.local()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with self._conn() as conn:
+            conn.executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        # sqlite connections can't be shared across threads; keep one per thread
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+        return conn
+
+    # Producer side ------------------------------------------------------
+    def enqueue(self, payload: Dict, key: Optional[str] = None) -> Tuple[str, bool]:
+        """Queue one email. Returns (key, created); created=False means it was already queued."""
+        key = key or payload_key(payload)
+        now = time.time()
+        cur = self._conn().execute(
+            "INSERT OR IGNORE INTO outbox (key, payload, status, next_attempt_at, created_at, updated_at)"
+            " VALUES (?, ?, ?, ?, ?, ?)",
+            (key, json.dumps(payload, ensure_ascii=False), PENDING, now, now, now),
+        )
+        created = cur.rowcount == 1
+        metrics.inc("outbox_enqueued_total", result="new" if created else "duplicate")
+        return key, created
+
+    def get(self, key: str) -> Optional[Dict]:
+        row = self._conn().execute(
+            "SELECT status, attempts, next_attempt_at, last_error, created_at, updated_at"
+            " FROM outbox WHERE key = ?", (key,),
+        ).fetchone()
+        if row is None:
+            return None
+        return dict(zip(("status", "attempts", "next_attempt_at", "last_error", "created_at", "updated_at"), row))
+
+    def status(self) -> Dict:
+        """Queue depth per state, plus the age of the oldest unsent message."""
+        counts = {PENDING: 0, SENDING: 0, SENT: 0, FAILED: 0}
+        conn = self._conn()
+        for state, n in conn.execute("SELECT status, COUNT(*) FROM outbox GROUP BY status"):
+            counts[state] = n
+        oldest = conn.execute(
+            "SELECT MIN(created_at) FROM outbox WHERE status IN (?, ?)", (PENDING, SENDING),
+        ).fetchone()[0]
+        counts["oldest_pending_s"] = round(time.time() - oldest, 1) if oldest else None
+        return counts
+
+    def retry_failed(self) -> int:
+        """Put permanently failed messages back in the queue."""
+        now = time.time()
+        cur = self._conn().execute(
+            "UPDATE outbox SET status = ?, attempts = 0, next_attempt_at = ?, updated_at = ? WHERE status = ?",
+            (PENDING, now, now, FAILED),
+        )
+        return cur.rowcount
+
+    # Worker side --------------------------------------------------------
+    def claim(self, limit: int = OUTBOX_BATCH_SIZE) -> List[Tuple[str, Dict, int]]:
+        """Atomically take up to `limit` due messages: [(key, payload, attempts)]."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")  # one claimer at a time, across processes too
+        try:
+            rows = conn.execute(
+                "SELECT key, payload, attempts FROM outbox"
+                " WHERE (status = ? AND next_attempt_at <= ?) OR (status = ? AND updated_at <= ?)"
+                " ORDER BY next_attempt_at LIMIT ?",
+                (PENDING, now, SENDING, now - OUTBOX_CLAIM_TIMEOUT, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET status = ?, updated_at = ? WHERE key = ?",
+                [(SENDING, now, key) for key, _, _ in rows],
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return [(key, json.loads(payload), attempts) for key, payload, attempts in rows]
+
+    def settle(self, key: str, attempts: int, ok: bool, error: Optional[str] = None,
+               permanent: bool = False) -> str:
+        """Record one delivery attempt; returns the message's new status."""
+        now = time.time()
+        attempts += 1
+        if ok:
+            state, due = SENT, now
+        elif permanent or attempts >= OUTBOX_MAX_ATTEMPTS:
+            state, due = FAILED, now
+        else:
+            state, due = PENDING, now + _backoff(attempts)
+        self._conn().execute(
+            "UPDATE outbox SET status = ?, attempts = ?, next_attempt_at = ?, updated_at = ?, last_error = ?"
+            " WHERE key = ?",
+            (state, attempts, due, now, None if ok else error, key),
+        )
+        metrics.inc("outbox_deliveries_total", result="sent" if ok else ("retry" if state == PENDING else "failed"))
+        return state
+
+    def next_due_in(self) -> Optional[float]:
+        """Seconds until the next pending message is due (None when nothing is pending)."""
+        due = self._conn().execute(
+            "SELECT MIN(next_attempt_at) FROM outbox WHERE status = ?", (PENDING,),
+        ).fetchone()[0]
+        return None if due is None else max(0.0, due - time.time())
+
+
+# -----------------------------
+# Delivery
+# -----------------------------
+def _classify(status_code: int) -> Tuple[bool, bool]:
+    """(ok, permanent) for an HTTP status."""
+    if 200 <= status_code < 300:
+        return True, False
+    return False, 400 <= status_code < 500 and status_code not in (408, 429)
+
+
+def _post(url: str, body: Dict, key: str) -> Tuple[bool, bool, Optional[str]]:
+    try:
+        resp = request("n8n", "POST", url, json=body, timeout=OUTBOX_TIMEOUT,
+                       headers={"Idempotency-Key": key}, idempotent=True, max_retries=0)
+    except Exception as e:
+        return False, False, f"{type(e).__name__}: {e}"
+    ok, permanent = _classify(resp.status_code)
+    return ok, permanent, None if ok else f"HTTP {resp.status_code}: {resp.text[:200]}"
+
+
+def deliver(outbox: Outbox, messages: List[Tuple[str, Dict, int]]) -> Dict[str, int]:
+    """Send claimed messages and settle each one. Returns counts per new status."""
+    counts: Dict[str, int] = {}
+    if not messages:
+        return counts
+
+    with metrics.span("outbox.deliver", messages=len(messages)):
+        if N8N_WEBHOOK_BATCH_URL:
+            # the batch key is stable for the same set, so a retried batch dedupes as a whole
+            batch_key = hashlib.sha256("|".join(sorted(k for k, _, _ in messages)).encode()).hexdigest()
+            body = {"messages": [dict(p, idempotency_key=k) for k, p, _ in messages]}
+            ok, permanent, error = _post(N8N_WEBHOOK_BATCH_URL, body, batch_key)
+            results = [(k, a, ok, permanent, error) for k, _, a in messages]
+        else:
+            results = []
+            for key, payload, attempts in messages:
+                ok, permanent, error = _post(N8N_WEBHOOK_URL, dict(payload, idempotency_key=key), key)
+                results.append((key, attempts, ok, permanent, error))
+
+    for key, attempts, ok, permanent, error in results:
+        state = outbox.settle(key, attempts, ok, error, permanent)
+        counts[state] = counts.get(state, 0) + 1
+        if error:
+            logger.warning("outbox %s: %s (%s)", key[:12], error, state)
+    return counts
+
+
+class OutboxWorker(threading.Thread):
+    """Daemon thread that drains the outbox; `wake()` skips the poll wait."""
+
+    def __init__(self, outbox: Outbox, batch_size: int = OUTBOX_BATCH_SIZE,
+                 poll_seconds: float = OUTBOX_POLL_SECONDS):
+        super().__init__(name="outbox", daemon=True)
+        self.outbox = outbox
+        self.batch_size = batch_size
+        self.poll_seconds = poll_seconds
+        self._wake = threading.Event()
+        self._stopping = threading.Event()  # Thread already has a _stop()
+
+    def wake(self) -> None:
+        self._wake.set()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        self._wake.set()
+
+    def run_once(self) -> int:
+        """Deliver one batch of due messages; returns how many were attempted."""
+        if not (N8N_WEBHOOK_URL or N8N_WEBHOOK_BATCH_URL):
+            return 0
+        messages = self.outbox.claim(self.batch_size)
+        deliver(self.outbox, messages)
+        return len(messages)
+
+    def run(self) -> None:
+        while not self._stopping.is_set():
+            try:
+                if self.run_once():
+                    continue  # more may be due right away
+                wait = self.outbox.next_due_in()
+            except Exception:
+                logger.exception("outbox worker iteration failed")
+                wait = None
+            wait = self.poll_seconds if wait is None else min(wait, self.poll_seconds)
+            self._wake.wait(wait)
+            self._wake.clear()
+
+
+_outbox: Optional[Outbox] = None
+_worker: Optional[OutboxWorker] = None
+_lock = threading.Lock()
+
+
+def get_outbox() -> Outbox:
+    global _outbox
+    with _lock:
+        if _outbox is None:
+            _outbox = Outbox()
+        return _outbox
+
+
+def start_worker() -> OutboxWorker:
+    """Start the background delivery thread once per process."""
+    global _worker
+    outbox = get_outbox()
+    with _lock:
+        if _worker is None or not _worker.is_alive():
+            _worker = OutboxWorker(outbox)
+            _worker.start()
+        return _worker
+
+
+def enqueue(payload: Dict, key: Optional[str] = None) -> Tuple[str, bool]:
+    """Queue an email for n8n and nudge the worker (started on first use)."""
+    key, created = get_outbox().enqueue(payload, key)
+    start_worker().wake()
+    return key, created
+
+
+def status() -> Dict:
+    return get_outbox().status()
+
+
+def drain(timeout: Optional[float] = None) -> Dict:
+    """Block until nothing is pending or sending (or `timeout` passes); returns `status()`.
+
+    Messages waiting on a backoff count as pending, so a dead webhook keeps
+    this waiting until they fail for good or the timeout hits.
+    """
+    if not (N8N_WEBHOOK_URL or N8N_WEBHOOK_BATCH_URL):
+        return status()  # nowhere to deliver to
+    deadline = None if timeout is None else time.monotonic() + timeout
+    worker = start_worker()
+    while True:
+        state = status()
+        if not (state[PENDING] or state[SENDING]):
+            return state
+        if deadline is not None and time.monotonic() >= deadline:
+            return state
+        worker.wake()
+        time.sleep(0.2)
@@ -1,9 +1,150 @@
 # src/pdf_utils.py
+"""PDF text extraction: streaming per page, page-parallel for big files,
+and cached by content hash so re-uploading the same file costs one hash.
+
+The cache is bounded like the upload store: entries unused for
+PDF_CACHE_MAX_AGE_DAYS are removed, and the least recently used go first
+when it grows past PDF_CACHE_MAX_MB.
+"""
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
 from pypdf import PdfReader
 
-def extract_text_from_pdf(file_path: str) -> str:
+from . import metrics
+from .upload_store import evict
+
+logger = logging.getLogger(__name__)
+
+PDF_CACHE_DIR = Path(os.environ.get("PDF_CACHE_DIR", "cache/pdf"))
+PDF_CACHE_MAX_MB = float(os.environ.get("PDF_CACHE_MAX_MB", "256"))
+PDF_CACHE_MAX_AGE_DAYS = float(os.environ.get("PDF_CACHE_MAX_AGE_DAYS", "30"))
+PDF_PARALLEL_MIN_PAGES = int(os.environ.get("PDF_PARALLEL_MIN_PAGES", "8"))
+PDF_WORKERS = int(os.environ.get("PDF_WORKERS", "0")) or min(4, os.cpu_count() or 1)
+
+# bump when extraction output changes so old cache entries are ignored
+_EXTRACTOR_VERSION = 1
+
+
+def file_sha256(file_path: str, chunk_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(chunk_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def _page_record(page) -> Dict:
+    text = page.extract_text() or ""
+    box = page.mediabox
+    return {
+        "text": text,
+        "width": float(box.width),
+        "height": float(box.height),
+        "rotation": int(page.get("/Rotate", 0) or 0),
+        "chars": len(text),
+    }
+
+
+def iter_pdf_pages(file_path: str) -> Iterator[Dict]:
+    """Yield one {text, width, height, rotation, chars} record per page, in order."""
     reader = PdfReader(file_path)
-    texts = []
     for page in reader.pages:
-        texts.append(page.extract_text() or "")
-    return "\n".join(texts)
\ No newline at end of file
+        yield _page_record(page)
+
+
+def _extract_range(file_path: str, start: int, end: int) -> List[Dict]:
+    # runs in a worker process: each worker parses the file itself
+    reader = PdfReader(file_path)
+    return [_page_record(reader.pages[i]) for i in range(start, end)]
+
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ProcessPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            # spawn: forking a process that runs threads (Gradio, model pools) isn't safe
+            _pool = ProcessPoolExecutor(max_workers=PDF_WORKERS,
+                                        mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def _reset_pool() -> None:
+    global _pool
+    with _pool_lock:
+        if _pool is not None:
+            _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+def _extract_pages(file_path: str) -> List[Dict]:
+    reader = PdfReader(file_path)
+    n = len(reader.pages)
+    if n < PDF_PARALLEL_MIN_PAGES or PDF_WORKERS <= 1:
+        return [_page_record(page) for page in reader.pages]
+
+    step = -(-n // PDF_WORKERS)  # ceil
+    ranges = [(s, min(s + step, n)) for s in range(0, n, step)]
+    try:
+        pool = _get_pool()
+        futures = [pool.submit(_extract_range, file_path, s, e) for s, e in ranges]
+        pages: List[Dict] = []
+        for fut in futures:
+            pages.extend(fut.result())
+        return pages
+    except BrokenProcessPool as e:
+        logger.warning("Process pool failed, extracting serially: %s", e)
+        _reset_pool()
+        return [_page_record(page) for page in reader.pages]
+
+
+def _cache_path(file_hash: str) -> Path:
+    return PDF_CACHE_DIR / f"{file_hash}.v{_EXTRACTOR_VERSION}.json"
+
+
+def extract_pdf(file_path: str, file_hash: Optional[str] = None) -> Dict:
+    """Pages (text + layout metadata) for a PDF, from the content-hash cache if possible.
+
+    Pass `file_hash` (sha256 of the file) when the caller already has it.
+    """
+    file_hash = file_hash or file_sha256(file_path)
+    path = _cache_path(file_hash)
+    try:
+        doc = json.loads(path.read_text(encoding="utf-8"))
+        os.utime(path)  # mtime doubles as "last used" for eviction
+    except (OSError, ValueError):
+        metrics.cache_result("pdf", False)
+    else:
+        metrics.cache_result("pdf", True)
+        return doc
+
+    with metrics.span("pdf.extract") as fields:
+        pages = _extract_pages(file_path)
+        fields["pages"] = len(pages)
+    doc = {"sha256": file_hash, "page_count": len(pages), "pages": pages}
+
+    PDF_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    # per thread: a batch and a request may extract the same file at once;
+    # dot-prefixed so eviction leaves it alone
+    tmp = PDF_CACHE_DIR / f".{path.name}.{os.getpid()}-{threading.get_ident()}.tmp"
+    tmp.write_text(json.dumps(doc), encoding="utf-8")
+    tmp.replace(path)
+    evict(PDF_CACHE_DIR, max_mb=PDF_CACHE_MAX_MB, max_age_days=PDF_CACHE_MAX_AGE_DAYS, keep=path)
+    return doc
+
+
+def extract_text_from_pdf(file_path: str, file_hash: Optional[str] = None) -> str:
+    doc = extract_pdf(file_path, file_hash=file_hash)
+    return "\n".join(page["text"] for page in doc["pages"])
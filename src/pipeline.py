@@ -0,0 +1,443 @@
+# src/pipeline.py
+"""Cold email pipeline as a small dependency graph of stages.
+
+Independent stages (resume indexing, JD parsing, Hunter lookup) run in
+parallel on a thread pool, so end-to-end latency is roughly the longest
+dependency chain instead of the sum of every network call. Each stage has
+its own timeout; a stage that fails or times out either falls back to its
+default value or causes its dependents to be skipped.
+"""
+import os
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import metrics, portfolio, prefetch, prompt_budget
+from .pdf_utils import file_sha256
+from .embeddings_index import embed_texts
+from .hunter_client import find_recruiter_email
+from . import openai_email
+from .openai_email import (generate_cold_email, generate_cold_email_stream,
+                           generate_fused, generate_fused_stream)
+from .upload_store import StoredUpload
+
+_REQUIRED = object()  # marker: stage has no fallback, dependents get skipped
+
+EMPTY_JD_INFO = {"role_title": "", "company_name": "", "location": "", "top_skills": []}
+
+# seconds; override with e.g. PIPELINE_TIMEOUT_GENERATE=90
+STAGE_TIMEOUTS = {
+    "prepare_jd": 10.0,
+    "extract": 60.0,
+    "index": 120.0,
+    "select": 30.0,
+    "parse_jd": 60.0,
+    "retrieve": 60.0,
+    "fit_snippets": 10.0,
+    "hunter": 30.0,
+    "generate": 90.0,
+}
+
+# don't push more than ~20 partial updates per second to the UI
+STREAM_MIN_INTERVAL = 0.05
+
+
+def stage_timeout(name: str) -> float:
+    return float(os.environ.get(f"PIPELINE_TIMEOUT_{name.upper()}", STAGE_TIMEOUTS.get(name, 60.0)))
+
+
+class Stage:
+    """One node of the graph.
+
+    `fn` is called with the results of `deps` as keyword arguments. If it
+    raises or runs past `timeout`, the stage resolves to `default`; stages
+    without a default make their dependents fail as skipped.
+    """
+
+    def __init__(self, name: str, fn: Callable[..., Any], deps: Sequence[str] = (),
+                 timeout: Optional[float] = None, default: Any = _REQUIRED):
+        self.name = name
+        self.fn = fn
+        self.deps = tuple(deps)
+        self.timeout = timeout
+        self.default = default
+
+
+class StageEvent:
+    """Outcome of one stage, yielded as soon as the stage settles."""
+
+    def __init__(self, name: str, value: Any = None, error: Optional[str] = None,
+                 elapsed: float = 0.0, ok: bool = True):
+        self.name = name
+        self.value = value
+        self.error = error
+        self.elapsed = elapsed
+        self.ok = ok
+
+    def __repr__(self):
+        status = "ok" if self.ok else f"error={self.error!r}"
+        return f"StageEvent({self.name}, {status}, {self.elapsed:.3f}s)"
+
+
+def _run_stage(stage: Stage, trace_id: Optional[str], kwargs: Dict[str, Any]) -> Any:
+    with metrics.trace(trace_id), metrics.span(f"stage.{stage.name}"):
+        return stage.fn(**kwargs)
+
+
+def _count(event: StageEvent) -> StageEvent:
+    if event.ok:
+        outcome = "ok"
+    elif event.error.startswith("skipped"):
+        outcome = "skipped"
+    elif event.error.startswith("timed out"):
+        outcome = "timeout"
+    else:
+        outcome = "error"
+    metrics.inc("stage_outcomes_total", stage=event.name, outcome=outcome)
+    return event
+
+
+def iter_stages(stages: List[Stage], max_workers: Optional[int] = None,
+                trace_id: Optional[str] = None) -> Iterator[StageEvent]:
+    """Run `stages` respecting their deps, yielding a StageEvent per stage as it finishes.
+
+    Each stage runs in a `stage.<name>` span under `trace_id` (default: the
+    caller's current trace).
+    """
+    trace_id = trace_id or metrics.current_trace_id()
+    by_name = {s.name: s for s in stages}
+    for s in stages:
+        missing = [d for d in s.deps if d not in by_name]
+        if missing:
+            raise ValueError(f"Stage {s.name!r} depends on unknown stages {missing}")
+
+    results: Dict[str, Any] = {}
+    failed = set()          # settled without a usable value
+    pending = {s.name for s in stages}
+    running = {}            # future -> (stage, started_at)
+
+    pool = ThreadPoolExecutor(max_workers=max_workers or len(stages), thread_name_prefix="stage")
+    try:
+        while pending or running:
+            # settle stages whose deps failed, start stages whose deps are done
+            progressed = True
+            while progressed:
+                progressed = False
+                for name in sorted(pending):
+                    stage = by_name[name]
+                    bad = [d for d in stage.deps if d in failed]
+                    if bad:
+                        pending.discard(name)
+                        event = _settle(stage, results, failed,
+                                        error=f"skipped: {', '.join(bad)} failed", elapsed=0.0)
+                        progressed = True
+                        yield _count(event)
+                    elif all(d in results for d in stage.deps):
+                        pending.discard(name)
+                        kwargs = {d: results[d] for d in stage.deps}
+                        fut = pool.submit(_run_stage, stage, trace_id, kwargs)
+                        running[fut] = (stage, time.perf_counter())
+
+            if not running:
+                if pending:  # dependency cycle
+                    raise ValueError(f"Stages can never run: {sorted(pending)}")
+                break
+
+            now = time.perf_counter()
+            deadlines = [t0 + st.timeout - now for st, t0 in running.values() if st.timeout]
+            wait_for = max(0.0, min(deadlines)) if deadlines else None
+            done, _ = wait(list(running), timeout=wait_for, return_when=FIRST_COMPLETED)
+
+            now = time.perf_counter()
+            for fut in list(running):
+                stage, t0 = running[fut]
+                elapsed = now - t0
+                if fut in done:
+                    del running[fut]
+                    try:
+                        value = fut.result()
+                    except Exception as e:
+                        yield _count(_settle(stage, results, failed, error=f"{type(e).__name__}: {e}",
+                                             elapsed=elapsed))
+                    else:
+                        results[stage.name] = value
+                        yield _count(StageEvent(stage.name, value, elapsed=elapsed))
+                elif stage.timeout and elapsed >= stage.timeout:
+                    # can't kill a thread; abandon it and move on
+                    del running[fut]
+                    fut.cancel()
+                    yield _count(_settle(stage, results, failed, error=f"timed out after {stage.timeout:g}s",
+                                         elapsed=elapsed))
+    finally:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+
+def _settle(stage: Stage, results: Dict[str, Any], failed: set, error: str, elapsed: float) -> StageEvent:
+    if stage.default is _REQUIRED:
+        failed.add(stage.name)
+        return StageEvent(stage.name, None, error=error, elapsed=elapsed, ok=False)
+    results[stage.name] = stage.default
+    return StageEvent(stage.name, stage.default, error=error, elapsed=elapsed, ok=False)
+
+
+def run_stages(stages: List[Stage], max_workers: Optional[int] = None) -> Dict[str, StageEvent]:
+    """Run the graph to completion and return every stage's event by name."""
+    return {ev.name: ev for ev in iter_stages(stages, max_workers=max_workers)}
+
+
+# -----------------------------
+# Cold email graph
+# -----------------------------
+def _resume_list(resume_path: Optional[str], resume_hash: Optional[str],
+                 resumes: Optional[Sequence[StoredUpload]]) -> List[Tuple[str, Optional[str], str]]:
+    """(path, sha256 or None, display name) for each resume of the request."""
+    if resumes:
+        return [(str(u.path), u.sha256, u.name or portfolio.name_for(u.path, u.sha256)) for u in resumes]
+    return [(str(resume_path), resume_hash, portfolio.name_for(resume_path, resume_hash))]
+
+
+def cold_email_stages(resume_path: Optional[str], jd_text: str, recruiter_name: str,
+                      company_domain: str, user_id: str = "user1", top_k: int = 5,
+                      include_generate: bool = True, resume_hash: Optional[str] = None,
+                      fused: Optional[bool] = None,
+                      resumes: Optional[Sequence[StoredUpload]] = None) -> List[Stage]:
+    """extract -> index ─┬─> select -> retrieve -> fit_snippets ─┐
+       prepare_jd ───────┴─> parse_jd ────────────────────────────┼─> generate
+       hunter ────────────────────────────────────────────────────┘
+
+    Every resume goes into the user's portfolio (see portfolio); pass
+    several as `resumes` (upload store entries) and select picks the best
+    fit for this JD with one vectorized pass before retrieval. A single
+    `resume_path` is a portfolio of one.
+
+    `resume_hash` (the upload store's content hash) lets extract and index
+    skip work for a resume they've already seen, and join speculative work
+    still in flight for it (see prefetch; parse_jd joins the same way).
+    Selection and retrieval run in parallel with parse_jd: they boost the
+    parsed top skills only when the JD was already parsed (LLM cache, e.g.
+    by the speculative parse) and otherwise score the JD text alone, so the
+    LLM call never sits in series with embedding and reranking.
+    prepare_jd (boilerplate stripping + JD token budget) and fit_snippets
+    (dedupe + snippet token budget) are local and take milliseconds; see
+    prompt_budget. Their values carry the before/after token counts.
+
+    With `fused` (default: LLM_FUSED) there is no parse_jd stage: generate
+    makes one structured call that returns (jd_info, subject, body).
+    """
+    jd_text = jd_text or ""
+    if fused is None:
+        fused = openai_email.LLM_FUSED
+
+    items = _resume_list(resume_path, resume_hash, resumes)
+
+    def extract():
+        out = []
+        for path, sha, name in items:
+            sha = sha or file_sha256(path)
+            out.append({"text": prefetch.extract_resume(path, sha), "sha256": sha, "name": name})
+        return out
+
+    def prepare_jd():
+        return prompt_budget.prepare_jd(jd_text)
+
+    def index(extract):
+        return [prefetch.index_resume(r["text"], user_id, r["sha256"], r["name"])["resume_id"]
+                for r in extract]
+
+    def select(index, prepare_jd):
+        # without a fresh index, whatever the portfolio already holds for these files
+        ids = index or [portfolio.resume_id_for(sha) for _, sha, _ in items if sha]
+        text = prepare_jd["text"]
+        return portfolio.select_resumes(user_id, ids, [embed_texts([text])[0]], [text],
+                                        [openai_email.cached_top_skills(text)])[0]
+
+    def retrieve(select, prepare_jd):
+        text = prepare_jd["text"]
+        return portfolio.retrieve(user_id, [r["resume_id"] for r in select if r["selected"]],
+                                  text, top_k=top_k, skills=openai_email.cached_top_skills(text))
+
+    def fit_snippets(retrieve):
+        return prompt_budget.fit_snippets(retrieve)
+
+    def jd(prepare_jd):
+        return prefetch.parse_jd(prepare_jd["text"])
+
+    def hunter():
+        if recruiter_name and company_domain:
+            return find_recruiter_email(recruiter_name, company_domain)
+        return None
+
+    def generate(parse_jd, fit_snippets, hunter):
+        return generate_cold_email(parse_jd, fit_snippets["snippets"], recruiter_name, hunter)
+
+    def generate_one_call(prepare_jd, fit_snippets, hunter):
+        return generate_fused(prepare_jd["text"], fit_snippets["snippets"], recruiter_name, hunter)
+
+    stages = [
+        # never fails in practice; the fallback sends the JD as pasted
+        Stage("prepare_jd", prepare_jd, timeout=stage_timeout("prepare_jd"),
+              default={"text": jd_text, "tokens_before": 0, "tokens_after": 0}),
+        Stage("extract", extract, timeout=stage_timeout("extract")),
+        # index failure is tolerated: retrieval falls back to what's already indexed
+        Stage("index", index, deps=["extract"], timeout=stage_timeout("index"), default=None),
+        Stage("hunter", hunter, timeout=stage_timeout("hunter"), default=None),
+        Stage("select", select, deps=["index", "prepare_jd"], timeout=stage_timeout("select")),
+        Stage("retrieve", retrieve, deps=["select", "prepare_jd"], timeout=stage_timeout("retrieve"), default=[]),
+        Stage("fit_snippets", fit_snippets, deps=["retrieve"], timeout=stage_timeout("fit_snippets")),
+    ]
+    if fused:
+        if include_generate:
+            stages.append(Stage("generate", generate_one_call, deps=["prepare_jd", "fit_snippets", "hunter"],
+                                timeout=stage_timeout("generate")))
+        return stages
+
+    stages.append(Stage("parse_jd", jd, deps=["prepare_jd"], timeout=stage_timeout("parse_jd"),
+                        default=dict(EMPTY_JD_INFO)))
+    if include_generate:
+        stages.append(Stage("generate", generate, deps=["parse_jd", "fit_snippets", "hunter"],
+                            timeout=stage_timeout("generate")))
+    return stages
+
+
+def _new_state() -> Dict[str, Any]:
+    return {
+        "stage": None,
+        "done": False,
+        "jd_info": None,
+        "resumes": None,
+        "snippets": None,
+        "recruiter_email": None,
+        "subject": "",
+        "body": "",
+        "errors": {},
+        "timings": {},
+        "prompt_tokens": {"saved": 0},
+        "trace_id": None,
+    }
+
+
+_STATE_KEYS = {"parse_jd": "jd_info", "select": "resumes", "retrieve": "snippets", "hunter": "recruiter_email"}
+
+
+def iter_cold_email(resume_path: Optional[str], jd_text: str, recruiter_name: str,
+                    company_domain: str, user_id: str = "user1", top_k: int = 5,
+                    stream: bool = True, resume_hash: Optional[str] = None,
+                    fused: Optional[bool] = None,
+                    resumes: Optional[Sequence[StoredUpload]] = None) -> Iterator[Dict[str, Any]]:
+    """Yield a growing snapshot of the result as each stage finishes.
+
+    JD summary, resume ranking (`resumes`), snippets and recruiter email
+    appear as soon as their stages settle; with `stream=True` the
+    subject/body then fill in token by token.
+    In fused mode the JD summary arrives with the generation instead.
+    The last snapshot has `done=True`.
+    """
+    if fused is None:
+        fused = openai_email.LLM_FUSED
+    state = _new_state()
+    state["trace_id"] = trace_id = metrics.current_trace_id() or uuid.uuid4().hex[:16]
+    request_started = time.perf_counter()
+    stages = cold_email_stages(resume_path, jd_text, recruiter_name, company_domain,
+                               user_id=user_id, top_k=top_k, include_generate=False,
+                               resume_hash=resume_hash, fused=fused, resumes=resumes)
+
+    budget = {}
+    for ev in iter_stages(stages, trace_id=trace_id):
+        state["stage"] = ev.name
+        state["timings"][ev.name] = round(ev.elapsed, 4)
+        if ev.error:
+            state["errors"][ev.name] = ev.error
+        if ev.name in ("prepare_jd", "fit_snippets") and ev.value:
+            budget[ev.name] = ev.value
+            state["prompt_tokens"] = prompt_budget.summarize(budget.get("prepare_jd"), budget.get("fit_snippets"))
+            if ev.name == "fit_snippets":
+                state["snippets"] = ev.value["snippets"]
+                yield dict(state)
+        if ev.name in _STATE_KEYS:
+            state[_STATE_KEYS[ev.name]] = ev.value
+            yield dict(state)
+
+    snippets = state["snippets"] = state["snippets"] or []
+    prepared_jd = budget["prepare_jd"]["text"] if "prepare_jd" in budget else (jd_text or "")
+    if not fused:
+        jd_info = state["jd_info"] = state["jd_info"] or dict(EMPTY_JD_INFO)
+    state["stage"] = "generate"
+
+    started = time.perf_counter()
+    error = None
+    try:
+        if fused and stream:
+            last_push = 0.0
+            for jd_info, subject, body in generate_fused_stream(
+                    prepared_jd, snippets, recruiter_name, state["recruiter_email"],
+                    timeout=stage_timeout("generate")):
+                state["jd_info"] = jd_info or state["jd_info"]
+                state["subject"], state["body"] = subject, body
+                now = time.perf_counter()
+                if now - last_push >= STREAM_MIN_INTERVAL:
+                    last_push = now
+                    yield dict(state)
+        elif fused:
+            state["jd_info"], state["subject"], state["body"] = generate_fused(
+                prepared_jd, snippets, recruiter_name, state["recruiter_email"])
+        elif stream:
+            last_push = 0.0
+            for subject, body in generate_cold_email_stream(
+                    jd_info, snippets, recruiter_name, state["recruiter_email"],
+                    timeout=stage_timeout("generate")):
+                state["subject"], state["body"] = subject, body
+                now = time.perf_counter()
+                if now - last_push >= STREAM_MIN_INTERVAL:
+                    last_push = now
+                    yield dict(state)
+        else:
+            state["subject"], state["body"] = generate_cold_email(
+                jd_info, snippets, recruiter_name, state["recruiter_email"])
+    except Exception as e:
+        error = type(e).__name__
+        state["errors"]["generate"] = f"{error}: {e}"
+    elapsed = time.perf_counter() - started
+    state["timings"]["generate"] = round(elapsed, 4)
+    state["jd_info"] = state["jd_info"] or dict(EMPTY_JD_INFO)
+
+    # measured by hand: the streaming loop above spans yields to the caller
+    with metrics.trace(trace_id):
+        metrics.record_span("stage.generate", elapsed, error, streamed=stream, fused=fused)
+        metrics.inc("stage_outcomes_total", stage="generate", outcome="error" if error else "ok")
+        metrics.record_span("request.cold_email", time.perf_counter() - request_started,
+                            "StageError" if state["errors"] else None)
+
+    state["done"] = True
+    yield dict(state)
+
+
+def run_cold_email(resume_path: Optional[str], jd_text: str, recruiter_name: str,
+                   company_domain: str, user_id: str = "user1", top_k: int = 5,
+                   resume_hash: Optional[str] = None, fused: Optional[bool] = None,
+                   resumes: Optional[Sequence[StoredUpload]] = None) -> Dict[str, Any]:
+    """Run the whole graph and return plain results plus per-stage errors/timings."""
+    if fused is None:
+        fused = openai_email.LLM_FUSED
+    with metrics.trace(metrics.current_trace_id()) as trace_id, metrics.span("request.cold_email"):
+        events = run_stages(cold_email_stages(resume_path, jd_text, recruiter_name,
+                                              company_domain, user_id=user_id, top_k=top_k,
+                                              resume_hash=resume_hash, fused=fused, resumes=resumes))
+    if fused:
+        jd_info, subject, body = events["generate"].value or (None, "", "")
+    else:
+        jd_info = events["parse_jd"].value
+        subject, body = events["generate"].value or ("", "")
+    fitted = events["fit_snippets"].value
+    return {
+        "jd_info": jd_info or dict(EMPTY_JD_INFO),
+        "resumes": events["select"].value or [],
+        "snippets": (fitted or {}).get("snippets") or events["retrieve"].value or [],
+        "recruiter_email": events["hunter"].value,
+        "subject": subject,
+        "body": body,
+        "errors": {name: ev.error for name, ev in events.items() if ev.error},
+        "timings": {name: round(ev.elapsed, 4) for name, ev in events.items()},
+        "prompt_tokens": prompt_budget.summarize(events["prepare_jd"].value, fitted),
+        "trace_id": trace_id,
+    }
@@ -0,0 +1,285 @@
+# src/portfolio.py
+"""Resume portfolios: several tailored resumes per user, the best one picked per JD.
+
+Each resume is indexed once under its own key (`<user>--<resume_id>`: its
+own manifest, BM25 index and vector namespace). The user's portfolio file
+keeps two precomputed vectors per resume:
+
+  centroid  mean of its normalized chunk embeddings (unit length)
+  keywords  log-tf weights of its terms (bm25's tokenizer, so "c++" and "k8s" stay whole)
+
+Choosing a resume is one matrix product. Each resume is a row
+[sqrt(wd) * centroid, sqrt(wk) * keyword tf-idf] over the portfolio's
+vocabulary, each JD a row of the same shape, and JDs @ resumes.T gives
+wd * dense cosine + wk * keyword cosine for every pair at once; batch mode
+scores all its JDs in that single multiply. Retrieval and reranking then
+run only against the winner, plus runners-up within PORTFOLIO_MIX_MARGIN
+(up to PORTFOLIO_MIX resumes), whose chunks compete in one rerank.
+"""
+import json
+import logging
+import math
+import os
+import threading
+import time
+from collections import Counter, OrderedDict
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from . import metrics
+from .bm25 import reciprocal_rank_fusion, tokenize, weighted_query
+from .config import keyed_json_path
+from .embeddings_index import (HYBRID_SKILL_BOOST, drop_index, embed_texts, has_manifest, index_resume_text,
+                               load_chunk_texts, retrieve_candidates)
+from .reranker import rerank
+
+logger = logging.getLogger(__name__)
+
+PORTFOLIO_DIR = Path(os.environ.get("PORTFOLIO_DIR", "index_manifests/portfolios"))
+PORTFOLIO_DENSE_WEIGHT = float(os.environ.get("PORTFOLIO_DENSE_WEIGHT", "1.0"))
+PORTFOLIO_KEYWORD_WEIGHT = float(os.environ.get("PORTFOLIO_KEYWORD_WEIGHT", "0.5"))
+PORTFOLIO_MIX = int(os.environ.get("PORTFOLIO_MIX", "1"))  # resumes whose chunks may be mixed
+PORTFOLIO_MIX_MARGIN = float(os.environ.get("PORTFOLIO_MIX_MARGIN", "0.03"))
+PORTFOLIO_KEYWORD_TERMS = int(os.environ.get("PORTFOLIO_KEYWORD_TERMS", "300"))
+PORTFOLIO_CACHE_USERS = int(os.environ.get("PORTFOLIO_CACHE_USERS", "256"))
+
+
+def resume_id_for(source_hash: str) -> str:
+    return source_hash[:16]
+
+
+def resume_key(user_id: str, resume_id: str) -> str:
+    """Index key (manifest / namespace / chunk-ID prefix) of one resume."""
+    return f"{user_id}--{resume_id}"
+
+
+def name_for(path, source_hash: str) -> str:
+    """Display name from a file path; "" for upload-store files, which are named by hash."""
+    path = Path(str(path))
+    return "" if path.stem == source_hash else path.name
+
+
+# -----------------------------
+# Storage
+# -----------------------------
+_lock = threading.Lock()  # read-modify-write of portfolio files
+
+
+def _path(user_id: str) -> Path:
+    return keyed_json_path(PORTFOLIO_DIR, user_id)
+
+
+def _load(user_id: str) -> Dict:
+    try:
+        return json.loads(_path(user_id).read_text())
+    except (OSError, ValueError):
+        return {"user_id": user_id, "resumes": {}}
+
+
+def _save(user_id: str, data: Dict) -> None:
+    PORTFOLIO_DIR.mkdir(parents=True, exist_ok=True)
+    path = _path(user_id)
+    tmp = path.with_suffix(f".{os.getpid()}.tmp")
+    tmp.write_text(json.dumps(data))
+    tmp.replace(path)
+
+
+def _centroid(texts: List[str]) -> List[float]:
+    embs = np.asarray(embed_texts(texts), dtype=np.float32)
+    embs /= np.maximum(np.linalg.norm(embs, axis=1, keepdims=True), 1e-12)
+    mean = embs.mean(axis=0)
+    return (mean / max(float(np.linalg.norm(mean)), 1e-12)).round(6).tolist()
+
+
+def _keywords(texts: List[str]) -> Dict[str, float]:
+    counts = Counter(t for text in texts for t in tokenize(text))
+    top = counts.most_common(PORTFOLIO_KEYWORD_TERMS)
+    return {term: round(1.0 + math.log(tf), 4) for term, tf in top}
+
+
+def _public(entry: Dict) -> Dict:
+    return {k: v for k, v in entry.items() if k not in ("centroid", "keywords")}
+
+
+def list_resumes(user_id: str) -> List[Dict]:
+    """The user's resumes, oldest first: {resume_id, name, source, chunks, added_at}."""
+    entries = _load(user_id)["resumes"].values()
+    return [_public(e) for e in sorted(entries, key=lambda e: e.get("added_at", 0))]
+
+
+def add_resume(user_id: str, resume_text: str, source_hash: str, name: str = "",
+               replaces: Optional[str] = None) -> Dict:
+    """Index a resume under its own key and (re)compute its portfolio vectors.
+
+    An already-indexed file costs a manifest check, and the portfolio file
+    is only rewritten when something changed. `replaces` names a resume_id
+    this one supersedes (e.g. a new version of the same resume); it is
+    removed along with its vectors. Nothing is ever replaced implicitly.
+    An empty `name` keeps the one the resume already has.
+
+    The user's pre-portfolio index (one resume under the plain user key) is
+    deleted once the first portfolio resume is indexed; nothing reads it.
+    """
+    rid = resume_id_for(source_hash)
+    key = resume_key(user_id, rid)
+    stats = index_resume_text(resume_text, user_id=key, source_hash=source_hash)
+
+    with _lock:
+        data = _load(user_id)
+        old = data["resumes"].get(rid)
+        entry = dict(old) if old else None
+        if entry is None or stats["added"] or stats["removed"]:
+            texts = list(load_chunk_texts(key).values())
+            with metrics.span("portfolio.vectors", chunks=len(texts)):
+                entry = {"resume_id": rid, "source": source_hash, "chunks": len(texts),
+                         "added_at": (old or {}).get("added_at", time.time()),
+                         "centroid": _centroid(texts) if texts else None,
+                         "keywords": _keywords(texts)}
+        entry["name"] = name or (old or {}).get("name") or rid
+        replaced = [replaces] if replaces and replaces != rid and replaces in data["resumes"] else []
+        for r in replaced:
+            del data["resumes"][r]
+        if entry != old or replaced:
+            data["resumes"][rid] = entry
+            _save(user_id, data)
+
+    for r in replaced:
+        drop_index(resume_key(user_id, r))
+    if has_manifest(user_id):
+        logger.info("Dropping %s's pre-portfolio index (%d vectors)", user_id, drop_index(user_id))
+    return dict(stats, resume_id=rid, name=entry["name"], replaced=replaced)
+
+
+def remove_resume(user_id: str, resume_id: str) -> bool:
+    with _lock:
+        data = _load(user_id)
+        if data["resumes"].pop(resume_id, None) is None:
+            return False
+        _save(user_id, data)
+    drop_index(resume_key(user_id, resume_id))
+    return True
+
+
+# -----------------------------
+# Selection
+# -----------------------------
+class _Matrix:
+    """A portfolio as one (resumes x features) matrix, see the module docstring."""
+
+    def __init__(self, entries: List[Dict]):
+        entries = [e for e in entries if e.get("centroid")]
+        self.ids = [e["resume_id"] for e in entries]
+        self.names = [e.get("name", e["resume_id"]) for e in entries]
+        self.row = {rid: i for i, rid in enumerate(self.ids)}
+        self.vocab: Dict[str, int] = {}
+        for e in entries:
+            for term in e["keywords"]:
+                self.vocab.setdefault(term, len(self.vocab))
+        n = len(entries)
+        df = np.zeros(len(self.vocab), dtype=np.float32)
+        kw = np.zeros((n, len(self.vocab)), dtype=np.float32)
+        for i, e in enumerate(entries):
+            for term, w in e["keywords"].items():
+                kw[i, self.vocab[term]] = w
+                df[self.vocab[term]] += 1
+        # a term every resume has can't tell them apart
+        self.idf = np.log1p(n / np.maximum(df, 1.0)).astype(np.float32)
+        dense = np.asarray([e["centroid"] for e in entries], dtype=np.float32).reshape(n, -1)
+        self.features = np.hstack([math.sqrt(PORTFOLIO_DENSE_WEIGHT) * dense,
+                                   math.sqrt(PORTFOLIO_KEYWORD_WEIGHT) * _unit_rows(kw * self.idf)])
+
+    def queries(self, jd_embs, jd_texts: Sequence[str], skills: Sequence[Optional[List[str]]]) -> np.ndarray:
+        dense = _unit_rows(np.asarray(jd_embs, dtype=np.float32).reshape(len(jd_texts), -1))
+        kw = np.zeros((len(jd_texts), len(self.vocab)), dtype=np.float32)
+        for i, (text, sk) in enumerate(zip(jd_texts, skills)):
+            for term, w in weighted_query(text, sk or (), HYBRID_SKILL_BOOST).items():
+                col = self.vocab.get(term)
+                if col is not None:
+                    kw[i, col] = 1.0 + math.log(w) if w >= 1 else w
+        return np.hstack([math.sqrt(PORTFOLIO_DENSE_WEIGHT) * dense,
+                          math.sqrt(PORTFOLIO_KEYWORD_WEIGHT) * _unit_rows(kw * self.idf)])
+
+
+def _unit_rows(m: np.ndarray) -> np.ndarray:
+    return m / np.maximum(np.linalg.norm(m, axis=1, keepdims=True), 1e-12)
+
+
+# user_id -> (portfolio mtime, matrix)
+_matrices: "OrderedDict[str, tuple]" = OrderedDict()
+
+
+def _matrix(user_id: str) -> _Matrix:
+    try:
+        stamp = _path(user_id).stat().st_mtime_ns
+    except OSError:
+        stamp = 0
+    with _lock:
+        cached = _matrices.get(user_id)
+        if cached and cached[0] == stamp:
+            _matrices.move_to_end(user_id)
+            return cached[1]
+        matrix = _Matrix(list(_load(user_id)["resumes"].values()))
+        _matrices[user_id] = (stamp, matrix)
+        while len(_matrices) > PORTFOLIO_CACHE_USERS:
+            _matrices.popitem(last=False)
+        return matrix
+
+
+def select_resumes(user_id: str, resume_ids: Sequence[str], jd_embs, jd_texts: Sequence[str],
+                   skills: Optional[Sequence[Optional[List[str]]]] = None) -> List[List[Dict]]:
+    """For each JD, `resume_ids` ranked by fit: [{resume_id, name, score, selected}].
+
+    All JDs are scored against all resumes in one matrix multiply.
+    `selected` marks the resumes to retrieve from: the best, plus those
+    within PORTFOLIO_MIX_MARGIN of it, at most PORTFOLIO_MIX.
+    """
+    m = _matrix(user_id)
+    rows = [m.row[rid] for rid in dict.fromkeys(resume_ids) if rid in m.row]
+    if not rows:
+        raise ValueError(f"None of {list(resume_ids)} is in {user_id}'s portfolio")
+    skills = skills or [None] * len(jd_texts)
+
+    with metrics.span("portfolio.select", jds=len(jd_texts), resumes=len(rows)):
+        scores = m.queries(jd_embs, jd_texts, skills) @ m.features[rows].T  # (jds, resumes)
+
+    out = []
+    for per_jd in scores:
+        order = np.argsort(-per_jd)
+        best = float(per_jd[order[0]])
+        ranked = []
+        for rank, i in enumerate(order):
+            score = float(per_jd[i])
+            ranked.append({"resume_id": m.ids[rows[i]], "name": m.names[rows[i]], "score": round(score, 4),
+                           "selected": rank < max(1, PORTFOLIO_MIX) and score >= best - PORTFOLIO_MIX_MARGIN})
+        out.append(ranked)
+    return out
+
+
+def retrieve(user_id: str, resume_ids: Sequence[str], jd_text: str, top_k: int = 8,
+             jd_emb=None, skills: Optional[List[str]] = None) -> List[Dict]:
+    """Retrieve + rerank across the given resumes; snippets carry their `resume_id`.
+
+    With several resumes their candidate lists are merged by rank (RRF), so
+    the order the reranker keeps when it skips still interleaves them.
+    """
+    if jd_emb is None:
+        jd_emb = embed_texts([jd_text])[0]
+    by_id, rankings = {}, []
+    for rid in resume_ids:
+        ranking = []
+        for m in retrieve_candidates(jd_text, resume_key(user_id, rid), top_k, jd_emb, skills):
+            by_id[m["id"]] = dict(m, metadata=dict(m["metadata"], resume_id=rid))
+            ranking.append(m["id"])
+        rankings.append(ranking)
+    order = rankings[0] if len(rankings) == 1 else [vid for vid, _ in reciprocal_rank_fusion(rankings)]
+
+    matches, seen = [], set()
+    for vid in order:
+        text = by_id[vid]["metadata"].get("text", "")
+        if text in seen:
+            continue  # tailored resumes share bullets
+        seen.add(text)
+        matches.append(by_id[vid])
+    return rerank(jd_text, matches, top_k)
@@ -0,0 +1,210 @@
+# src/prefetch.py
+"""Speculative work that starts before the user clicks Generate.
+
+A resume upload kicks off extraction, chunking, embedding and indexing in
+the background; an edit to the JD schedules `parse_jd` after a debounce
+(PREFETCH_JD_DEBOUNCE seconds without further edits). Both are keyed by
+content hash, and the pipeline calls the same `extract_resume`,
+`index_resume` and `parse_jd` wrappers, so a Generate click joins work
+that is still in flight instead of repeating it, and finds finished work
+in the PDF / manifest / LLM caches. Speculative work runs on a small
+pool (PREFETCH_WORKERS); its failures are only logged, since the
+pipeline will simply do the work itself.
+
+    upload = speculate_resume(path, user_id)   # on gr.File upload
+    speculate_jd(jd_text, session_key)         # on every JD edit
+"""
+import hashlib
+import logging
+import os
+import threading
+import weakref
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Hashable, Optional
+
+from . import metrics, openai_email, portfolio, prompt_budget
+from .pdf_utils import extract_text_from_pdf
+from .upload_store import StoredUpload, store_upload
+
+logger = logging.getLogger(__name__)
+
+PREFETCH_ENABLED = os.environ.get("PREFETCH_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+PREFETCH_WORKERS = int(os.environ.get("PREFETCH_WORKERS", "2"))
+PREFETCH_JD_DEBOUNCE = float(os.environ.get("PREFETCH_JD_DEBOUNCE", "1.0"))
+
+
+# -----------------------------
+# Shared in-flight calls
+# -----------------------------
+class SingleFlight:
+    """Concurrent calls with the same key share one execution.
+
+    Only in-flight calls are shared; once the leader returns, the next
+    call runs again (finished results live in the underlying caches).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, Future] = {}
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            fut = self._calls.get(key)
+            leader = fut is None
+            if leader:
+                fut = self._calls[key] = Future()
+        if not leader:
+            metrics.inc("singleflight_joined_total", op=str(key[0] if isinstance(key, tuple) else key))
+            return fut.result()
+        try:
+            result = fn()
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._calls.pop(key, None)
+
+    def in_flight(self, key: Hashable) -> bool:
+        with self._lock:
+            return key in self._calls
+
+
+flights = SingleFlight()
+
+# one indexing run per resume key at a time: the speculative run and a
+# request's run would otherwise race on the same manifest / namespace
+_key_locks: "weakref.WeakValueDictionary[str, threading.Lock]" = weakref.WeakValueDictionary()
+_key_locks_guard = threading.Lock()
+
+
+def _key_lock(key: str) -> threading.Lock:
+    with _key_locks_guard:
+        lock = _key_locks.get(key)
+        if lock is None:
+            lock = _key_locks[key] = threading.Lock()
+        return lock
+
+
+def extract_resume(path: str, file_hash: str) -> str:
+    return flights.do(("extract", file_hash), lambda: extract_text_from_pdf(path, file_hash=file_hash))
+
+
+def index_resume(resume_text: str, user_id: str, source_hash: str, name: str = "",
+                 replaces: Optional[str] = None) -> Dict:
+    """Add the resume to the user's portfolio (see portfolio.add_resume)."""
+    def run():
+        with _key_lock(portfolio.resume_key(user_id, portfolio.resume_id_for(source_hash))):
+            return portfolio.add_resume(user_id, resume_text, source_hash, name=name, replaces=replaces)
+    return flights.do(("index", user_id, source_hash), run)
+
+
+def parse_jd(jd_text: str) -> Dict:
+    """`openai_email.parse_jd` on an already prepared JD, shared while in flight."""
+    key = ("parse_jd", hashlib.sha256(jd_text.encode("utf-8")).hexdigest())
+    return flights.do(key, lambda: openai_email.parse_jd(jd_text))
+
+
+# -----------------------------
+# Background pool + debounce
+# -----------------------------
+_pool: Optional[ThreadPoolExecutor] = None
+_pool_lock = threading.Lock()
+
+
+def _get_pool() -> ThreadPoolExecutor:
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ThreadPoolExecutor(max_workers=max(1, PREFETCH_WORKERS), thread_name_prefix="prefetch")
+        return _pool
+
+
+def _submit(kind: str, fn: Callable[[], Any]) -> Future:
+    def run():
+        try:
+            with metrics.trace(None), metrics.span(f"prefetch.{kind}"):
+                result = fn()
+        except Exception as e:
+            metrics.inc("prefetch_total", kind=kind, result="error")
+            logger.info("Speculative %s failed (the request will retry it): %s", kind, e)
+            return None
+        metrics.inc("prefetch_total", kind=kind, result="ok")
+        return result
+    return _get_pool().submit(run)
+
+
+class Debouncer:
+    """Run `fn` for a key only after `delay` seconds without another call for it."""
+
+    def __init__(self, delay: float):
+        self.delay = delay
+        self._lock = threading.Lock()
+        self._timers: Dict[Hashable, threading.Timer] = {}
+
+    def call(self, key: Hashable, fn: Callable[[], Any]) -> None:
+        timer = threading.Timer(self.delay, self._fire, args=(key, fn))
+        timer.daemon = True
+        with self._lock:
+            old = self._timers.get(key)
+            if old is not None:
+                old.cancel()
+            self._timers[key] = timer
+        timer.start()
+
+    def cancel(self, key: Hashable) -> None:
+        with self._lock:
+            timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+
+    def _fire(self, key: Hashable, fn: Callable[[], Any]) -> None:
+        with self._lock:
+            if self._timers.get(key) is not threading.current_thread():
+                return  # superseded by a later call
+            del self._timers[key]
+        fn()
+
+
+_jd_debouncer = Debouncer(PREFETCH_JD_DEBOUNCE)
+
+
+def speculate_resume(src_path: str, user_id: str, name: str = "",
+                     replaces: Optional[str] = None) -> Optional[StoredUpload]:
+    """Store an upload and start extracting + indexing it into the portfolio in the background.
+
+    `name` is the resume's display name (default: the file's name);
+    `replaces` as in portfolio.add_resume.
+    """
+    if not PREFETCH_ENABLED or not src_path:
+        return None
+    upload = store_upload(src_path)
+    if name:
+        upload.name = name
+    path, sha, name = str(upload.path), upload.sha256, upload.name
+    _submit("resume", lambda: index_resume(extract_resume(path, sha), user_id, sha, name, replaces))
+    return upload
+
+
+def speculate_jd(jd_text: str, session_key: Hashable) -> None:
+    """Parse the JD once the user stops typing for PREFETCH_JD_DEBOUNCE seconds.
+
+    Skipped in fused mode, where the JD is parsed by the generation call.
+    """
+    if not PREFETCH_ENABLED or openai_email.LLM_FUSED or not (jd_text or "").strip():
+        _jd_debouncer.cancel(session_key)
+        return
+
+    def start():
+        text = prompt_budget.prepare_jd(jd_text, record=False)["text"]
+        _submit("parse_jd", lambda: parse_jd(text))
+
+    _jd_debouncer.call(session_key, start)
+
+
+def cancel_jd(session_key: Hashable) -> None:
+    """Drop a pending (not yet started) JD speculation; Generate parses it now anyway."""
+    _jd_debouncer.cancel(session_key)
@@ -0,0 +1,262 @@
+# src/prompt_budget.py
+"""Prompt preprocessing: strip JD boilerplate, dedupe snippets, enforce token budgets.
+
+Prompt tokens drive both OpenAI latency and cost. Before a JD reaches the
+model, sections that never matter for the email (EEO statements, benefits
+blurbs, cookie banners, "apply now" footers) are dropped with local
+heuristics and the rest is capped at PROMPT_BUDGET_JD tokens. Retrieved
+resume snippets lose sentences that an earlier (better-ranked) snippet
+already contains, then are packed in rank order into
+PROMPT_BUDGET_SNIPPETS tokens. A budget of 0 disables that cap.
+
+Tokens are counted with tiktoken's encoding for the chat model when it's
+installed, otherwise estimated. Both steps return a small report (tokens
+before / after) that the pipeline keeps per request; the savings are also
+counted in `prompt_tokens_saved_total{section}`.
+"""
+import logging
+import os
+import re
+from typing import Dict, List
+
+from . import metrics
+from .lazy import Lazy
+
+logger = logging.getLogger(__name__)
+
+PROMPT_BUDGET_JD = int(os.environ.get("PROMPT_BUDGET_JD", "1500"))
+PROMPT_BUDGET_SNIPPETS = int(os.environ.get("PROMPT_BUDGET_SNIPPETS", "800"))
+PROMPT_MIN_SNIPPET_TOKENS = int(os.environ.get("PROMPT_MIN_SNIPPET_TOKENS", "40"))  # shorter tails are dropped
+JD_STRIP_BOILERPLATE = os.environ.get("JD_STRIP_BOILERPLATE", "1").strip().lower() not in ("0", "false", "no")
+PROMPT_TOKENIZER_ENCODING = os.environ.get("PROMPT_TOKENIZER_ENCODING", "o200k_base")  # gpt-4.1 family
+
+
+# -----------------------------
+# Token counting
+# -----------------------------
+def _load_encoding():
+    import tiktoken
+    return tiktoken.get_encoding(PROMPT_TOKENIZER_ENCODING)
+
+
+encoding = Lazy("prompt_tokenizer", _load_encoding)
+_encoding_unavailable = False
+
+
+def _encoding():
+    global _encoding_unavailable
+    if _encoding_unavailable:
+        return None
+    try:
+        return encoding.get()
+    except Exception as e:
+        logger.warning("tiktoken unavailable, estimating prompt tokens: %s", e)
+        _encoding_unavailable = True
+        return None
+
+
+def _approx_tokens(text: str) -> int:
+    # BPE averages ~4 characters per token on English; every word costs at least one
+    return max(len(text) // 4, len(text.split()))
+
+
+def count_tokens(text: str) -> int:
+    enc = _encoding()
+    if enc is not None:
+        return len(enc.encode(text, disallowed_special=()))
+    return _approx_tokens(text)
+
+
+def truncate_tokens(text: str, budget: int) -> str:
+    """The longest prefix of `text` within `budget` tokens, cut at a word boundary."""
+    if budget <= 0 or count_tokens(text) <= budget:
+        return text
+    enc = _encoding()
+    if enc is not None:
+        cut = enc.decode(enc.encode(text, disallowed_special=())[:budget])
+    else:
+        cut = text[:budget * 4]
+    if not cut[-1:].isspace() and " " in cut:
+        cut = cut.rsplit(" ", 1)[0]
+    return cut.rstrip()
+
+
+# -----------------------------
+# JD boilerplate
+# -----------------------------
+# a heading that starts a section we drop up to the next heading; the whole
+# heading must be the title, so "Privacy Engineer" or "Benefits Analyst" is kept
+_BOILERPLATE_HEADING_RE = re.compile(
+    r"^(?:our |the )?(?:benefits|perks|perks (?:&|and) benefits|benefits (?:&|and) perks|what we offer"
+    r"|compensation (?:&|and) benefits|equal (?:employment )?opportunity(?: employer| statement)?"
+    r"|eeo(?: statement)?|diversity(?:,| &| and) inclusion|accommodations?|privacy(?: notice| policy)?"
+    r"|how to apply|application process|pay transparency|e-verify|disclaimer)(?:\s*:)?\s*$", re.I)
+
+_BOILERPLATE_PHRASES = [re.compile(p, re.I) for p in (
+    r"equal (?:employment )?opportunity", r"without regard to", r"regardless of (?:race|age|gender|sex)",
+    r"reasonable accommodations?", r"e-verify", r"protected veteran", r"affirmative action",
+    r"we use cookies", r"accept (?:all )?cookies", r"cookie (?:policy|settings|preferences)",
+    r"by continuing to (?:use|browse)", r"privacy (?:policy|notice)",
+    r"401\(?k\)?", r"paid time off|\bpto\b", r"(?:medical|health),? dental", r"parental leave",
+    r"wellness (?:stipend|program)", r"apply now", r"share this job", r"similar jobs", r"job alerts?",
+    r"recruitment (?:fraud|scams?)",
+)]
+
+_LONG_BLOCK_WORDS = 80
+_SENTENCE_RE = re.compile(r"(?<=[.!?;])\s+")
+
+
+def _is_jd_heading(line: str) -> bool:
+    s = line.strip()
+    if not s or len(s.split()) > 6 or s[-1] in ".,;!?":
+        return False
+    core = s.rstrip(":").strip()
+    return s.endswith(":") or core.isupper() or core.istitle()
+
+
+def _blocks(lines: List[str]) -> List[List[str]]:
+    """Group lines into paragraphs; single-line paragraphs when there are no blank lines."""
+    if not any(not l.strip() for l in lines):
+        return [[l] for l in lines]
+    blocks, current = [], []
+    for line in lines:
+        if line.strip():
+            current.append(line)
+        elif current:
+            blocks.append(current)
+            current = []
+    if current:
+        blocks.append(current)
+    return blocks
+
+
+def _drop_boilerplate_sentences(line: str) -> str:
+    sentences = _SENTENCE_RE.split(line)
+    return " ".join(x for x in sentences if not any(p.search(x) for p in _BOILERPLATE_PHRASES))
+
+
+def strip_boilerplate(jd_text: str) -> str:
+    """Drop EEO / benefits / cookie / apply-now sections and paragraphs from a JD."""
+    kept_lines, skipping = [], False
+    for line in (jd_text or "").replace("\r\n", "\n").split("\n"):
+        if _is_jd_heading(line):
+            skipping = bool(_BOILERPLATE_HEADING_RE.match(line.strip()))
+        if not skipping:
+            kept_lines.append(line)
+
+    kept = []
+    for block in _blocks(kept_lines):
+        text = " ".join(block)
+        hits = sum(1 for p in _BOILERPLATE_PHRASES if p.search(text))
+        if hits >= 2 and len(text.split()) <= _LONG_BLOCK_WORDS:
+            continue  # a short paragraph that's mostly boilerplate
+        if hits:
+            # otherwise only the matching sentences go: one "PTO" or "apply now"
+            # doesn't make a responsibilities paragraph boilerplate
+            block = [line for line in (_drop_boilerplate_sentences(l) for l in block) if line.strip()]
+            if not block:
+                continue
+        kept.append("\n".join(block))
+
+    cleaned = "\n\n".join(kept).strip() if any(not l.strip() for l in kept_lines) else "\n".join(kept).strip()
+    return cleaned or (jd_text or "").strip()  # never strip a JD to nothing
+
+
+def prepare_jd(jd_text: str, budget: int = None, record: bool = True) -> Dict:
+    """{"text", "tokens_before", "tokens_after"}: the JD as sent to the model.
+
+    `record=False` leaves the token counters alone (speculative calls).
+    """
+    budget = PROMPT_BUDGET_JD if budget is None else budget
+    jd_text = jd_text or ""
+    before = count_tokens(jd_text)
+    text = strip_boilerplate(jd_text) if JD_STRIP_BOILERPLATE else jd_text.strip()
+    text = truncate_tokens(text, budget)
+    after = count_tokens(text)
+    if record:
+        _record("jd", before, after)
+    return {"text": text, "tokens_before": before, "tokens_after": after}
+
+
+# -----------------------------
+# Snippets
+# -----------------------------
+_NORM_RE = re.compile(r"[^a-z0-9+#]+")
+_MIN_DUP_WORDS = 4  # shorter fragments ("Python.") may legitimately repeat
+
+
+def _norm(text: str) -> str:
+    return " ".join(_NORM_RE.sub(" ", text.lower()).split())
+
+
+def dedupe_snippets(snippets: List[Dict]) -> List[Dict]:
+    """Drop sentences already covered by a better-ranked snippet (or earlier in the same one).
+
+    A sentence counts as covered when its normalized text occurs, as whole
+    words, inside the text kept so far, which also catches fragments cut by
+    an overlapping chunk window. Snippets left empty are dropped.
+    """
+    out, seen = [], ""
+    for snip in snippets:
+        lines = []
+        for line in (snip.get("text") or "").split("\n"):
+            fresh = []
+            for sentence in _SENTENCE_RE.split(line):
+                norm = _norm(sentence)
+                if not norm:
+                    continue
+                # padded so "rest apis in go" doesn't match inside "... in golang"
+                if len(norm.split()) >= _MIN_DUP_WORDS and f" {norm} " in seen + " ":
+                    continue
+                fresh.append(sentence.strip())
+                seen += " " + norm
+            if fresh:
+                lines.append(" ".join(fresh))
+        if lines:
+            out.append(dict(snip, text="\n".join(lines)))
+    return out
+
+
+def fit_snippets(snippets: List[Dict], budget: int = None) -> Dict:
+    """{"snippets", "tokens_before", "tokens_after"}: deduped, in rank order, within `budget`.
+
+    The snippet that crosses the budget is truncated if at least
+    PROMPT_MIN_SNIPPET_TOKENS of it fit; everything after it is dropped.
+    """
+    budget = PROMPT_BUDGET_SNIPPETS if budget is None else budget
+    snippets = snippets or []
+    before = sum(count_tokens(s.get("text") or "") for s in snippets)
+
+    fitted, used = [], 0
+    for snip in dedupe_snippets(snippets):
+        tokens = count_tokens(snip["text"])
+        if budget <= 0 or used + tokens <= budget:
+            fitted.append(snip)
+            used += tokens
+            continue
+        room = budget - used
+        if room >= PROMPT_MIN_SNIPPET_TOKENS:
+            text = truncate_tokens(snip["text"], room)
+            fitted.append(dict(snip, text=text))
+            used += count_tokens(text)
+        break
+
+    _record("snippets", before, used)
+    return {"snippets": fitted, "tokens_before": before, "tokens_after": used}
+
+
+def _record(section: str, before: int, after: int) -> None:
+    metrics.inc("prompt_tokens_total", after, section=section)
+    if before > after:
+        metrics.inc("prompt_tokens_saved_total", before - after, section=section)
+
+
+def summarize(jd: Dict = None, snippets: Dict = None) -> Dict:
+    """Per-request report: {"jd": [before, after], "snippets": [before, after], "saved": n}."""
+    report, saved = {}, 0
+    for name, part in (("jd", jd), ("snippets", snippets)):
+        if part:
+            report[name] = [part["tokens_before"], part["tokens_after"]]
+            saved += part["tokens_before"] - part["tokens_after"]
+    report["saved"] = saved
+    return report
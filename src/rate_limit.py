@@ -0,0 +1,71 @@
+# src/rate_limit.py
+import threading
+import time
+
+from . import metrics
+
+
+class TokenBucket:
+    """Thread-safe token bucket: `rate` tokens/second, bursts up to `capacity`.
+
+    A rate of 0 (or less) disables limiting.
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else max(1.0, self.rate))
+        self._tokens = self.capacity
+        self._last = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        self._tokens = min(self.capacity, self._tokens + (now - self._last) * self.rate)
+        self._last = now
+
+    def try_acquire(self, tokens: float = 1.0) -> float:
+        """Take tokens if available; otherwise return how long to wait (0 means taken)."""
+        if self.rate <= 0:
+            return 0.0
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return 0.0
+            return (tokens - self._tokens) / self.rate
+
+    def acquire(self, tokens: float = 1.0) -> None:
+        """Block until `tokens` are available."""
+        while True:
+            delay = self.try_acquire(tokens)
+            if delay <= 0:
+                return
+            time.sleep(delay)
+
+
+class ConcurrencyLimit:
+    """Caps how many threads run a block at once; a limit of 0 (or less) disables it.
+
+        with embed_limit:
+            model.encode(...)
+
+    Used around CPU model inference: each call already spreads over every
+    core, so running many at once only adds contention. Time spent queued is
+    recorded as `concurrency_wait_seconds{limit=<name>}`.
+    """
+
+    def __init__(self, name: str, limit: int):
+        self.name = name
+        self.limit = int(limit)
+        self._sem = threading.BoundedSemaphore(self.limit) if self.limit > 0 else None
+
+    def __enter__(self):
+        if self._sem is not None:
+            started = time.perf_counter()
+            self._sem.acquire()
+            metrics.observe("concurrency_wait_seconds", time.perf_counter() - started, limit=self.name)
+        return self
+
+    def __exit__(self, *exc):
+        if self._sem is not None:
+            self._sem.release()
+        return False
@@ -0,0 +1,165 @@
+# src/reranker.py
+"""Cross-encoder reranking tuned for CPU-only hosts.
+
+- RERANK_BACKEND picks the model runtime:
+    "torch" (default) full-precision CrossEncoder
+    "int8"            same model with dynamically int8-quantized Linear layers
+    "onnx"            ONNX Runtime via sentence-transformers' backend="onnx"
+                      (RERANK_ONNX_FILE selects e.g. onnx/model_qint8_avx2.onnx)
+- Scores are cached per (backend, JD hash, chunk hash), so re-running the
+  same JD against an unchanged resume never re-scores a pair.
+- The adaptive policy skips the cross-encoder entirely when it can't change
+  the answer: when there are no more candidates than `top_k`, or when the
+  dense scores already separate the top-k from the rest by RERANK_MARGIN.
+"""
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Dict, List, Tuple
+
+from . import metrics
+from .lazy import Lazy
+from .rate_limit import ConcurrencyLimit
+
+RERANK_MODEL_NAME = "cross-encoder/ms-marco-MiniLM-L-6-v2"
+RERANK_BACKEND = os.environ.get("RERANK_BACKEND", "torch").strip().lower()
+RERANK_ONNX_FILE = os.environ.get("RERANK_ONNX_FILE", "").strip()
+RERANK_CANDIDATES = int(os.environ.get("RERANK_CANDIDATES", "20"))    # dense candidates fetched
+RERANK_MARGIN = float(os.environ.get("RERANK_MARGIN", "0.15"))         # cosine gap that skips reranking
+RERANK_CACHE_ITEMS = int(os.environ.get("RERANK_CACHE_ITEMS", "4096"))
+RERANK_CONCURRENCY = int(os.environ.get("RERANK_CONCURRENCY", "1"))   # predicts at once, 0 = no cap
+
+
+def load_cross_encoder(backend: str = RERANK_BACKEND):
+    from sentence_transformers import CrossEncoder
+
+    if backend == "torch":
+        return CrossEncoder(RERANK_MODEL_NAME)
+
+    if backend == "int8":
+        import torch
+
+        model = CrossEncoder(RERANK_MODEL_NAME, device="cpu")
+        torch.quantization.quantize_dynamic(model.model, {torch.nn.Linear}, dtype=torch.qint8, inplace=True)
+        return model
+
+    if backend == "onnx":
+        kwargs = {"backend": "onnx"}
+        if RERANK_ONNX_FILE:
+            kwargs["model_kwargs"] = {"file_name": RERANK_ONNX_FILE}
+        try:
+            return CrossEncoder(RERANK_MODEL_NAME, **kwargs)
+        except TypeError as e:
+            raise RuntimeError(
+                "RERANK_BACKEND=onnx needs sentence-transformers with CrossEncoder backend support "
+                "(pip install 'sentence-transformers[onnx]')"
+            ) from e
+
+    raise ValueError(f"Unknown RERANK_BACKEND: {backend!r}")
+
+
+rerank_model = Lazy("rerank_model", load_cross_encoder)
+
+
+def get_rerank_model():
+    return rerank_model.get()
+
+
+rerank_limit = ConcurrencyLimit("rerank", RERANK_CONCURRENCY)
+
+
+# -----------------------------
+# Score cache
+# -----------------------------
+def _hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:24]
+
+
+class ScoreCache:
+    """Small thread-safe LRU of (backend, jd hash, chunk hash) -> score."""
+
+    def __init__(self, max_items: int = RERANK_CACHE_ITEMS):
+        self.max_items = max_items
+        self._items: "OrderedDict[Tuple[str, str, str], float]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return self._items[key]
+        return None
+
+    def put(self, key, score: float) -> None:
+        with self._lock:
+            self._items[key] = score
+            self._items.move_to_end(key)
+            while len(self._items) > self.max_items:
+                self._items.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._items.clear()
+
+
+score_cache = ScoreCache()
+
+
+def score_pairs(jd_text: str, texts: List[str], model=None, backend: str = RERANK_BACKEND) -> List[float]:
+    """Cross-encoder scores for (jd_text, text) pairs, cached per pair."""
+    jd_key = _hash(jd_text)
+    keys = [(backend, jd_key, _hash(t)) for t in texts]
+    scores = [score_cache.get(k) for k in keys]
+
+    todo = [i for i, s in enumerate(scores) if s is None]
+    metrics.cache_result("rerank", True, len(texts) - len(todo))
+    metrics.cache_result("rerank", False, len(todo))
+    if todo:
+        model = model or get_rerank_model()
+        with rerank_limit, metrics.span("rerank.predict", pairs=len(todo)):
+            fresh = model.predict([(jd_text, texts[i]) for i in todo])
+        for i, s in zip(todo, fresh):
+            scores[i] = float(s)
+            score_cache.put(keys[i], scores[i])
+    return scores
+
+
+# -----------------------------
+# Adaptive policy
+# -----------------------------
+def needs_rerank(dense_scores: List[float], top_k: int, margin: float = RERANK_MARGIN) -> bool:
+    """False when the cross-encoder can't (or is very unlikely to) change the top-k set."""
+    if top_k <= 0 or len(dense_scores) <= top_k:
+        return False
+    ordered = sorted(dense_scores, reverse=True)
+    return ordered[top_k - 1] - ordered[top_k] < margin
+
+
+def rerank(jd_text: str, matches: List[Dict], top_k: int) -> List[Dict]:
+    """Order vector-store matches ({"score", "metadata": {"text"}}) for this JD.
+
+    `matches` come best first (dense order, or RRF order with hybrid
+    retrieval). Returns [{text, score}] like retrieve_relevant_snippets
+    always has (plus `resume_id` for portfolio matches); `score` is the
+    cross-encoder score, or the dense score when reranking was skipped, in
+    which case the incoming order is kept.
+    """
+    if not matches:
+        return []
+
+    dense = [float(m["score"]) for m in matches]
+    if not needs_rerank(dense, top_k):
+        metrics.inc("rerank_skipped_total")
+        ranked = list(zip(matches, dense))
+    else:
+        scores = score_pairs(jd_text, [m["metadata"]["text"] for m in matches])
+        ranked = sorted(zip(matches, scores), key=lambda x: x[1], reverse=True)
+
+    out = []
+    for m, s in ranked[:top_k]:
+        snippet = {"text": m["metadata"]["text"], "score": float(s)}
+        if m["metadata"].get("resume_id"):
+            snippet["resume_id"] = m["metadata"]["resume_id"]
+        out.append(snippet)
+    return out
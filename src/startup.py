@@ -0,0 +1,44 @@
+# src/startup.py
+"""Optional warm-up of the lazy models/clients, plus startup timing."""
+import logging
+import time
+from typing import Dict, Iterable
+
+from .lazy import format_startup_report
+from .config import openai_client
+from .embeddings_index import embed_model
+from .reranker import rerank_model
+from .vector_store import vector_store
+
+logger = logging.getLogger(__name__)
+
+COMPONENTS = {
+    "embed_model": embed_model,
+    "rerank_model": rerank_model,
+    "vector_store": vector_store,
+    "openai_client": openai_client,
+}
+
+
+def warmup(components: Iterable[str] = tuple(COMPONENTS)) -> Dict[str, str]:
+    """Load the given components now instead of on the first request.
+
+    Models also run one tiny inference so lazy kernel/graph setup is paid
+    here. Failures (e.g. a missing API key) are reported, not raised.
+    """
+    status = {}
+    for name in components:
+        started = time.perf_counter()
+        try:
+            obj = COMPONENTS[name].get()
+            if name == "embed_model":
+                obj.encode(["warmup"])
+            elif name == "rerank_model":
+                obj.predict([("warmup", "warmup")])
+            status[name] = f"ok ({time.perf_counter() - started:.2f}s)"
+            logger.info("warmup %s: %s", name, status[name])
+        except Exception as e:
+            status[name] = f"failed: {type(e).__name__}: {e}"
+            logger.warning("warmup %s: %s", name, status[name])
+    logger.info("%s", format_startup_report())
+    return status
@@ -0,0 +1,125 @@
+# src/upload_store.py
+"""Content-addressed store for uploaded resumes.
+
+Uploads are streamed into UPLOAD_DIR while being hashed and saved as
+`<sha256><suffix>`, so identical files are stored once no matter what they
+were called, and different files with the same name never collide. The
+hash is the resume's identity for the PDF text cache and the index
+manifest. Files unused for UPLOAD_MAX_AGE_DAYS are removed, and the
+least recently used ones go first when the store exceeds UPLOAD_MAX_MB.
+"""
+import hashlib
+import os
+import re
+import threading
+import time
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Optional
+
+UPLOAD_DIR = Path(os.environ.get("UPLOAD_DIR", "uploads"))
+UPLOAD_MAX_MB = float(os.environ.get("UPLOAD_MAX_MB", "512"))
+UPLOAD_MAX_AGE_DAYS = float(os.environ.get("UPLOAD_MAX_AGE_DAYS", "30"))
+
+_CHUNK = 1 << 20
+_SHA256_RE = re.compile(r"[0-9a-f]{64}")
+_lock = threading.Lock()
+
+
+@dataclass
+class StoredUpload:
+    sha256: str
+    path: Path
+    size: int
+    deduplicated: bool  # True when an identical file was already stored
+    name: str = ""      # the file's original name, for display
+
+
+def _suffix(name: str) -> str:
+    suffix = Path(name).suffix.lower()
+    return suffix if suffix.isascii() and suffix[1:].isalnum() else ".pdf"
+
+
+def store_upload(src_path: str, root: Path = None) -> StoredUpload:
+    """Copy `src_path` into the store (streaming + hashing) and return its entry."""
+    root = Path(root or UPLOAD_DIR)
+    root.mkdir(parents=True, exist_ok=True)
+    src = Path(str(src_path))
+
+    h = hashlib.sha256()
+    size = 0
+    tmp = root / f".incoming-{os.getpid()}-{threading.get_ident()}"
+    try:
+        with src.open("rb") as fin, tmp.open("wb") as fout:
+            for block in iter(lambda: fin.read(_CHUNK), b""):
+                h.update(block)
+                fout.write(block)
+                size += len(block)
+
+        sha = h.hexdigest()
+        dest = root / f"{sha}{_suffix(src.name)}"
+        with _lock:
+            if dest.exists():
+                os.utime(dest)  # mtime doubles as "last used" for eviction
+                deduplicated = True
+            else:
+                tmp.replace(dest)
+                deduplicated = False
+    finally:
+        tmp.unlink(missing_ok=True)
+
+    evict(root, keep=dest)
+    return StoredUpload(sha256=sha, path=dest, size=size, deduplicated=deduplicated, name=src.name)
+
+
+def find_upload(sha256: str, root: Path = None) -> Optional[Path]:
+    """Path of a stored upload by its content hash, or None (also marks it used)."""
+    if not _SHA256_RE.fullmatch(sha256 or ""):
+        return None
+    root = Path(root or UPLOAD_DIR)
+    for path in root.glob(f"{sha256}.*"):
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            continue  # evicted meanwhile
+        return path
+    return None
+
+
+def evict(root: Path = None, max_mb: float = UPLOAD_MAX_MB, max_age_days: float = UPLOAD_MAX_AGE_DAYS,
+          keep: Optional[Path] = None) -> int:
+    """Delete expired uploads, then the oldest ones until under the size cap.
+
+    Works on any flat directory of files whose mtime means "last used" (the
+    PDF text cache uses it too); dot-files are in-progress writes and are
+    skipped. Returns the number of files removed; `keep` is never removed.
+    """
+    root = Path(root or UPLOAD_DIR)
+    now = time.time()
+    removed = 0
+
+    with _lock:
+        entries = []
+        for path in root.iterdir():
+            if not path.is_file() or path.name.startswith("."):
+                continue
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            entries.append((st.st_mtime, st.st_size, path))
+        entries.sort()  # oldest first
+
+        total = sum(size for _, size, _ in entries)
+        limit = max_mb * 1024 * 1024
+        for mtime, size, path in entries:
+            if keep is not None and path == keep:
+                continue
+            expired = max_age_days > 0 and now - mtime > max_age_days * 86400
+            if not expired and (max_mb <= 0 or total <= limit):
+                continue
+            path.unlink(missing_ok=True)
+            total -= size
+            removed += 1
+    return removed
+
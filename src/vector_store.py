@@ -0,0 +1,343 @@
+# src/vector_store.py
+"""Vector store backends used by embeddings_index.
+
+Every backend stores items shaped like Pinecone vectors
+(`{"id", "values", "metadata"}`) and returns query matches shaped like
+Pinecone matches (`{"id", "score", "metadata"}`), so the indexing and
+retrieval code doesn't care where the vectors live.
+"""
+import json
+import os
+import threading
+import uuid
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+
+import numpy as np
+
+from . import config
+from .lazy import Lazy
+
+
+class VectorStore:
+    """Minimal interface the resume index needs.
+
+    `layout` names where a backend keeps each user's vectors; index
+    manifests record it, so switching layouts re-indexes instead of
+    trusting IDs that live somewhere else.
+    """
+
+    layout: Optional[str] = None
+
+    def upsert(self, user_id: str, items: List[Dict]) -> None:
+        raise NotImplementedError
+
+    def delete(self, user_id: str, ids: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    def list_ids(self, user_id: str) -> List[str]:
+        raise NotImplementedError
+
+    def query(self, user_id: str, vector, top_k: int = 20,
+              filter: Optional[Dict] = None) -> List[Dict]:
+        raise NotImplementedError
+
+
+# -----------------------------
+# Pinecone
+# -----------------------------
+class PineconeVectorStore(VectorStore):
+    """Remote store: one shared Pinecone index, one namespace per user.
+
+    A namespace bounds every query and list to that user's vectors, so
+    lookups don't slow down as other users are added. With
+    `namespaces=False` all users share the default namespace and are
+    separated by a `user_id` metadata filter (the original layout).
+    """
+
+    def __init__(self, index=None, namespaces: Optional[bool] = None):
+        self._index = index
+        self.namespaces = config.PINECONE_NAMESPACES if namespaces is None else namespaces
+        self.layout = "namespace" if self.namespaces else None
+
+    @property
+    def index(self):
+        if self._index is None:
+            self._index = config.get_pinecone_index()
+        return self._index
+
+    def _ns(self, user_id: str) -> Dict:
+        return {"namespace": user_id} if self.namespaces else {}
+
+    def upsert(self, user_id: str, items: List[Dict]) -> None:
+        if items:
+            self.index.upsert(vectors=items, **self._ns(user_id))
+
+    def delete(self, user_id: str, ids: Iterable[str]) -> None:
+        ids = list(ids)
+        if ids:
+            self.index.delete(ids=ids, **self._ns(user_id))
+
+    def list_ids(self, user_id: str) -> List[str]:
+        # IDs look like `{user_id}-{hex}`; skip other users sharing the prefix
+        prefix = f"{user_id}-"
+        ids = []
+        for page in self.index.list(prefix=prefix, **self._ns(user_id)):
+            ids.extend(i for i in page if "-" not in i[len(prefix):])
+        return ids
+
+    def query(self, user_id: str, vector, top_k: int = 20,
+              filter: Optional[Dict] = None) -> List[Dict]:
+        flt = {} if self.namespaces else {"user_id": {"$eq": user_id}}
+        if filter:
+            flt.update(filter)
+        res = self.index.query(
+            vector=list(map(float, vector)),
+            top_k=top_k,
+            include_metadata=True,
+            filter=flt or None,
+            **self._ns(user_id)
+        )
+        return [
+            {"id": m["id"], "score": float(m["score"]), "metadata": m.get("metadata") or {}}
+            for m in res.get("matches", [])
+        ]
+
+
+# -----------------------------
+# Local (NumPy + mmap)
+# -----------------------------
+def _match_filter(metadata: Dict, flt: Optional[Dict]) -> bool:
+    """Evaluate the subset of Pinecone's filter syntax we use locally."""
+    if not flt:
+        return True
+    for key, cond in flt.items():
+        value = metadata.get(key)
+        if not isinstance(cond, dict):
+            cond = {"$eq": cond}
+        for op, arg in cond.items():
+            if op == "$eq" and value != arg:
+                return False
+            if op == "$ne" and value == arg:
+                return False
+            if op == "$in" and value not in arg:
+                return False
+            if op == "$nin" and value in arg:
+                return False
+    return True
+
+
+class _UserSegment:
+    """One user's vectors: an (n, dim) float32 memmap plus ids/metadata."""
+
+    def __init__(self, ids: List[str], metadata: List[Dict], vectors: np.ndarray, stamp: int):
+        self.ids = ids
+        self.metadata = metadata
+        self.vectors = vectors
+        self.stamp = stamp
+
+
+class LocalVectorStore(VectorStore):
+    """Exact cosine search over per-user memory-mapped float32 files.
+
+    Layout per user under `root/<safe_key(user)>/`:
+      vectors-<version>.f32  raw row-major float32, rows L2-normalized
+      meta.json              {"dim", "rows", "vectors", "ids", "metadata"}
+
+    A write puts the vectors in a new versioned file and then renames
+    meta.json over the old one, so readers see either the old or the new
+    pair, never a mix; `rows` / `dim` are checked against the file on load.
+
+    Per-user corpora are tiny (tens of chunks), so a brute-force dot product
+    beats any ANN structure and never leaves the process.
+    """
+
+    def __init__(self, root: Path = None, dim: int = None):
+        self.root = Path(root or config.LOCAL_VECTOR_DIR)
+        self.dim = dim or config.EMBEDDING_DIM
+        self._lock = threading.RLock()
+        self._segments: Dict[str, _UserSegment] = {}
+
+    def _user_dir(self, user_id: str) -> Path:
+        udir = self.root / config.safe_key(user_id)
+        if not udir.exists():
+            self._adopt_legacy_dir(user_id, udir)
+        return udir
+
+    def _adopt_legacy_dir(self, user_id: str, udir: Path) -> None:
+        # directories used to be named by the sanitized key alone; chunk IDs
+        # start with "<user_id>-", which tells whose directory it was
+        legacy = self.root / config.legacy_key(user_id)
+        try:
+            ids = json.loads((legacy / "meta.json").read_text())["ids"]
+        except (OSError, ValueError, KeyError, TypeError):
+            return
+        if ids and all(str(i).startswith(f"{user_id}-") for i in ids):
+            try:
+                legacy.rename(udir)
+            except OSError:
+                pass  # raced with another writer; its directory is used
+
+    def _load(self, user_id: str) -> Optional[_UserSegment]:
+        udir = self._user_dir(user_id)
+        meta_path = udir / "meta.json"
+        for attempt in range(2):
+            try:
+                stamp = meta_path.stat().st_mtime_ns
+            except FileNotFoundError:
+                self._segments.pop(user_id, None)
+                return None
+
+            seg = self._segments.get(user_id)
+            if seg is not None and seg.stamp == stamp:
+                return seg
+
+            meta = json.loads(meta_path.read_text())
+            try:
+                seg = self._open_segment(udir, meta, stamp)
+            except FileNotFoundError:
+                if attempt:  # replaced by another process between the two reads: read meta.json again
+                    raise
+                continue
+            self._segments[user_id] = seg
+            return seg
+
+    @staticmethod
+    def _open_segment(udir: Path, meta: Dict, stamp: int) -> _UserSegment:
+        ids, dim = meta["ids"], meta["dim"]
+        rows = meta.get("rows", len(ids))
+        vec_path = udir / meta.get("vectors", "vectors.f32")  # unversioned before atomic writes
+        size = vec_path.stat().st_size if ids else 0
+        if rows != len(ids) or len(meta["metadata"]) != rows or size != rows * dim * 4:
+            raise ValueError(f"{udir}: meta.json lists {len(ids)} ids / {rows} rows of dim {dim} "
+                             f"but {vec_path.name} has {size} bytes; delete the directory to re-index")
+        if ids:
+            vectors = np.memmap(vec_path, dtype=np.float32, mode="r", shape=(rows, dim))
+        else:
+            vectors = np.zeros((0, dim), dtype=np.float32)
+        return _UserSegment(ids, meta["metadata"], vectors, stamp)
+
+    def _write(self, user_id: str, ids: List[str], metadata: List[Dict], vectors: np.ndarray) -> None:
+        udir = self._user_dir(user_id)
+        udir.mkdir(parents=True, exist_ok=True)
+
+        # drop our memmap before the file underneath it goes away
+        self._segments.pop(user_id, None)
+
+        vectors = np.ascontiguousarray(vectors, dtype=np.float32)
+        name = f"vectors-{uuid.uuid4().hex[:12]}.f32"
+        vectors.tofile(udir / name)
+
+        tmp_meta = udir / f".meta.{os.getpid()}-{threading.get_ident()}.tmp"
+        tmp_meta.write_text(json.dumps({"dim": self.dim, "rows": len(ids), "vectors": name,
+                                        "ids": ids, "metadata": metadata}))
+        tmp_meta.replace(udir / "meta.json")  # the commit point
+
+        for old in udir.glob("vectors*.f32"):
+            if old.name != name:
+                old.unlink(missing_ok=True)
+
+    def upsert(self, user_id: str, items: List[Dict]) -> None:
+        if not items:
+            return
+        with self._lock:
+            seg = self._load(user_id)
+            ids = list(seg.ids) if seg else []
+            metadata = list(seg.metadata) if seg else []
+            vectors = np.array(seg.vectors) if seg else np.zeros((0, self.dim), dtype=np.float32)
+
+            new = np.asarray([it["values"] for it in items], dtype=np.float32)
+            norms = np.linalg.norm(new, axis=1, keepdims=True)
+            new /= np.where(norms == 0, 1.0, norms)
+
+            pos = {vid: i for i, vid in enumerate(ids)}
+            appended = []
+            for it, row in zip(items, new):
+                if it["id"] in pos:
+                    vectors[pos[it["id"]]] = row
+                    metadata[pos[it["id"]]] = it.get("metadata") or {}
+                else:
+                    pos[it["id"]] = len(ids)
+                    ids.append(it["id"])
+                    metadata.append(it.get("metadata") or {})
+                    appended.append(row)
+            if appended:
+                vectors = np.vstack([vectors, np.asarray(appended, dtype=np.float32)])
+
+            self._write(user_id, ids, metadata, vectors)
+
+    def delete(self, user_id: str, ids: Iterable[str]) -> None:
+        drop = set(ids)
+        if not drop:
+            return
+        with self._lock:
+            seg = self._load(user_id)
+            if seg is None:
+                return
+            keep = [i for i, vid in enumerate(seg.ids) if vid not in drop]
+            if len(keep) == len(seg.ids):
+                return
+            self._write(
+                user_id,
+                [seg.ids[i] for i in keep],
+                [seg.metadata[i] for i in keep],
+                np.array(seg.vectors[keep]) if keep else np.zeros((0, self.dim), dtype=np.float32),
+            )
+
+    def list_ids(self, user_id: str) -> List[str]:
+        with self._lock:
+            seg = self._load(user_id)
+            return list(seg.ids) if seg else []
+
+    def query(self, user_id: str, vector, top_k: int = 20,
+              filter: Optional[Dict] = None) -> List[Dict]:
+        with self._lock:
+            seg = self._load(user_id)
+        if seg is None or not seg.ids:
+            return []
+
+        q = np.asarray(vector, dtype=np.float32).ravel()
+        norm = float(np.linalg.norm(q))
+        if norm:
+            q = q / norm
+
+        if filter:
+            rows = np.array([i for i, md in enumerate(seg.metadata) if _match_filter(md, filter)], dtype=np.intp)
+            if rows.size == 0:
+                return []
+            scores = seg.vectors[rows] @ q
+        else:
+            rows = np.arange(len(seg.ids))
+            scores = seg.vectors @ q
+
+        k = min(top_k, rows.size)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": seg.ids[rows[i]], "score": float(scores[i]), "metadata": seg.metadata[rows[i]]}
+            for i in top
+        ]
+
+
+# -----------------------------
+# Backend selection
+# -----------------------------
+def _make_vector_store() -> VectorStore:
+    if config.VECTOR_STORE_BACKEND == "local":
+        return LocalVectorStore()
+    if config.VECTOR_STORE_BACKEND == "pinecone":
+        return PineconeVectorStore()
+    raise ValueError(f"Unknown VECTOR_STORE_BACKEND: {config.VECTOR_STORE_BACKEND!r}")
+
+
+vector_store = Lazy("vector_store", _make_vector_store)
+
+
+def get_vector_store() -> VectorStore:
+    """Return the process-wide store chosen by VECTOR_STORE_BACKEND."""
+    return vector_store.get()
+
+
+def set_vector_store(store: VectorStore) -> None:
+    """Swap the backend (e.g. a LocalVectorStore in a temp dir for offline runs)."""
+    vector_store.set(store)
@@ -0,0 +1,35 @@
+"""Shared fixtures: an isolated working directory per test, and the fakes.
+
+The app keeps its caches and stores under cwd-relative paths (cache/,
+index_manifests/, uploads/, ...), so every test runs in its own empty
+directory with the process-wide handles to those files reset.
+"""
+import pytest
+
+from src import embedding_cache, embeddings_index, hunter_cache, llm_cache, outbox, portfolio
+from tests import fakes
+from tests.synthetic import SKILLS
+
+
+@pytest.fixture(autouse=True)
+def workdir(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(llm_cache, "_cache", None)
+    monkeypatch.setattr(hunter_cache, "_cache", None)
+    monkeypatch.setattr(outbox, "_outbox", None)
+    monkeypatch.setattr(outbox, "_worker", None)
+    embedding_cache._caches.clear()
+    embeddings_index._bm25_cache.clear()
+    portfolio._matrices.clear()
+    yield tmp_path
+    if outbox._worker is not None:  # started by an enqueue; must not deliver during later tests
+        outbox._worker.stop()
+        outbox._worker.join(timeout=5)
+
+
+@pytest.fixture
+def fake():
+    """Fake OpenAI / Pinecone / Hunter / n8n plus hashing stand-ins for the models."""
+    installed = fakes.install(models=True, skills=SKILLS)
+    yield installed
+    installed.uninstall()
@@ -0,0 +1,369 @@
+# tests/fakes.py
+"""Deterministic local stand-ins for every external service.
+
+    fakes = install(openai=Latency(0.4, per_item=0.01), hunter=Latency(0.15))
+    ...   # run the real pipeline code
+    fakes.uninstall()
+
+- FakeOpenAI         chat.completions.create, plain and stream=True
+- FakePineconeIndex  upsert / delete / list / query per namespace over an in-memory
+                     matrix, driven through the real PineconeVectorStore adapter
+- Hunter + n8n       a requests transport adapter mounted on the shared
+                     sessions in http_transport, so pooling, rate limits and
+                     retries still run
+- models=True also swaps in hashing stand-ins for the embedding model,
+  tokenizer and cross-encoder, so nothing needs downloaded weights.
+
+Every fake sleeps for its Latency (base + seeded jitter, plus `per_item`
+per streamed token / vector / pair). Answers depend only on the inputs.
+"""
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+import zlib
+from dataclasses import dataclass, field
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+import requests
+from requests.adapters import BaseAdapter
+
+from src import chunking, config, embeddings_index, hunter_client, reranker, vector_store
+from src.config import EMBEDDING_DIM
+from src.http_transport import get_transport
+
+FAKE_N8N_URL = "http://n8n.fake/webhook/cold-email"
+
+_WORD_RE = re.compile(r"\w+|[^\w\s]")
+
+
+@dataclass
+class Latency:
+    base: float = 0.0      # seconds per call
+    jitter: float = 0.0    # plus uniform(0, jitter)
+    per_item: float = 0.0  # per streamed token / vector / pair
+    seed: int = 0
+    _rng: random.Random = field(init=False, repr=False)
+    _lock: threading.Lock = field(init=False, repr=False)
+
+    def __post_init__(self):
+        self._rng = random.Random(self.seed)
+        self._lock = threading.Lock()
+
+    def sleep(self, items: int = 0) -> None:
+        with self._lock:
+            extra = self._rng.uniform(0, self.jitter) if self.jitter else 0.0
+        delay = self.base + extra + self.per_item * items
+        if delay > 0:
+            time.sleep(delay)
+
+    def sleep_item(self) -> None:
+        if self.per_item > 0:
+            time.sleep(self.per_item)
+
+
+def _stable_hash(text: str) -> int:
+    return zlib.crc32(text.encode("utf-8"))
+
+
+# -----------------------------
+# OpenAI
+# -----------------------------
+class FakeOpenAI:
+    """Answers the prompts openai_email sends: JD parsing, the email, and the
+    fused (JSON schema) call that does both."""
+
+    def __init__(self, latency: Optional[Latency] = None, skills: Iterable[str] = ()):
+        self.latency = latency or Latency()
+        self.skills = sorted(set(skills), key=len, reverse=True)
+        self.calls = 0
+        self._lock = threading.Lock()
+        self.chat = SimpleNamespace(completions=SimpleNamespace(create=self._create))
+
+    def _create(self, model: str, messages: List[Dict], temperature: float = None,
+                stream: bool = False, timeout: float = None, **kwargs):
+        with self._lock:
+            self.calls += 1
+        system, user = messages[0]["content"], messages[-1]["content"]
+        if kwargs.get("response_format", {}).get("type") == "json_schema":
+            content = self._fused(user)
+        else:
+            content = self._parse_jd(user) if "JSON" in system else self._email(user)
+        self.latency.sleep()
+        if not stream:
+            message = SimpleNamespace(content=content)
+            return SimpleNamespace(choices=[SimpleNamespace(message=message)])
+        return self._stream(content)
+
+    def _stream(self, content: str):
+        for piece in re.findall(r"\S+\s*|\s+", content):
+            self.latency.sleep_item()
+            yield SimpleNamespace(choices=[SimpleNamespace(delta=SimpleNamespace(content=piece))])
+
+    def _parse_jd(self, jd_text: str) -> str:
+        first = next((line.strip() for line in jd_text.splitlines() if line.strip()), "")
+        role, _, rest = first.partition(" at ")
+        company = rest.split(",")[0].split(".")[0].strip()
+        lower = jd_text.lower()
+        found = [s for s in self.skills if s.lower() in lower][:8]
+        return json.dumps({
+            "role_title": role.strip()[:80],
+            "company_name": company,
+            "location": "Remote" if "remote" in lower else "",
+            "top_skills": found,
+        })
+
+    def _fused(self, prompt: str) -> str:
+        jd_text = prompt.split("Job description:", 1)[-1].split("\nRecruiter name:", 1)[0]
+        jd = json.loads(self._parse_jd(jd_text))
+        name = re.search(r"^Recruiter name:\s*(.*)$", prompt, re.M)
+        experience = prompt.split("My most relevant experience", 1)[-1].split("\nFill in:", 1)[0]
+        bullets = "\n".join(line for line in experience.splitlines() if line.startswith("- "))
+        email = self._email(f"Role: {jd['role_title']}\nCompany: {jd['company_name']}\n"
+                            f"Recruiter name: {name.group(1).strip() if name else ''}\n{bullets}")
+        subject, _, body = email.partition("\nBody:\n")
+        return json.dumps(dict(jd, subject=subject[len("Subject: "):], body=body))
+
+    def _email(self, prompt: str) -> str:
+        def field_of(name: str) -> str:
+            m = re.search(rf"^{name}:\s*(.*)$", prompt, re.M)
+            return m.group(1).strip() if m else ""
+
+        role, company, name = field_of("Role"), field_of("Company"), field_of("Recruiter name")
+        bullets = [line[2:].strip() for line in prompt.splitlines() if line.startswith("- ")][:3]
+        points = " ".join(f"In a previous role I {b[0].lower() + b[1:]}" if b else "" for b in bullets)
+        return (
+            f"Subject: Application for {role or 'the role'} at {company or 'your company'}\n"
+            f"Body:\n"
+            f"Hi {name or 'there'},\n\n"
+            f"I'm reaching out about the {role} position at {company}. {points}\n\n"
+            f"I'd welcome a short call to discuss how I could help the team.\n\n"
+            f"Best regards,\nCandidate"
+        )
+
+
+# -----------------------------
+# Pinecone
+# -----------------------------
+class FakePineconeIndex:
+    """The slice of the Pinecone Index API that PineconeVectorStore uses."""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+        self._items: Dict[Tuple[str, str], Tuple[np.ndarray, Dict]] = {}  # (namespace, id) -> row
+        self._lock = threading.Lock()
+
+    def upsert(self, vectors: List[Dict], namespace: str = "") -> None:
+        self.latency.sleep(len(vectors))
+        with self._lock:
+            for v in vectors:
+                vec = np.asarray(v["values"], dtype=np.float32)
+                vec /= max(float(np.linalg.norm(vec)), 1e-12)
+                self._items[(namespace, v["id"])] = (vec, dict(v.get("metadata") or {}))
+
+    def delete(self, ids: List[str], namespace: str = "") -> None:
+        self.latency.sleep()
+        with self._lock:
+            for i in ids:
+                self._items.pop((namespace, i), None)
+
+    def list(self, prefix: str = "", limit: int = 100, namespace: str = ""):
+        self.latency.sleep()
+        with self._lock:
+            ids = sorted(i for ns, i in self._items if ns == namespace and i.startswith(prefix))
+        for start in range(0, len(ids), limit):
+            yield ids[start:start + limit]
+
+    def query(self, vector, top_k: int = 10, include_metadata: bool = True,
+              filter: Optional[Dict] = None, namespace: str = "") -> Dict:
+        self.latency.sleep()
+        with self._lock:
+            rows = [(i, v, m) for (ns, i), (v, m) in self._items.items()
+                    if ns == namespace and vector_store._match_filter(m, filter)]
+        if not rows:
+            return {"matches": []}
+        q = np.asarray(vector, dtype=np.float32)
+        q /= max(float(np.linalg.norm(q)), 1e-12)
+        scores = np.stack([v for _, v, _ in rows]) @ q
+        order = np.argsort(-scores)[:top_k]
+        return {"matches": [
+            {"id": rows[i][0], "score": float(scores[i]),
+             "metadata": rows[i][2] if include_metadata else None}
+            for i in order
+        ]}
+
+
+# -----------------------------
+# Hunter + n8n (HTTP)
+# -----------------------------
+class FakeHTTPAdapter(BaseAdapter):
+    """requests adapter that answers from `handler(method, path, params, body)`."""
+
+    def __init__(self, handler: Callable, latency: Optional[Latency] = None):
+        super().__init__()
+        self.handler = handler
+        self.latency = latency or Latency()
+        self.calls = 0
+        self._lock = threading.Lock()
+
+    def send(self, request, **kwargs):
+        with self._lock:
+            self.calls += 1
+        self.latency.sleep()
+        parsed = urllib.parse.urlsplit(request.url)
+        params = dict(urllib.parse.parse_qsl(parsed.query))
+        body = json.loads(request.body) if request.body else None
+        status, payload = self.handler(request.method, parsed.path, params, body)
+
+        resp = requests.Response()
+        resp.status_code = status
+        resp._content = json.dumps(payload).encode("utf-8")
+        resp.headers["Content-Type"] = "application/json"
+        resp.encoding = "utf-8"
+        resp.url = request.url
+        resp.request = request
+        return resp
+
+    def close(self):
+        pass
+
+
+def hunter_handler(found_rate: float = 0.8):
+    """Email Finder finds `found_rate` of names (by name hash); Domain Search
+    returns a first.last pattern with a few sample addresses."""
+
+    def handle(method, path, params, body):
+        domain = params.get("domain", "")
+        if path.endswith("/email-finder"):
+            first = params.get("first_name") or params.get("full_name", "").split(" ")[0]
+            last = params.get("last_name", "")
+            if (_stable_hash(f"{first} {last}") % 100) >= found_rate * 100:
+                return 404, {"errors": [{"id": "not_found"}]}
+            local = ".".join(p for p in (first, last) if p).lower()
+            return 200, {"data": {"email": f"{local}@{domain}", "score": 90}}
+        if path.endswith("/domain-search"):
+            people = [("alex", "morgan"), ("sam", "lee"), ("jordan", "patel")]
+            return 200, {"data": {
+                "domain": domain,
+                "pattern": "{first}.{last}",
+                "emails": [
+                    {"value": f"{f}.{l}@{domain}", "first_name": f.title(), "last_name": l.title(),
+                     "position": "Recruiter", "confidence": 95}
+                    for f, l in people
+                ],
+            }}
+        return 404, {"errors": [{"id": "unknown_endpoint"}]}
+
+    return handle
+
+
+def n8n_handler(method, path, params, body):
+    return 200, {"ok": True, "received": bool(body)}
+
+
+# -----------------------------
+# Models (optional)
+# -----------------------------
+class FakeTokenizer:
+    def __call__(self, text: str, add_special_tokens: bool = True):
+        n = len(_WORD_RE.findall(text)) + (2 if add_special_tokens else 0)
+        return {"input_ids": list(range(n))}
+
+
+class FakeEmbedder:
+    """Hashing-trick bag of words, L2-normalized, EMBEDDING_DIM wide."""
+
+    def __init__(self, latency: Optional[Latency] = None, dim: int = EMBEDDING_DIM):
+        self.latency = latency or Latency()
+        self.dim = dim
+
+    def encode(self, texts, convert_to_numpy: bool = True, **kwargs):
+        texts = [texts] if isinstance(texts, str) else list(texts)
+        self.latency.sleep(len(texts))
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for word in re.findall(r"\w+", text.lower()):
+                h = _stable_hash(word)
+                out[row, h % self.dim] += 1.0 if (h >> 16) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class FakeCrossEncoder:
+    """Scores a (query, passage) pair by word overlap."""
+
+    def __init__(self, latency: Optional[Latency] = None):
+        self.latency = latency or Latency()
+
+    def predict(self, pairs, **kwargs):
+        pairs = list(pairs)
+        self.latency.sleep(len(pairs))
+        scores = []
+        for query, passage in pairs:
+            q = set(re.findall(r"\w+", query.lower()))
+            p = set(re.findall(r"\w+", passage.lower()))
+            scores.append(len(q & p) / (len(q | p) or 1))
+        return np.asarray(scores, dtype=np.float32)
+
+
+# -----------------------------
+# Install / uninstall
+# -----------------------------
+@dataclass
+class Fakes:
+    openai: FakeOpenAI
+    pinecone: FakePineconeIndex
+    hunter: FakeHTTPAdapter
+    n8n: FakeHTTPAdapter
+    models: bool
+    _hunter_key: str = ""
+
+    def calls(self) -> Dict[str, int]:
+        return {"openai": self.openai.calls, "hunter": self.hunter.calls, "n8n": self.n8n.calls}
+
+    def uninstall(self) -> None:
+        hunter_client.HUNTER_API_KEY = self._hunter_key
+        config.openai_client.reset()
+        config.pinecone_index.reset()
+        vector_store.vector_store.reset()
+        get_transport("hunter").session.adapters.pop(hunter_client.HUNTER_BASE_URL, None)
+        get_transport("n8n").session.adapters.pop(FAKE_N8N_URL, None)
+        if self.models:
+            embeddings_index.EMBED_MODEL_NAME = config.EMBED_MODEL_NAME
+            embeddings_index.embed_model.reset()
+            reranker.rerank_model.reset()
+            chunking.tokenizer.reset()
+
+
+def install(openai: Latency = None, pinecone: Latency = None, hunter: Latency = None,
+            n8n: Latency = None, models: bool = False, embed: Latency = None,
+            rerank: Latency = None, skills: Iterable[str] = (),
+            hunter_found_rate: float = 0.8) -> Fakes:
+    """Point the app's lazy clients and HTTP sessions at the fakes."""
+    fakes = Fakes(
+        openai=FakeOpenAI(openai, skills=skills),
+        pinecone=FakePineconeIndex(pinecone),
+        hunter=FakeHTTPAdapter(hunter_handler(hunter_found_rate), hunter),
+        n8n=FakeHTTPAdapter(n8n_handler, n8n),
+        models=models,
+        _hunter_key=hunter_client.HUNTER_API_KEY,
+    )
+    config.openai_client.set(fakes.openai)
+    config.pinecone_index.set(fakes.pinecone)
+    vector_store.set_vector_store(vector_store.PineconeVectorStore(fakes.pinecone))
+
+    hunter_client.HUNTER_API_KEY = "fake-hunter-key"
+    get_transport("hunter").session.mount(hunter_client.HUNTER_BASE_URL, fakes.hunter)
+    get_transport("n8n").session.mount(FAKE_N8N_URL, fakes.n8n)
+
+    if models:
+        # separate embedding-cache namespace so fake vectors never mix with real ones
+        embeddings_index.EMBED_MODEL_NAME = "fake-hashing-embedder"
+        embeddings_index.embed_model.set(FakeEmbedder(embed))
+        reranker.rerank_model.set(FakeCrossEncoder(rerank))
+        chunking.tokenizer.set(FakeTokenizer())
+    return fakes
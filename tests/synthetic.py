@@ -0,0 +1,170 @@
+# tests/synthetic.py
+"""Seeded synthetic resumes, job descriptions and a tiny PDF writer.
+
+Everything is a pure function of the seed, so two benchmark runs see the
+same corpus byte for byte.
+"""
+import random
+from pathlib import Path
+from typing import Dict, List
+
+SKILLS = [
+    "Python", "Go", "Java", "TypeScript", "React", "PostgreSQL", "Kubernetes", "Terraform",
+    "AWS", "GCP", "Docker", "Kafka", "Spark", "Airflow", "dbt", "Snowflake", "PyTorch",
+    "TensorFlow", "scikit-learn", "LLMs", "RAG", "gRPC", "REST APIs", "Redis", "GraphQL",
+    "CI/CD", "Prometheus", "Grafana", "Linux", "SQL",
+]
+
+ROLES = [
+    "Machine Learning Engineer", "Backend Engineer", "Data Engineer", "Platform Engineer",
+    "Frontend Engineer", "Site Reliability Engineer", "Applied Scientist", "Full Stack Engineer",
+]
+
+COMPANIES = [
+    ("Acme Analytics", "acme-analytics.com"), ("Northwind Labs", "northwindlabs.io"),
+    ("Globex", "globex.com"), ("Initech", "initech.dev"), ("Umbrella Data", "umbrelladata.ai"),
+    ("Hooli", "hooli.xyz"), ("Stark Systems", "starksystems.com"), ("Wayne Cloud", "waynecloud.io"),
+]
+
+RECRUITERS = [
+    "Alex Morgan", "Priya Shah", "Jordan Patel", "Chen Wei", "Maria Garcia",
+    "Sam Lee", "Fatima Khan", "Lucas Martin",
+]
+
+_VERBS = ["Built", "Led", "Designed", "Shipped", "Optimized", "Automated", "Migrated", "Scaled"]
+_THINGS = [
+    "a real-time event pipeline", "the recommendation service", "an internal analytics platform",
+    "the payments API", "a feature store", "the deployment tooling", "a data quality framework",
+    "the search backend", "an LLM support assistant", "the monitoring stack",
+]
+_RESULTS = [
+    "cutting p95 latency by {n}%", "saving {n} engineer-hours per week", "serving {n}M requests/day",
+    "reducing cloud spend by {n}%", "improving conversion by {n}%", "handling {n}k events/sec",
+]
+
+
+def _bullet(rng: random.Random) -> str:
+    skills = rng.sample(SKILLS, 2)
+    result = rng.choice(_RESULTS).format(n=rng.randint(3, 90))
+    return f"- {rng.choice(_VERBS)} {rng.choice(_THINGS)} with {skills[0]} and {skills[1]}, {result}."
+
+
+def make_resume(seed: int, roles: int = 4, bullets: int = 5) -> str:
+    rng = random.Random(seed)
+    lines = [
+        f"Candidate {seed}",
+        f"candidate{seed}@example.com | +1 555 {rng.randint(1000, 9999)}",
+        "",
+        "SUMMARY",
+        f"{rng.choice(ROLES)} with {rng.randint(2, 15)} years of experience in "
+        f"{', '.join(rng.sample(SKILLS, 4))}.",
+        "",
+        "EXPERIENCE",
+    ]
+    year = 2024
+    for _ in range(roles):
+        start = year - rng.randint(1, 4)
+        company = rng.choice(COMPANIES)[0]
+        lines.append(f"{rng.choice(ROLES)}, {company}   Jan {start} - Dec {year}")
+        lines.extend(_bullet(rng) for _ in range(bullets))
+        lines.append("")
+        year = start
+    lines += [
+        "EDUCATION",
+        f"B.S. Computer Science, State University   Sep {year - 4} - May {year}",
+        "",
+        "SKILLS",
+        ", ".join(rng.sample(SKILLS, 12)),
+    ]
+    return "\n".join(lines)
+
+
+def make_job(seed: int) -> Dict[str, str]:
+    """A JD plus the recruiter name / company domain the pipeline takes."""
+    rng = random.Random(10_000 + seed)
+    role = rng.choice(ROLES)
+    company, domain = rng.choice(COMPANIES)
+    must = rng.sample(SKILLS, 5)
+    nice = rng.sample([s for s in SKILLS if s not in must], 3)
+    jd = "\n".join([
+        f"{role} at {company}, {'Remote' if rng.random() < 0.5 else 'New York, NY'}.",
+        "",
+        f"About us: {company} builds data products used by thousands of teams.",
+        "",
+        "What you'll do:",
+        f"- Own {rng.choice(_THINGS)} end to end.",
+        f"- Work with product and design to ship {rng.choice(_THINGS)}.",
+        "",
+        f"Requirements: {', '.join(must)}.",
+        f"Nice to have: {', '.join(nice)}.",
+        "",
+        "We are an equal opportunity employer. Benefits include health insurance and 401(k).",
+    ])
+    return {"jd_text": jd, "recruiter_name": rng.choice(RECRUITERS), "company_domain": domain}
+
+
+# -----------------------------
+# PDF writer
+# -----------------------------
+def _pdf_escape(text: str) -> str:
+    text = text.encode("latin-1", "replace").decode("latin-1")
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def write_pdf(path: Path, text: str, lines_per_page: int = 50) -> Path:
+    """Write `text` as a plain Helvetica PDF that pypdf can extract."""
+    lines = text.splitlines() or [""]
+    pages = [lines[i:i + lines_per_page] for i in range(0, len(lines), lines_per_page)]
+
+    objects: List[bytes] = []
+
+    def add(body: bytes) -> int:
+        objects.append(body)
+        return len(objects)
+
+    catalog = add(b"")  # filled in once the page tree exists
+    pages_id = add(b"")
+    font = add(b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>")
+    kids = []
+    for page_lines in pages:
+        ops = ["BT", "/F1 10 Tf", "12 TL", "50 760 Td"]
+        for line in page_lines:
+            ops.append(f"({_pdf_escape(line)}) Tj T*")
+        ops.append("ET")
+        stream = "\n".join(ops).encode("latin-1")
+        content = add(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+        kids.append(add(
+            b"<< /Type /Page /Parent %d 0 R /MediaBox [0 0 612 792] " % pages_id
+            + b"/Resources << /Font << /F1 %d 0 R >> >> /Contents %d 0 R >>" % (font, content)
+        ))
+    objects[catalog - 1] = b"<< /Type /Catalog /Pages %d 0 R >>" % pages_id
+    objects[pages_id - 1] = (b"<< /Type /Pages /Kids [" + b" ".join(b"%d 0 R" % k for k in kids)
+                             + b"] /Count %d >>" % len(kids))
+
+    out = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for i, body in enumerate(objects, start=1):
+        offsets.append(len(out))
+        out += b"%d 0 obj\n" % i + body + b"\nendobj\n"
+    xref = len(out)
+    out += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    out += b"".join(b"%010d 00000 n \n" % off for off in offsets)
+    out += b"trailer\n<< /Size %d /Root %d 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, catalog, xref)
+
+    path = Path(path)
+    path.write_bytes(bytes(out))
+    return path
+
+
+def make_corpus(root: Path, resumes: int, jobs: int, pages: int = 1) -> Dict[str, List]:
+    """Write `resumes` PDFs under root and return them with `jobs` job dicts.
+
+    `pages` > 1 adds more job entries to make longer documents.
+    """
+    root = Path(root)
+    root.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i in range(resumes):
+        text = make_resume(i, roles=4 * pages)
+        paths.append(str(write_pdf(root / f"resume_{i}.pdf", text)))
+    return {"resumes": paths, "jobs": [make_job(j) for j in range(jobs)]}
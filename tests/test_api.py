@@ -0,0 +1,67 @@
+"""API auth: the user comes from the key or the proxy header, never from the request."""
+import json
+
+import pytest
+from fastapi.testclient import TestClient
+
+from src import api, portfolio
+
+ALICE = {"Authorization": "Bearer key-alice"}
+BOB = {"X-API-Key": "key-bob"}
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(api, "API_KEYS", {"key-alice": "alice", "key-bob": "bob"})
+    monkeypatch.setattr(api, "API_USER_HEADER", "")
+    monkeypatch.setattr(api, "API_SINGLE_USER", "")
+    return TestClient(api.app)  # no `with`: skips the lifespan (warmup, outbox worker)
+
+
+@pytest.mark.parametrize("headers", [{}, {"Authorization": "Bearer nope"}, {"X-API-Key": ""}])
+def test_missing_or_unknown_key_is_rejected(client, headers):
+    assert client.get("/portfolio", headers=headers).status_code == 401
+    assert client.get("/outbox", headers=headers).status_code == 401
+
+
+def test_probes_need_no_key(client):
+    assert client.get("/healthz").status_code == 200
+    assert client.get("/metrics").status_code == 200
+
+
+def test_user_comes_from_the_key_not_the_query(client):
+    r = client.get("/portfolio", params={"user_id": "bob"}, headers=ALICE)
+    assert r.status_code == 200
+    assert r.json()["user_id"] == "alice"
+    assert client.get("/portfolio", headers=BOB).json()["user_id"] == "bob"
+
+
+def test_cannot_delete_another_users_resume(client, fake):
+    stats = portfolio.add_resume("alice", "Built data pipelines in Python and Spark.", "a" * 64)
+
+    assert client.delete(f"/portfolio/{stats['resume_id']}", headers=BOB).status_code == 404
+    assert [r["resume_id"] for r in portfolio.list_resumes("alice")] == [stats["resume_id"]]
+    assert client.delete(f"/portfolio/{stats['resume_id']}", headers=ALICE).status_code == 200
+
+
+def test_batches_are_visible_to_their_owner_only(client):
+    run_dir = api.API_BATCH_DIR / "b1"
+    run_dir.mkdir(parents=True)
+    (run_dir / "meta.json").write_text(json.dumps({"batch_id": "b1", "user_id": "alice"}))
+
+    assert client.get("/batches/b1", headers=ALICE).status_code == 200
+    assert client.get("/batches/b1", headers=BOB).status_code == 404
+
+
+def test_trusted_proxy_header(client, monkeypatch):
+    monkeypatch.setattr(api, "API_KEYS", {})
+    monkeypatch.setattr(api, "API_USER_HEADER", "X-Forwarded-User")
+    assert client.get("/portfolio", headers={"X-Forwarded-User": "carol"}).json()["user_id"] == "carol"
+    assert client.get("/portfolio").status_code == 401
+
+
+def test_no_auth_configured(client, monkeypatch):
+    monkeypatch.setattr(api, "API_KEYS", {})
+    assert client.get("/portfolio").status_code == 503
+    monkeypatch.setattr(api, "API_SINGLE_USER", "me")
+    assert client.get("/portfolio", params={"user_id": "alice"}).json()["user_id"] == "me"
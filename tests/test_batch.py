@@ -0,0 +1,64 @@
+"""Batch mode: checkpointed reruns and once-only sends."""
+import json
+
+import pytest
+
+from src import batch, outbox
+
+RESUME = ("Backend engineer. Built REST APIs in Go and Python, ran PostgreSQL and Redis, "
+          "deployed services on Kubernetes with Terraform.")
+
+
+@pytest.fixture
+def jobs(tmp_path, monkeypatch):
+    # the PDF step has its own tests; here the resume is just text
+    monkeypatch.setattr(batch, "extract_text_from_pdf", lambda path, file_hash=None: RESUME)
+    (tmp_path / "resume.pdf").write_bytes(b"resume")
+    path = tmp_path / "jobs.jsonl"
+    with path.open("w") as f:
+        for i in range(3):
+            f.write(json.dumps({"job_id": f"job{i}", "jd_text": f"Backend engineer #{i}: Go, PostgreSQL, Kubernetes.",
+                                "recruiter_name": f"Dana Recruiter{i}", "company_domain": f"acme{i}.com"}) + "\n")
+    return str(tmp_path / "resume.pdf"), str(path)
+
+
+def _records(out):
+    with open(out) as f:
+        return [json.loads(line) for line in f]
+
+
+def test_rerun_skips_finished_jobs(fake, jobs, tmp_path):
+    resume, jobs_path = jobs
+    out = str(tmp_path / "results.jsonl")
+
+    first = batch.run_batch(resume, jobs_path, out, workers=2, openai_rps=0)
+    second = batch.run_batch(resume, jobs_path, out, workers=2, openai_rps=0)
+
+    assert first["ok"] == 3 and first["skipped"] == 0
+    assert second == {"total": 3, "skipped": 3, "ok": 0, "error": 0}
+    assert sorted(r["job_id"] for r in _records(out)) == ["job0", "job1", "job2"]
+
+
+def test_rerun_after_a_crash_does_not_queue_emails_twice(fake, jobs, tmp_path):
+    resume, jobs_path = jobs
+    out = tmp_path / "results.jsonl"
+
+    batch.run_batch(resume, jobs_path, str(out), openai_rps=0, send=True)
+    keys = {r["job_id"]: r["outbox_key"] for r in _records(out) if r.get("outbox_key")}
+    assert keys
+    out.unlink()  # died after enqueueing, before the result lines were kept
+    batch.run_batch(resume, jobs_path, str(out), openai_rps=0, send=True)
+
+    assert {r["job_id"]: r["outbox_key"] for r in _records(out) if r.get("outbox_key")} == keys
+    state = outbox.status()
+    assert state[outbox.PENDING] + state[outbox.SENDING] + state[outbox.SENT] == len(keys)
+
+
+def test_outbox_key_ignores_the_generated_text():
+    rec = {"job_id": "job1", "recruiter_email": "dana@acme.com", "subject": "Hi", "body": "v1",
+           "jd_info": {"role_title": "Backend Engineer"}}
+    first = batch._enqueue(rec, "alice")
+    again = batch._enqueue(dict(rec, subject="Hello", body="v2"), "alice")
+    other_user = batch._enqueue(rec, "bob")
+
+    assert first == again != other_user
@@ -0,0 +1,76 @@
+"""Section-aware chunking: budgets, boundaries, and entry context."""
+from src.chunking import iter_chunks, iter_units
+
+
+def words(text):
+    return len(text.split())
+
+
+RESUME = """Jane Doe
+jane@example.com
+
+EXPERIENCE
+Senior Engineer, Acme Corp  Jan 2020 - Present
+• Built REST APIs in Go serving two million requests a day
+  across three regions.
+• Led the migration from a monolith to Kubernetes services.
+• Cut p99 latency by forty percent with Redis caching.
+
+Engineer, Initech  2016 - 2019
+- Wrote ETL jobs in Python and Spark.
+
+SKILLS
+Go, Python, Kubernetes, PostgreSQL, Redis, Terraform
+"""
+
+
+def _chunks(text, max_tokens, min_tokens=None):
+    return list(iter_chunks(text, max_tokens=max_tokens, count=words, min_tokens=min_tokens))
+
+
+def test_units_follow_resume_structure():
+    units = list(iter_units(RESUME))
+    sections = {section for section, _, _, _ in units}
+    assert sections == {"", "EXPERIENCE", "SKILLS"}
+    headers = [unit for _, _, unit, is_header in units if is_header]
+    assert headers == ["Senior Engineer, Acme Corp Jan 2020 - Present", "Engineer, Initech 2016 - 2019"]
+    bullets = [unit for _, _, unit, _ in units if unit.startswith("• ")]
+    assert bullets[0] == "• Built REST APIs in Go serving two million requests a day across three regions."
+    assert bullets[-1] == "• Wrote ETL jobs in Python and Spark."  # "-" bullets normalized
+
+
+def test_every_chunk_fits_the_budget_and_nothing_is_lost():
+    for budget in (20, 40, 254):
+        chunks = _chunks(RESUME, budget)
+        assert all(words(c) <= budget for c in chunks)
+        joined = " ".join(chunks)
+        for word in ("monolith", "forty", "Spark.", "Terraform"):
+            assert word in joined
+
+
+def test_bullets_are_never_split():
+    for chunk in _chunks(RESUME, 30):
+        for line in chunk.split("\n"):
+            if line.startswith("• "):
+                assert line.endswith(".")
+
+
+def test_continued_entry_repeats_its_header():
+    chunks = _chunks(RESUME, 30, min_tokens=0)
+    latency = next(c for c in chunks if "p99 latency" in c)
+    assert "Acme Corp" in latency.split("\n")[0]
+
+
+def test_small_sections_are_packed_large_ones_start_a_chunk():
+    packed = _chunks(RESUME, 254, min_tokens=10)
+    assert len(packed) == 2  # the contact lines ride along with EXPERIENCE
+    assert packed[0].startswith("Jane Doe") and "EXPERIENCE" in packed[0]
+    assert packed[1].startswith("SKILLS")
+
+
+def test_overlong_unit_is_split_at_sentences():
+    text = "SUMMARY\n" + " ".join(f"Sentence number {i} about distributed systems." for i in range(30))
+    chunks = _chunks(text, 40)
+    assert len(chunks) > 1
+    assert all(words(c) <= 40 and c.startswith("SUMMARY\n") for c in chunks)
+    assert all(c.rstrip().endswith(".") for c in chunks)
@@ -0,0 +1,57 @@
+"""Embedding cache: only misses reach the model, rows are shared across processes."""
+import numpy as np
+
+from src.embedding_cache import EmbeddingCache, encode_cached, text_hash
+
+DIM = 3
+
+
+class Encoder:
+    """Deterministic vectors from the text length; records every batch it gets."""
+
+    def __init__(self):
+        self.batches = []
+
+    def __call__(self, texts):
+        self.batches.append(list(texts))
+        return np.array([[len(t), 1.0, 0.0] for t in texts], dtype=np.float32)
+
+
+def test_only_misses_are_encoded_in_one_batch():
+    enc = Encoder()
+    encode_cached(["a", "bb"], "m", DIM, enc)
+    out = encode_cached(["bb", "ccc", "a", "ccc"], "m", DIM, enc)
+
+    assert enc.batches == [["a", "bb"], ["ccc"]]
+    assert out.shape == (4, DIM) and out.dtype == np.float32
+    assert out[:, 0].tolist() == [2, 3, 1, 3]  # input order, duplicates included
+
+
+def test_models_do_not_share_entries():
+    enc = Encoder()
+    encode_cached(["a"], "m1", DIM, enc)
+    encode_cached(["a"], "m2", DIM, enc)
+    assert len(enc.batches) == 2
+
+
+def test_rows_written_by_another_instance_are_picked_up(tmp_path):
+    reader = EmbeddingCache("m", DIM, root=tmp_path)
+    assert reader.get_many([text_hash("a")]) == {}
+
+    EmbeddingCache("m", DIM, root=tmp_path).put_many([text_hash("a")], np.ones((1, DIM)))
+
+    assert reader.get_many([text_hash("a")])[text_hash("a")].tolist() == [1.0, 1.0, 1.0]
+
+
+def test_torn_row_is_dropped_before_appending(tmp_path):
+    cache = EmbeddingCache("m", DIM, root=tmp_path)
+    cache.put_many([text_hash("a")], np.full((1, DIM), 1.0))
+    with open(cache.dir / "vectors.f32", "ab") as f:
+        f.write(b"\x00\x00")  # a writer died mid-row
+
+    cache.put_many([text_hash("b")], np.full((1, DIM), 2.0))
+
+    fresh = EmbeddingCache("m", DIM, root=tmp_path)
+    got = fresh.get_many([text_hash("a"), text_hash("b")])
+    assert got[text_hash("a")].tolist() == [1.0] * DIM
+    assert got[text_hash("b")].tolist() == [2.0] * DIM
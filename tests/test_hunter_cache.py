@@ -0,0 +1,48 @@
+"""Hunter lookups answered from the local cache instead of the API."""
+import pytest
+
+from src.hunter_cache import HunterCache
+from src.hunter_client import find_recruiter_email
+from tests.fakes import hunter_handler
+
+
+@pytest.fixture
+def hunter(fake):
+    def use(found_rate):
+        fake.hunter.handler = hunter_handler(found_rate)
+        return fake.hunter
+    return use
+
+
+def test_finder_results_are_cached_by_normalized_name(hunter):
+    api = hunter(1.0)
+    assert find_recruiter_email("Dana Smith", "Acme.com") == "dana.smith@acme.com"
+    assert find_recruiter_email("  dana   SMITH ", "acme.com") == "dana.smith@acme.com"
+    assert api.calls == 1
+
+
+def test_domain_search_answers_later_names_at_the_same_company(hunter):
+    api = hunter(0.0)  # Email Finder never finds anyone: falls back to Domain Search
+    assert find_recruiter_email("Alex Morgan", "acme.com") == "alex.morgan@acme.com"
+    calls = api.calls
+
+    assert find_recruiter_email("Alex Morgan", "acme.com") == "alex.morgan@acme.com"  # listed in the search
+    assert find_recruiter_email("Robin Hood", "acme.com") == "robin.hood@acme.com"    # from its pattern
+    assert api.calls == calls
+
+
+def test_not_found_is_cached_for_the_negative_ttl(tmp_path):
+    cache = HunterCache(tmp_path / "h.sqlite3", ttl=3600, negative_ttl=3600)
+    cache.put_finder("Dana Smith", "acme.com", None)
+    assert cache.get_finder("dana smith", "ACME.com") == (True, None)
+
+    short = HunterCache(tmp_path / "h.sqlite3", ttl=3600, negative_ttl=0)
+    assert short.get_finder("Dana Smith", "acme.com") == (False, None)  # expired: ask again
+
+
+def test_domain_without_emails_expires_like_a_miss(tmp_path):
+    cache = HunterCache(tmp_path / "h.sqlite3", ttl=3600, negative_ttl=0)
+    cache.put_domain("empty.com", {"emails": []})
+    cache.put_domain("acme.com", {"emails": [{"value": "a@acme.com"}]})
+    assert cache.get_domain("empty.com") is None
+    assert cache.get_domain("acme.com")["emails"][0]["value"] == "a@acme.com"
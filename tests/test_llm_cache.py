@@ -0,0 +1,75 @@
+"""LLM completion cache: keys, bypass, persistence and bounds."""
+import time
+
+from src import llm_cache
+from src.llm_cache import LLMCache, cache_key, cached_completion
+
+
+class Completions:
+    """A `complete()` that counts its calls."""
+
+    def __init__(self, answer="answer"):
+        self.answer = answer
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return self.answer
+
+
+def test_whitespace_does_not_change_the_key_but_settings_do():
+    base = cache_key("m", "sys", "Line one\n\nLine two", 0.2)
+    assert cache_key("m", "sys ", "Line  one \r\n\n\n  Line two\n", 0.2) == base
+    assert cache_key("m", "sys", "Line one\nLine two", 0.2) != base  # paragraph break kept
+    assert cache_key("m", "sys", "Line one\n\nLine two", 0.7) != base
+    assert cache_key("m", "sys", "Line one\n\nLine two", 0.2, {"response_format": "json"}) != base
+    assert cache_key("other", "sys", "Line one\n\nLine two", 0.2) != base
+
+
+def test_second_call_is_served_from_the_cache():
+    complete = Completions()
+    assert cached_completion("m", "sys", "user", 0.2, complete) == "answer"
+    assert cached_completion("m", "sys", "user", 0.2, complete) == "answer"
+    assert complete.calls == 1
+
+
+def test_bypass_neither_reads_nor_writes():
+    complete = Completions()
+    cached_completion("m", "sys", "user", 0.2, complete, use_cache=False)
+    cached_completion("m", "sys", "user", 0.2, complete)
+    assert complete.calls == 2
+    assert llm_cache.lookup_completion("m", "sys", "user", 0.2) == "answer"  # written by the cached call only
+
+
+def test_rejected_answers_are_not_cached():
+    complete = Completions("not json")
+    for _ in range(2):
+        cached_completion("m", "sys", "user", 0.2, complete, accept=lambda c: c.startswith("{"))
+    assert complete.calls == 2
+
+
+def test_entries_survive_a_restart(tmp_path):
+    LLMCache(tmp_path / "llm.sqlite3").put("k", "v")
+    assert LLMCache(tmp_path / "llm.sqlite3").get("k") == "v"
+
+
+def test_expired_entries_miss_and_are_pruned(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", ttl=60)
+    cache.put("old", "v")
+    with cache._conn() as conn:
+        conn.execute("UPDATE completions SET created_at = ?", (time.time() - 120,))
+    cache._memory.clear()
+
+    assert cache.get("old") is None
+    assert cache.prune() == 1
+
+
+def test_oldest_rows_go_beyond_max_rows(tmp_path):
+    cache = LLMCache(tmp_path / "llm.sqlite3", ttl=0, max_rows=2)
+    for i in range(4):
+        cache.put(f"k{i}", "v")
+        with cache._conn() as conn:  # distinct, increasing timestamps
+            conn.execute("UPDATE completions SET created_at = ? WHERE key = ?", (1000.0 + i, f"k{i}"))
+
+    assert cache.prune() == 2
+    assert [cache.get(f"k{i}") for i in range(4)] == [None, None, "v", "v"]
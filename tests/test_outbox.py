@@ -0,0 +1,77 @@
+"""Outbox delivery against a fake n8n, for each webhook configuration."""
+import pytest
+
+from src import outbox
+from src.http_transport import get_transport
+from tests.fakes import FakeHTTPAdapter
+
+SINGLE_URL = "http://n8n.test/webhook/single"
+BATCH_URL = "http://n8n.test/webhook/batch"
+
+
+@pytest.fixture
+def n8n():
+    """Fake n8n that records (path, body) and answers `status` (200 by default)."""
+    calls = []
+    state = {"status": 200}
+
+    def handler(method, path, params, body):
+        calls.append((path, body))
+        return state["status"], {"ok": state["status"] == 200}
+
+    adapter = FakeHTTPAdapter(handler)
+    session = get_transport("n8n").session
+    session.mount("http://n8n.test/", adapter)
+    yield calls, state
+    session.adapters.pop("http://n8n.test/", None)
+
+
+def _box(tmp_path, monkeypatch, single: str, batch: str) -> outbox.Outbox:
+    monkeypatch.setattr(outbox, "N8N_WEBHOOK_URL", single)
+    monkeypatch.setattr(outbox, "N8N_WEBHOOK_BATCH_URL", batch)
+    return outbox.Outbox(tmp_path / "outbox.sqlite3")
+
+
+def _payload(i: int) -> dict:
+    return {"to": f"r{i}@example.com", "subject": f"s{i}", "body": "b"}
+
+
+def test_single_url_posts_each_message(tmp_path, monkeypatch, n8n):
+    calls, _ = n8n
+    box = _box(tmp_path, monkeypatch, SINGLE_URL, "")
+    keys = [box.enqueue(_payload(i))[0] for i in range(2)]
+
+    counts = outbox.deliver(box, box.claim(10))
+
+    assert counts == {outbox.SENT: 2}
+    assert [path for path, _ in calls] == ["/webhook/single"] * 2
+    assert sorted(body["idempotency_key"] for _, body in calls) == sorted(keys)
+
+
+@pytest.mark.parametrize("n", [1, 3])
+def test_batch_url_only_sends_any_batch_size(tmp_path, monkeypatch, n8n, n):
+    calls, _ = n8n
+    box = _box(tmp_path, monkeypatch, "", BATCH_URL)
+    keys = [box.enqueue(_payload(i))[0] for i in range(n)]
+
+    counts = outbox.deliver(box, box.claim(10))
+
+    assert counts == {outbox.SENT: n}
+    assert len(calls) == 1
+    path, body = calls[0]
+    assert path == "/webhook/batch"
+    assert sorted(m["idempotency_key"] for m in body["messages"]) == sorted(keys)
+    assert all(box.get(k)["status"] == outbox.SENT for k in keys)
+
+
+def test_failed_post_is_retried_by_the_outbox_only(tmp_path, monkeypatch, n8n):
+    calls, state = n8n
+    state["status"] = 503
+    box = _box(tmp_path, monkeypatch, "", BATCH_URL)
+    key, _ = box.enqueue(_payload(0))
+
+    counts = outbox.deliver(box, box.claim(10))
+
+    assert counts == {outbox.PENDING: 1}
+    assert len(calls) == 1  # no transport-level retries on top
+    assert box.get(key)["attempts"] == 1
@@ -0,0 +1,65 @@
+"""PDF text cache: hits by content hash, bounded by age and size."""
+import os
+import time
+
+import pytest
+from pypdf import PdfWriter
+
+from src import pdf_utils
+
+
+@pytest.fixture
+def cache(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_utils, "PDF_CACHE_DIR", tmp_path / "pdf")
+    return tmp_path / "pdf"
+
+
+def _pdf(path, pages=1):
+    writer = PdfWriter()
+    for _ in range(pages):
+        writer.add_blank_page(width=612, height=792)
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def _entry(cache, name, size=1000, age_days=0.0):
+    cache.mkdir(parents=True, exist_ok=True)
+    path = cache / name
+    path.write_text("x" * size)
+    then = time.time() - age_days * 86400
+    os.utime(path, (then, then))
+    return path
+
+
+def test_second_extraction_is_a_cache_hit(tmp_path, cache):
+    pdf = _pdf(tmp_path / "a.pdf", pages=2)
+    first = pdf_utils.extract_pdf(pdf)
+    assert first["page_count"] == 2
+    assert [p.name for p in cache.iterdir()] == [f"{first['sha256']}.v{pdf_utils._EXTRACTOR_VERSION}.json"]
+
+    os.unlink(pdf)  # a hit never opens the file
+    assert pdf_utils.extract_pdf(pdf, file_hash=first["sha256"]) == first
+
+
+def test_expired_entries_are_evicted(tmp_path, cache):
+    stale = _entry(cache, "old.v1.json", age_days=40)
+    recent = _entry(cache, "recent.v1.json", age_days=1)
+
+    pdf_utils.extract_pdf(_pdf(tmp_path / "a.pdf"))
+
+    assert not stale.exists()
+    assert recent.exists()
+
+
+def test_least_recently_used_go_first_over_the_size_cap(tmp_path, cache, monkeypatch):
+    monkeypatch.setattr(pdf_utils, "PDF_CACHE_MAX_MB", 2000 / (1024 * 1024))
+    oldest = _entry(cache, "oldest.v1.json", age_days=3)
+    used = _entry(cache, "used.v1.json", age_days=2)
+    os.utime(used)  # e.g. a cache hit just now
+
+    doc = pdf_utils.extract_pdf(_pdf(tmp_path / "a.pdf"))
+
+    assert not oldest.exists()
+    assert used.exists()
+    assert pdf_utils._cache_path(doc["sha256"]).exists()  # the entry just written is kept
@@ -0,0 +1,99 @@
+"""The stage graph: dependencies, parallelism, fallbacks, and the cold-email graph on fakes."""
+import threading
+import time
+
+import pytest
+
+from src import pipeline, prefetch
+from src.pipeline import Stage, iter_cold_email, run_cold_email, run_stages
+
+RESUME = ("Backend engineer. Built REST APIs in Go and Python, ran PostgreSQL and Redis, "
+          "deployed services on Kubernetes with Terraform.")
+JD = "Senior Backend Engineer at Acme. You will build REST APIs in Go on Kubernetes with PostgreSQL."
+
+
+def _boom():
+    raise RuntimeError("boom")
+
+
+def test_dependents_get_their_inputs_as_keywords():
+    events = run_stages([
+        Stage("a", lambda: 2),
+        Stage("b", lambda: 3),
+        Stage("sum", lambda a, b: a + b, deps=["a", "b"]),
+    ])
+    assert events["sum"].value == 5
+    assert all(ev.ok for ev in events.values())
+
+
+def test_independent_stages_run_in_parallel():
+    barrier = threading.Barrier(2, timeout=2)  # only passes if both run at once
+    events = run_stages([Stage("a", barrier.wait), Stage("b", barrier.wait)])
+    assert events["a"].ok and events["b"].ok
+
+
+def test_failure_uses_the_default_or_skips_dependents():
+    events = run_stages([
+        Stage("soft", _boom, default="fallback"),
+        Stage("hard", _boom),
+        Stage("after_soft", lambda soft: soft.upper(), deps=["soft"]),
+        Stage("after_hard", lambda hard: hard, deps=["hard"]),
+    ])
+    assert events["soft"].value == "fallback" and "boom" in events["soft"].error
+    assert events["after_soft"].value == "FALLBACK"
+    assert not events["hard"].ok
+    assert events["after_hard"].error == "skipped: hard failed"
+
+
+def test_timeout_resolves_to_the_default_without_waiting():
+    started = time.perf_counter()
+    events = run_stages([
+        Stage("slow", lambda: time.sleep(1) or "late", timeout=0.05, default="on time"),
+        Stage("next", lambda slow: slow, deps=["slow"]),
+    ])
+    assert time.perf_counter() - started < 0.5
+    assert events["next"].value == "on time"
+    assert events["slow"].error.startswith("timed out")
+
+
+@pytest.mark.parametrize("stages", [
+    [Stage("a", lambda b: b, deps=["b"])],
+    [Stage("a", lambda b: b, deps=["b"]), Stage("b", lambda a: a, deps=["a"])],
+])
+def test_unknown_deps_and_cycles_are_rejected(stages):
+    with pytest.raises(ValueError):
+        run_stages(stages)
+
+
+@pytest.fixture
+def resume(fake, monkeypatch, tmp_path):
+    monkeypatch.setattr(prefetch, "extract_resume", lambda path, sha: RESUME)
+    path = tmp_path / "resume.pdf"
+    path.write_bytes(b"resume")
+    return str(path)
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_cold_email_graph_end_to_end(resume, fused):
+    out = run_cold_email(resume, JD, "Dana Smith", "acme.com", user_id="alice", fused=fused)
+    assert out["errors"] == {}
+    assert out["subject"] and out["body"]
+    assert out["snippets"] and out["resumes"][0]["selected"]
+    assert out["recruiter_email"].endswith("@acme.com")
+    assert "generate" in out["timings"]
+
+
+def test_streaming_snapshots_grow_until_done(resume):
+    snapshots = list(iter_cold_email(resume, JD, "", "", user_id="alice", fused=False))
+    assert not any(s["done"] for s in snapshots[:-1]) and snapshots[-1]["done"]
+    assert snapshots[-1]["body"] and snapshots[-1]["recruiter_email"] is None
+    first_with_snippets = next(i for i, s in enumerate(snapshots) if s["snippets"])
+    assert first_with_snippets < len(snapshots) - 1  # shown before generation finished
+
+
+def test_failed_parse_falls_back_and_still_generates(resume, monkeypatch):
+    monkeypatch.setattr(prefetch, "parse_jd", lambda text: _boom())
+    out = run_cold_email(resume, JD, "", "", user_id="alice", fused=False)
+    assert "boom" in out["errors"]["parse_jd"]
+    assert out["jd_info"] == pipeline.EMPTY_JD_INFO
+    assert out["body"]
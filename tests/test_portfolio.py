@@ -0,0 +1,66 @@
+"""Portfolios: best-fit selection, replacement, and the pre-portfolio index migration."""
+from src import embeddings_index, portfolio
+from src.embeddings_index import embed_texts, has_manifest, index_resume_text
+from src.vector_store import get_vector_store
+
+BACKEND = ("Backend engineer. Built REST APIs in Go and Python, ran PostgreSQL and Redis, "
+           "deployed services on Kubernetes with Terraform.")
+ML = ("Machine learning engineer. Trained PyTorch models, built feature pipelines in Spark, "
+      "served models with TensorFlow Serving and tracked experiments in MLflow.")
+
+JD_BACKEND = "We need a backend engineer for REST APIs in Go, PostgreSQL and Kubernetes."
+JD_ML = "Hiring an ML engineer to train PyTorch models and build Spark feature pipelines."
+
+
+def _add(user, text, n):
+    return portfolio.add_resume(user, text, f"{n}" * 64, name=f"r{n}.pdf")["resume_id"]
+
+
+def test_each_jd_gets_its_best_resume_in_one_call(fake):
+    backend, ml = _add("alice", BACKEND, 1), _add("alice", ML, 2)
+    jds = [JD_BACKEND, JD_ML]
+
+    ranked = portfolio.select_resumes("alice", [backend, ml], embed_texts(jds), jds)
+
+    assert [r[0]["resume_id"] for r in ranked] == [backend, ml]
+    assert all(r[0]["selected"] and not r[1]["selected"] for r in ranked)
+    assert ranked[0][0]["score"] > ranked[0][1]["score"]
+
+
+def test_retrieve_tags_snippets_with_their_resume(fake):
+    backend, ml = _add("alice", BACKEND, 1), _add("alice", ML, 2)
+    snippets = portfolio.retrieve("alice", [ml], JD_ML, top_k=3)
+    assert snippets and {s["resume_id"] for s in snippets} == {ml}
+
+
+def test_mixed_retrieval_interleaves_resumes(fake):
+    backend, ml = _add("alice", BACKEND, 1), _add("alice", ML, 2)
+    snippets = portfolio.retrieve("alice", [backend, ml], JD_BACKEND + " " + JD_ML, top_k=2)
+    assert {s["resume_id"] for s in snippets} == {backend, ml}
+
+
+def test_replaces_removes_the_old_resume_and_its_index(fake):
+    old = _add("alice", BACKEND, 1)
+    new = portfolio.add_resume("alice", BACKEND + " Led the on-call rotation.", "3" * 64, replaces=old)
+
+    assert new["replaced"] == [old]
+    assert [r["resume_id"] for r in portfolio.list_resumes("alice")] == [new["resume_id"]]
+    assert not has_manifest(portfolio.resume_key("alice", old))
+
+
+def test_reupload_is_a_manifest_check(fake):
+    _add("alice", BACKEND, 1)
+    again = portfolio.add_resume("alice", BACKEND, "1" * 64)
+    assert again["added"] == again["removed"] == 0
+    assert again["name"] == "r1.pdf"  # kept from the first upload
+
+
+def test_pre_portfolio_index_is_dropped_on_first_add(fake):
+    index_resume_text(BACKEND, user_id="alice", source_hash="0" * 64)  # how resumes were indexed before
+    assert has_manifest("alice") and get_vector_store().list_ids("alice")
+
+    _add("alice", ML, 2)
+
+    assert not has_manifest("alice")
+    assert get_vector_store().list_ids("alice") == []
+    assert embeddings_index.load_chunk_texts(portfolio.resume_key("alice", "2" * 16))
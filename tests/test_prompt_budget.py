@@ -0,0 +1,98 @@
+"""JD boilerplate stripping, snippet dedupe and token budgets."""
+import pytest
+
+from src import prompt_budget
+from src.prompt_budget import count_tokens, dedupe_snippets, fit_snippets, strip_boilerplate, truncate_tokens
+
+ROLE = ("You will design and ship data pipelines in Python and Spark, own our Kafka streaming "
+        "platform, and mentor two junior engineers.")
+
+
+def test_drops_boilerplate_sections_up_to_the_next_heading():
+    jd = "\n".join([
+        "Senior Data Engineer", "", ROLE, "",
+        "Benefits:", "", "Gym membership, free lunch and a generous budget for conferences.", "",
+        "Requirements", "", "5+ years with Python and SQL.", "",
+        "Equal Opportunity Employer", "", "Acme welcomes everyone.",
+    ])
+    out = strip_boilerplate(jd)
+    assert ROLE in out
+    assert "5+ years with Python and SQL." in out
+    assert "Gym membership" not in out
+    assert "welcomes everyone" not in out
+
+
+@pytest.mark.parametrize("title", ["Privacy Engineer", "Benefits Analyst", "Accommodations Coordinator",
+                                   "Diversity & Inclusion Lead", "How To Apply Machine Learning"])
+def test_job_titles_that_start_like_a_boilerplate_heading_are_kept(title):
+    jd = f"{title}\n\n{ROLE}\n\nRequirements\n\n5+ years with Python and SQL."
+    out = strip_boilerplate(jd)
+    assert out.startswith(title)
+    assert ROLE in out
+
+
+def test_one_phrase_hit_drops_only_that_sentence():
+    paragraph = ROLE + " You also get unlimited PTO. Expect on-call once a month."
+    out = strip_boilerplate(f"Data Engineer\n\n{paragraph}\n\nRequirements\n\nPython.")
+    assert ROLE in out
+    assert "on-call once a month" in out
+    assert "PTO" not in out
+
+
+def test_short_paragraph_with_two_hits_is_dropped():
+    eeo = ("Acme is an equal opportunity employer. We hire without regard to race, religion or "
+           "national origin.")
+    out = strip_boilerplate(f"Data Engineer\n\n{ROLE}\n\n{eeo}")
+    assert ROLE in out
+    assert "equal opportunity" not in out
+
+
+def test_jd_without_blank_lines_keeps_lines_with_a_single_mention():
+    jd = "\n".join([
+        "Data Engineer",
+        ROLE,
+        "Build dashboards for HR covering PTO balances and 401k enrollment.",
+        "Work with product on the roadmap; apply now your SQL skills daily.",
+        "We use cookies. Accept all cookies to continue.",
+    ])
+    out = strip_boilerplate(jd)
+    assert ROLE in out
+    assert "Build dashboards" not in out  # two hits on one short line
+    assert "Work with product on the roadmap;" in out
+    assert "cookies" not in out
+
+
+def test_short_jds_are_never_stripped_to_nothing():
+    assert strip_boilerplate("Apply now!") == "Apply now!"
+    assert strip_boilerplate("Python developer, remote") == "Python developer, remote"
+    assert strip_boilerplate("") == ""
+
+
+def test_prepare_jd_applies_the_budget(monkeypatch):
+    monkeypatch.setattr(prompt_budget, "JD_STRIP_BOILERPLATE", True)
+    out = prompt_budget.prepare_jd(" ".join([ROLE] * 40), budget=50, record=False)
+    assert out["tokens_after"] <= 50 < out["tokens_before"]
+    assert out["text"] == truncate_tokens(out["text"], 50)
+
+
+def test_truncate_cuts_on_a_word_boundary():
+    text = "alpha beta gamma delta epsilon " * 20
+    cut = truncate_tokens(text, 10)
+    assert count_tokens(cut) <= 10
+    assert text.startswith(cut) and text[len(cut)] == " "
+
+
+def test_dedupe_matches_whole_words_only():
+    snippets = [{"text": "Built REST APIs in Golang and Rust."},
+                {"text": "Built REST APIs in Go."},
+                {"text": "REST APIs in Golang and Rust"}]
+    out = dedupe_snippets(snippets)
+    assert [s["text"] for s in out] == ["Built REST APIs in Golang and Rust.", "Built REST APIs in Go."]
+
+
+def test_fit_snippets_keeps_rank_order_within_budget():
+    snippets = [{"text": f"Snippet {i}: " + "led migrations to Kubernetes " * 10, "score": 1 - i / 10}
+                for i in range(6)]
+    out = fit_snippets(snippets, budget=150)
+    assert out["tokens_after"] <= 150 < out["tokens_before"]
+    assert [s["text"][:9] for s in out["snippets"]] == [f"Snippet {i}" for i in range(len(out["snippets"]))]
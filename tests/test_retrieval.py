@@ -0,0 +1,62 @@
+"""Hybrid retrieval: BM25, reciprocal-rank fusion, and the adaptive reranker."""
+from src import reranker
+from src.bm25 import BM25Index, reciprocal_rank_fusion, tokenize, weighted_query
+from tests.fakes import FakeCrossEncoder
+
+CHUNKS = {
+    "c1": "Built REST APIs in Go and deployed them on k8s.",
+    "c2": "Wrote C++ trading engines and tuned their latency.",
+    "c3": "Ran Kafka streaming pipelines feeding the data lake.",
+}
+
+
+def _match(vid, score, text=None):
+    return {"id": vid, "score": score, "metadata": {"text": text or f"chunk {vid}"}}
+
+
+def test_tokenizer_keeps_tech_terms_whole():
+    assert tokenize("C++, C#, Node.js and k8s; the CI.") == ["c++", "c#", "node.js", "k8s", "ci"]
+
+
+def test_bm25_finds_exact_terms():
+    index = BM25Index(list(CHUNKS), list(CHUNKS.values()))
+    assert index.search("c++ latency")[0][0] == "c2"
+    assert [vid for vid, _ in index.search("kafka", top_k=5)] == ["c3"]
+    assert index.search("nothing matches") == []
+
+
+def test_skill_boost_reorders_hits():
+    index = BM25Index(list(CHUNKS), list(CHUNKS.values()))
+    query = "go kafka"
+    assert index.search(weighted_query(query, ["kafka"]))[0][0] == "c3"
+    assert index.search(weighted_query(query, ["go"]))[0][0] == "c1"
+
+
+def test_rrf_rewards_agreement_and_honours_weights():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "c", "a"]])
+    assert [vid for vid, _ in fused][0] == "b"
+    assert [vid for vid, _ in reciprocal_rank_fusion([["a", "b"], ["b", "a"]], weights=[2.0, 1.0])][0] == "a"
+
+
+def test_skipped_rerank_keeps_the_fused_order():
+    # fused order puts a lexical hit with a lower dense score first
+    matches = [_match("lex", 0.40), _match("d1", 0.90), _match("d2", 0.85)]
+    out = reranker.rerank("jd", matches, top_k=5)  # fewer candidates than top_k: skipped
+    assert [s["text"] for s in out] == ["chunk lex", "chunk d1", "chunk d2"]
+    assert out[0]["score"] == 0.40
+
+
+def test_close_dense_scores_go_through_the_cross_encoder(monkeypatch):
+    monkeypatch.setattr(reranker, "get_rerank_model", lambda: FakeCrossEncoder())
+    reranker.score_cache.clear()
+    jd = "kafka streaming data lake"
+    matches = [_match("c1", 0.51, CHUNKS["c1"]), _match("c3", 0.50, CHUNKS["c3"]), _match("c2", 0.49, CHUNKS["c2"])]
+
+    assert reranker.needs_rerank([m["score"] for m in matches], top_k=1)
+    assert [s["text"] for s in reranker.rerank(jd, matches, top_k=1)] == [CHUNKS["c3"]]
+    assert len(reranker.score_cache._items) == 3  # a repeat costs no inference
+
+
+def test_wide_gap_skips_the_cross_encoder():
+    assert not reranker.needs_rerank([0.9, 0.5, 0.4], top_k=1)
+    assert not reranker.needs_rerank([0.9, 0.5], top_k=2)
@@ -0,0 +1,97 @@
+"""LocalVectorStore files: atomic replacement, validation on load, per-key directories."""
+import json
+from pathlib import Path
+
+import numpy as np
+import pytest
+
+from src import config, portfolio
+from src.vector_store import LocalVectorStore
+
+DIM = 4
+
+
+def _items(user, n, offset=0):
+    return [{"id": f"{user}-{i}", "values": np.eye(DIM)[(i + offset) % DIM].tolist(), "metadata": {"i": i}}
+            for i in range(n)]
+
+
+def _store(tmp_path):
+    return LocalVectorStore(root=tmp_path / "vs", dim=DIM)
+
+
+def test_write_keeps_one_versioned_vector_file(tmp_path):
+    store = _store(tmp_path)
+    store.upsert("alice", _items("alice", 3))
+    store.upsert("alice", _items("alice", 2, offset=1))
+
+    udir = store._user_dir("alice")
+    meta = json.loads((udir / "meta.json").read_text())
+    assert meta["rows"] == 3 and meta["dim"] == DIM
+    assert [p.name for p in udir.glob("vectors*.f32")] == [meta["vectors"]]
+    assert store.query("alice", np.eye(DIM)[1], top_k=1)[0]["id"] == "alice-0"
+
+
+def test_crash_before_the_meta_rename_leaves_the_old_index(tmp_path, monkeypatch):
+    store = _store(tmp_path)
+    store.upsert("alice", _items("alice", 2))
+
+    real_replace = Path.replace
+
+    def crash(self, target):
+        if Path(target).name == "meta.json":
+            raise OSError("killed")
+        return real_replace(self, target)
+
+    monkeypatch.setattr(Path, "replace", crash)
+    with pytest.raises(OSError):
+        store.upsert("alice", _items("alice", 4))
+    monkeypatch.undo()
+
+    fresh = _store(tmp_path)
+    assert fresh.list_ids("alice") == ["alice-0", "alice-1"]
+    assert fresh.query("alice", np.eye(DIM)[1], top_k=1)[0]["id"] == "alice-1"
+
+
+def test_unversioned_layout_still_loads_and_is_validated(tmp_path):
+    store = _store(tmp_path)
+    udir = store.root / config.safe_key("alice")
+    udir.mkdir(parents=True)
+    np.eye(DIM, dtype=np.float32)[:2].tofile(udir / "vectors.f32")
+    meta = {"dim": DIM, "ids": ["alice-0", "alice-1"], "metadata": [{}, {}]}
+    (udir / "meta.json").write_text(json.dumps(meta))
+    assert store.query("alice", np.eye(DIM)[1], top_k=1)[0]["id"] == "alice-1"
+
+    meta["ids"].append("alice-2")  # torn write: three ids, two rows
+    meta["metadata"].append({})
+    (udir / "meta.json").write_text(json.dumps(meta))
+    with pytest.raises(ValueError, match="re-index"):
+        _store(tmp_path).list_ids("alice")
+
+
+def test_keys_that_sanitize_alike_get_their_own_directory(tmp_path):
+    store = _store(tmp_path)
+    store.upsert("a/b", _items("a/b", 1))
+    store.upsert("a_b", _items("a_b", 2))
+    assert store.list_ids("a/b") == ["a/b-0"]
+    assert store.list_ids("a_b") == ["a_b-0", "a_b-1"]
+
+
+def test_legacy_directory_is_adopted_by_its_owner_only(tmp_path):
+    store = _store(tmp_path)
+    legacy = store.root / "a_b"
+    legacy.mkdir(parents=True)
+    np.eye(DIM, dtype=np.float32)[:1].tofile(legacy / "vectors.f32")
+    (legacy / "meta.json").write_text(json.dumps({"dim": DIM, "ids": ["a/b-0"], "metadata": [{}]}))
+
+    assert store.list_ids("a_b") == []
+    assert store.list_ids("a/b") == ["a/b-0"]
+    assert not legacy.exists()
+
+
+def test_legacy_portfolio_file_is_adopted_by_its_owner_only(monkeypatch, tmp_path):
+    monkeypatch.setattr(portfolio, "PORTFOLIO_DIR", tmp_path)
+    (tmp_path / "a_b.json").write_text(json.dumps({"user_id": "a/b", "resumes": {"r1": {"resume_id": "r1"}}}))
+
+    assert portfolio.list_resumes("a_b") == []
+    assert [r["resume_id"] for r in portfolio.list_resumes("a/b")] == ["r1"]